@@ -40,7 +40,19 @@ LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/'
 
 SESSION_COOKIE_AGE = 2 * 60 * 60
-SESSION_SAVE_EVERY_REQUEST = True
+# Rather than saving the session on every request, ThrottledSessionMiddleware
+# only pushes its expiry back once this fraction of SESSION_COOKIE_AGE has
+# passed since it was last saved.
+SESSION_SAVE_EVERY_REQUEST = False
+SESSION_REFRESH_FRACTION = 0.1
+
+# Sessions are read through a cache (see main.sessions), whose copies are
+# trusted for SESSION_CACHE_TIMEOUT seconds.  In production the cache has to
+# be shared between processes, or a logout takes that long to reach the
+# others (see PRODUCTION.md).
+SESSION_ENGINE = 'main.sessions'
+SESSION_CACHE_ALIAS = 'sessions'
+SESSION_CACHE_TIMEOUT = 60
 
 # Application definition
 
@@ -59,7 +71,9 @@ INSTALLED_APPS = (
 
 
 MIDDLEWARE_CLASSES = (
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'main.middleware.CompressionMiddleware',
+    'main.middleware.ReplicaMiddleware',
+    'main.middleware.ThrottledSessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -94,9 +108,28 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework.authentication.BasicAuthentication',
         'rest_framework.authentication.SessionAuthentication',
+        'main.authentication.TokenAuthentication',
+    ),
+    # these use ujson when it's installed (see main.renderers)
+    'DEFAULT_RENDERER_CLASSES': (
+        'main.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'main.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ),
 }
 
+# API tokens (see main.authentication) last this many seconds, unless
+# revoked sooner by logging out.  Each process remembers up to
+# API_TOKEN_CACHE_SIZE recently used tokens for API_TOKEN_CACHE_TIMEOUT
+# seconds, which is how long a revoked token may still work elsewhere.
+API_TOKEN_AGE = 30 * 24 * 60 * 60
+API_TOKEN_CACHE_SIZE = 10000
+API_TOKEN_CACHE_TIMEOUT = 60
+
 
 # Database
 # https://docs.djangoproject.com/en/1.8/ref/settings/#databases
@@ -112,6 +145,32 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'sessions',
+    },
+}
+
+# Read replicas: aliases in DATABASES that safe (GET/HEAD/OPTIONS) requests
+# may read from; see main.routers.  For example, to try it out against a
+# second local database:
+#
+#   DATABASES['replica'] = dict(DATABASES['default'], NAME='fugl_replica',
+#                               TEST={'MIRROR': 'default'})
+#   DATABASE_REPLICAS = ['replica']
+DATABASE_ROUTERS = ['main.routers.ReplicaRouter']
+DATABASE_REPLICAS = []
+
+# After a client writes something, its reads stay on the primary for this
+# many seconds, so it sees its own writes however far the replicas lag.
+# Clients are recognized by a cookie or, for API clients, by their
+# credentials in the default cache.
+REPLICA_PIN_SECONDS = 10
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/1.8/topics/i18n/
@@ -140,3 +199,57 @@ if not DEBUG:
 
 STATIC_URL = '/static/'
 STATIC_ROOT = '/srv/www/static'
+
+
+# Published sites are written under PUBLISH_ROOT (which nginx serves at
+# PUBLISH_URL) as <owner id>/<project id>/.  Sites run their users' plugin
+# scripts, so PUBLISH_URL has to be another origin, one that gets none of
+# the app's cookies (see PRODUCTION.md).
+PUBLISH_ROOT = '/srv/www/sites'
+PUBLISH_URL = 'https://sites.fugl.xyz/'
+
+# Limits on concurrent site builds, overall and per user.  These are per
+# process, so the real limit is that times the number of uWSGI processes.
+BUILD_MAX_CONCURRENT = 4
+BUILD_MAX_PER_USER = 1
+
+# A build waits until its project has had no edits for BUILD_DEBOUNCE_WINDOW
+# seconds (but never more than BUILD_DEBOUNCE_MAX_DELAY), so a burst of
+# saves turns into a single build.
+BUILD_DEBOUNCE_WINDOW = 2
+BUILD_DEBOUNCE_MAX_DELAY = 10
+
+# A background rebuild that fails is tried again BUILD_RETRY_DELAY seconds
+# later, up to BUILD_RETRIES times; after that the project stays dirty until
+# it's next edited or published.
+BUILD_RETRIES = 3
+BUILD_RETRY_DELAY = 30
+
+# How many builds per project to remember as bases for delta downloads.
+BUILD_HISTORY = 10
+
+# Per-theme caches (compiled template bytecode and the like) shared by every
+# site build.
+BUILD_CACHE_ROOT = os.path.join(BASE_DIR, 'build-cache')
+
+# A theme's filepath must be a directory under THEMES_ROOT (relative paths
+# are taken relative to it) or the name of one of Pelican's builtin themes.
+THEMES_ROOT = os.path.join(os.path.dirname(BASE_DIR), 'themes')
+
+# Post previews are rendered straight from the theme templates and cached,
+# keyed on a digest of everything that goes into the page.
+PREVIEW_CACHE_TIMEOUT = 24 * 60 * 60
+
+# Responses this big or bigger, of these types, are sent gzipped (or with
+# brotli, if it's installed) to clients that accept it.  HTML isn't in the
+# list: the admin and the browsable API put CSRF tokens in pages that also
+# echo input back (BREACH).  Post previews have no secrets in them and are
+# compressed once, when they're cached, instead.  Archives and zips are
+# compressed already.
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_CONTENT_TYPES = [
+    'application/json',
+    'application/javascript',
+    'text/css',
+    'text/plain',
+]
@@ -14,3 +14,4 @@ admin.site.register(Post)
 admin.site.register(Tag)
 admin.site.register(Category)
 admin.site.register(PagePlugin)
+admin.site.register(Build)
@@ -1,3 +1,4 @@
+from .builds import BuildViewSet
 from .categories import CategoryViewSet
 from .pages import PageViewSet
 from .page_plugins import PagePluginViewSet
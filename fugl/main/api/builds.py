@@ -0,0 +1,61 @@
+import os
+
+from django.http import FileResponse
+from django.shortcuts import get_object_or_404
+
+from rest_framework import status
+from rest_framework import viewsets
+from rest_framework.decorators import detail_route
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from main.models import Build
+from main.models import Project
+from main.serializers import BuildSerializer
+from main.util import UserAccess
+
+
+class BuildViewSet(viewsets.GenericViewSet):
+
+    queryset = Build.objects.all()
+    project_queryset = Project.objects.all()
+    serializer_class = BuildSerializer
+    permission_classes = (IsAuthenticated,)
+
+    def list(self, request):
+        if 'project' not in request.query_params:
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+        proj_id = request.query_params['project']
+        project = get_object_or_404(self.project_queryset, pk=proj_id)
+
+        if UserAccess(request.user).can_view(project):
+            builds = self.queryset.filter(project=project).order_by('-created')
+            serializer = self.serializer_class(builds, many=True)
+            return Response(serializer.data, status=status.HTTP_200_OK)
+        else:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+    def retrieve(self, request, pk=None):
+        build = get_object_or_404(self.queryset, pk=pk)
+        if not UserAccess(request.user).can_view(build.project):
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+        serializer = self.serializer_class(build)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @detail_route(methods=['get'])
+    def profile(self, request, pk=None):
+        """Download a profiled build's cProfile stats.  Admins only."""
+        if not request.user.is_staff:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+        build = get_object_or_404(self.queryset, pk=pk)
+        if not build.profile or not os.path.isfile(build.profile):
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+        resp = FileResponse(open(build.profile, 'rb'),
+                            content_type='application/octet-stream')
+        resp['Content-Disposition'] = (
+            'attachment; filename=build_{0}.prof'.format(build.id)
+        )
+        return resp
@@ -8,7 +8,9 @@ from rest_framework.response import Response
 from main.models import Page
 from main.models import Project
 from main.serializers import PageSerializer
+from main.serializers.fast import list_data
 from main.util import UserAccess
+from main.util import get_debouncer
 
 
 class PageViewSet(viewsets.GenericViewSet):
@@ -26,8 +28,8 @@ class PageViewSet(viewsets.GenericViewSet):
 
         if UserAccess(request.user).can_view(project):
             pages = self.queryset.filter(project=project)
-            serializer = self.serializer_class(pages, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            data = list_data(self.serializer_class, pages)
+            return Response(data, status=status.HTTP_200_OK)
         else:
             return Response(status=status.HTTP_404_NOT_FOUND)
 
@@ -42,6 +44,7 @@ class PageViewSet(viewsets.GenericViewSet):
             serializer = self.serializer_class(data=request.data)
             if serializer.is_valid():
                 serializer.save()
+                get_debouncer().touch(project.id)
                 return Response(serializer.data,
                     status=status.HTTP_201_CREATED)
             else:
@@ -68,6 +71,7 @@ class PageViewSet(viewsets.GenericViewSet):
                 partial=True)
             if serializer.is_valid():
                 serializer.save()
+                get_debouncer().touch(page.project_id)
                 return Response(serializer.data, status=status.HTTP_200_OK)
             else:
                 return Response(serializer.errors,
@@ -80,6 +84,7 @@ class PageViewSet(viewsets.GenericViewSet):
         access = UserAccess(request.user)
         if access.can_edit(page.project):
             page.delete()
+            get_debouncer().touch(page.project_id)
             return Response(status=status.HTTP_204_NO_CONTENT)
         else:
             return Response(status=status.HTTP_404_NOT_FOUND)
@@ -1,15 +1,20 @@
+from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 
 from rest_framework import status
 from rest_framework import viewsets
+from rest_framework.decorators import detail_route
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
 from main.models import Post
 from main.models import Project
 from main.serializers import PostSerializer
+from main.serializers.fast import list_data
+from main.util import PostPreviewer
 from main.util import UserAccess
+from main.util import get_debouncer
 
 
 class PostViewSet(viewsets.GenericViewSet):
@@ -27,8 +32,8 @@ class PostViewSet(viewsets.GenericViewSet):
 
         if UserAccess(request.user).can_view(project):
             posts = self.queryset.filter(project=project)
-            serializer = self.serializer_class(posts, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            data = list_data(self.serializer_class, posts)
+            return Response(data, status=status.HTTP_200_OK)
         else:
             return Response(status=status.HTTP_404_NOT_FOUND)
 
@@ -47,6 +52,7 @@ class PostViewSet(viewsets.GenericViewSet):
             serializer = self.serializer_class(data=request.data)
             if serializer.is_valid():
                 serializer.save()
+                get_debouncer().touch(project.id)
                 return Response(serializer.data,
                     status=status.HTTP_201_CREATED)
             else:
@@ -77,6 +83,7 @@ class PostViewSet(viewsets.GenericViewSet):
                 partial=True)
             if serializer.is_valid():
                 serializer.save()
+                get_debouncer().touch(post.project_id)
                 return Response(serializer.data, status=status.HTTP_200_OK)
             else:
                 return Response(serializer.errors,
@@ -89,6 +96,26 @@ class PostViewSet(viewsets.GenericViewSet):
         access = UserAccess(request.user)
         if access.can_edit(post.project):
             post.delete()
+            get_debouncer().touch(post.project_id)
             return Response(status=status.HTTP_204_NO_CONTENT)
         else:
             return Response(status=status.HTTP_404_NOT_FOUND)
+
+    @detail_route(methods=['get'])
+    def preview(self, request, pk=None):
+        post = get_object_or_404(self.queryset, pk=pk)
+        if not UserAccess(request.user).can_view(post.project):
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+        html, compressed = PostPreviewer(post).render_compressed()
+        # vanilla django response, since this is HTML and not JSON
+        resp = HttpResponse(html, status=status.HTTP_200_OK,
+                            content_type='text/html')
+        # sent by CompressionMiddleware instead of compressing html again
+        resp.precompressed = compressed
+        # the page holds the post's own markup and plugins, served from the
+        # API's origin: sandbox it, so none of it runs with the viewer's
+        # session (plugin scripts show up on the published site instead)
+        resp['Content-Security-Policy'] = 'sandbox'
+        resp['X-Content-Type-Options'] = 'nosniff'
+        return resp
@@ -1,6 +1,9 @@
 from django import db
+from django.core.exceptions import ValidationError
 from django.http import HttpResponse
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.text import slugify
 
 from rest_framework import status
 from rest_framework import viewsets
@@ -9,16 +12,22 @@ from rest_framework.decorators import list_route
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
+from main.models import Build
 from main.models import Project
 from main.models import ProjectAccess
+from main.models import Theme
 from main.models import User
 from main.serializers import ProjectAccessSerializer
 from main.serializers import ProjectDetailSerializer
 from main.serializers import ProjectPermissionSerializer
 from main.serializers import ProjectSerializer
 from main.serializers import UserSerializer
+from main.serializers.project import INCLUDES
 from main.util import SiteGenerator
 from main.util import UserAccess
+from main.util import run_build
+from main.util.project_archive import export_project
+from main.util.project_archive import import_project
 
 
 class ProjectViewSet(viewsets.GenericViewSet):
@@ -31,7 +40,7 @@ class ProjectViewSet(viewsets.GenericViewSet):
 
     def list(self, request):
         user = request.user
-        projects = user.project_set.all() | user.shared_projects.all()
+        projects = Project.objects.visible_to(user)
         serializer = self.serializer_class(
             projects,
             many=True,
@@ -52,7 +61,7 @@ class ProjectViewSet(viewsets.GenericViewSet):
     @list_route()
     def owned(self, request):
         user = request.user
-        projects = user.project_set.all()
+        projects = Project.objects.owned_by(user)
         serializer = self.serializer_class(
             projects,
             many=True,
@@ -63,7 +72,7 @@ class ProjectViewSet(viewsets.GenericViewSet):
     @list_route()
     def shared(self, request):
         user = request.user
-        shared_projects = user.shared_projects.all()
+        shared_projects = Project.objects.shared_with(user)
         serializer = self.serializer_class(
             shared_projects,
             many=True,
@@ -79,12 +88,19 @@ class ProjectViewSet(viewsets.GenericViewSet):
         if 'username' not in params or 'title' not in params:
             return Response(status=status.HTTP_400_BAD_REQUEST)
 
+        include = self.get_include(request)
+        if include is None:
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+
         user = get_object_or_404(self.user_queryset,
             username=params['username'])
-        user_projects = self.queryset.filter(owner=user)
+        user_projects = self.retrieve_queryset(include).filter(owner=user)
         project = get_object_or_404(user_projects, title=params['title'])
         if UserAccess(request.user).can_view(project):
-            serializer = self.retrieve_serializer_class(project)
+            serializer = self.retrieve_serializer_class(
+                project,
+                context={'include': include},
+            )
 
             return Response(serializer.data, status=status.HTTP_200_OK)
         else:
@@ -101,13 +117,36 @@ class ProjectViewSet(viewsets.GenericViewSet):
         return Response(resp, status=status.HTTP_200_OK)
 
     def retrieve(self, request, pk=None):
-        project = get_object_or_404(Project, pk=pk)
+        include = self.get_include(request)
+        if include is None:
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+
+        project = get_object_or_404(self.retrieve_queryset(include), pk=pk)
         if not UserAccess(request.user).can_view(project):
             return Response(status=status.HTTP_404_NOT_FOUND)
 
-        serializer = self.retrieve_serializer_class(project)
+        serializer = self.retrieve_serializer_class(
+            project,
+            context={'include': include},
+        )
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+    def get_include(self, request):
+        """
+        The related objects to nest in a project, from
+        ?include=posts,pages,categories,tags,plugins, or None if any of
+        them are unknown.
+        """
+        param = request.query_params.get('include', '')
+        include = [name for name in param.split(',') if name]
+        if any(name not in INCLUDES for name in include):
+            return None
+        return include
+
+    def retrieve_queryset(self, include):
+        return self.retrieve_serializer_class.prefetch(self.queryset,
+                                                       include)
+
     def update(self, request, pk=None):
         project = get_object_or_404(Project, pk=pk)
         if not UserAccess(request.user).can_edit(project):
@@ -171,12 +210,31 @@ class ProjectViewSet(viewsets.GenericViewSet):
 
         project = get_object_or_404(self.queryset, pk=pk)
 
-        site_generator = SiteGenerator(project)
+        since = None
+        if 'since' in request.query_params:
+            try:
+                since_id = int(request.query_params['since'])
+            except ValueError:
+                return Response(status=status.HTTP_400_BAD_REQUEST)
+            since = get_object_or_404(Build, pk=since_id, project=project)
+
+        # admins can ask for a build to be profiled; see BuildViewSet.profile
+        profile = request.user.is_staff and 'profile' in request.query_params
+        site_generator = SiteGenerator(project, profile=profile)
+        # identical requests for the same project share a single build
+        key = ('generate', project.id, since.id if since else None, profile)
         try:
-            site = site_generator.generate()
+            site = run_build(
+                project.id,
+                request.user.id,
+                key,
+                lambda: site_generator.generate(since=since),
+            )
             headers = {
                 'Content-Disposition': site.content_disposition_str(),
                 'Content-Length': site.content_length(),
+                # pass this back as ?since= to only get what changed
+                'X-Fugl-Build': site.build.id,
             }
             content_type = 'application/zip'
             # have to use vanilla django response here because rest_framework
@@ -193,6 +251,74 @@ class ProjectViewSet(viewsets.GenericViewSet):
         except RuntimeError as e:
             return Response(status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @detail_route(methods=['post'])
+    def publish(self, request, pk=None):
+        if request.method != 'POST':
+            return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
+
+        project = get_object_or_404(self.queryset, pk=pk)
+        if not UserAccess(request.user).can_edit(project):
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            run_build(
+                project.id,
+                request.user.id,
+                ('publish', project.id),
+                SiteGenerator(project).publish,
+            )
+        except RuntimeError:
+            return Response(status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        serializer = ProjectSerializer(project)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @detail_route(methods=['get'])
+    def export(self, request, pk=None):
+        """Download the project as an archive; see POST /projects/import/"""
+        project = get_object_or_404(self.queryset, pk=pk)
+        if not UserAccess(request.user).can_view(project):
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+        # streamed, so a big project never has to fit in memory
+        resp = StreamingHttpResponse(
+            export_project(project),
+            status=status.HTTP_200_OK,
+            content_type='application/gzip',
+        )
+        resp['Content-Disposition'] = (
+            'attachment; filename={0}.fugl.gz'.format(slugify(project.title))
+        )
+        return resp
+
+    @list_route(methods=['post'], url_path='import')
+    def import_archive(self, request):
+        """
+        Create a project owned by the user from an uploaded `archive`, with
+        an optional new `title`, and a `theme` to fall back on if the
+        archived theme doesn't exist here.
+        """
+        if 'archive' not in request.FILES:
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+
+        theme = None
+        if 'theme' in request.data:
+            theme = get_object_or_404(Theme, pk=request.data['theme'])
+
+        try:
+            project = import_project(
+                request.FILES['archive'],
+                request.user,
+                title=request.data.get('title'),
+                theme=theme,
+            )
+        except ValidationError as e:
+            return Response({'archive': e.messages},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = ProjectSerializer(project)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
     @detail_route(methods=['get', 'post', 'put', 'patch', 'delete'])
     def access(self, request, pk=None):
         project = get_object_or_404(Project, pk=pk)
@@ -7,6 +7,7 @@ from rest_framework.response import Response
 
 from main.models import Theme
 from main.serializers import ThemeSerializer
+from main.util import register_theme
 
 
 class ThemeViewSet(viewsets.GenericViewSet):
@@ -23,7 +24,9 @@ class ThemeViewSet(viewsets.GenericViewSet):
         request.data['creator'] = request.user.id
         serializer = self.serializer_class(data=request.data)
         if serializer.is_valid():
-            serializer.save()
+            theme = serializer.save()
+            if theme.filepath:
+                register_theme(theme)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         else:
             return Response(serializer.errors,
@@ -40,7 +43,9 @@ class ThemeViewSet(viewsets.GenericViewSet):
             serializer = self.serializer_class(theme, data=request.data,
                 partial=True)
             if serializer.is_valid():
-                serializer.save()
+                theme = serializer.save()
+                if theme.filepath:
+                    register_theme(theme)
                 return Response(serializer.data, status=status.HTTP_200_OK)
             else:
                 return Response(serializer.errors,
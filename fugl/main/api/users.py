@@ -6,6 +6,8 @@ from rest_framework import viewsets
 from rest_framework.decorators import list_route
 from rest_framework.response import Response
 
+from main.authentication import revoke
+from main.models import ApiToken
 from main.models import User
 from main.serializers import UserSerializer
 
@@ -77,7 +79,10 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
         if user is not None:
             auth.login(request, user)
             serializer = self.serializer_class(user)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            data = serializer.data
+            # for API clients, instead of sending the password every time
+            _, data['token'] = ApiToken.issue(user)
+            return Response(data, status=status.HTTP_200_OK)
         else:
             return Response(status=status.HTTP_401_UNAUTHORIZED)
 
@@ -86,6 +91,8 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
         if request.method != 'DELETE':
             return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
 
+        if isinstance(request.auth, ApiToken):
+            revoke(request.auth)
         auth.logout(request)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class MainConfig(AppConfig):
+
+    name = 'main'
+
+    def ready(self):
+        from main import signals
+        signals.connect()
@@ -0,0 +1,139 @@
+"""
+API token authentication.
+
+Clients get a token from POST /users/authenticate/ and send it as
+
+    Authorization: Token <token>
+
+Checking a token is a SHA-256 and a lookup of the user by primary key,
+plus, at most once every API_TOKEN_CACHE_TIMEOUT seconds per process, a
+lookup of the token itself -- rather than the deliberately slow password
+hash Basic auth runs on every request.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.authentication import get_authorization_header
+
+from main.models import ApiToken
+from main.models import User
+
+
+KEYWORD = b'token'
+
+
+class TokenCache(object):
+    """
+    A small LRU of recently verified tokens: digest -> (user id, created).
+    Entries expire after `timeout` seconds, which bounds how long another
+    process can go on accepting a token revoked here.
+
+    Only ids are cached, never model instances, which would be shared
+    between the threads serving concurrent requests.
+    """
+
+    def __init__(self, max_size, timeout):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # digest -> (expires, value)
+
+    def get(self, digest):
+        with self.lock:
+            entry = self.entries.get(digest)
+            if entry is None:
+                return None
+            expires, value = entry
+            if time.monotonic() >= expires:
+                del self.entries[digest]
+                return None
+            self.entries.move_to_end(digest)
+            return value
+
+    def set(self, digest, value):
+        with self.lock:
+            self.entries[digest] = (time.monotonic() + self.timeout, value)
+            self.entries.move_to_end(digest)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def discard(self, digest):
+        with self.lock:
+            self.entries.pop(digest, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_token_cache():
+    """The process' TokenCache, created on first use from the settings."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = TokenCache(settings.API_TOKEN_CACHE_SIZE,
+                                settings.API_TOKEN_CACHE_TIMEOUT)
+        return _cache
+
+
+def revoke(token):
+    """Delete an ApiToken, and forget it in this process."""
+    # by digest: tokens from TokenAuthentication may not have their pk
+    ApiToken.objects.filter(digest=token.digest).delete()
+    get_token_cache().discard(token.digest)
+
+
+class TokenAuthentication(BaseAuthentication):
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != KEYWORD:
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed('Invalid token header.')
+        try:
+            key = auth[1].decode('ascii')
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed('Invalid token.')
+
+        token = self.verify(ApiToken.hash(key))
+        if token is None:
+            raise exceptions.AuthenticationFailed('Invalid token.')
+        return token.user, token
+
+    def verify(self, digest):
+        """
+        The ApiToken with this digest, with its user, or None if it's
+        unknown, expired or its user isn't active.  The user is loaded
+        afresh for every request, so deactivating them takes effect at
+        once, even while the token is cached.
+        """
+        cache = get_token_cache()
+        entry = cache.get(digest)
+        if entry is None:
+            try:
+                entry = ApiToken.objects.values_list(
+                    'user_id', 'created').get(digest=digest)
+            except ApiToken.DoesNotExist:
+                return None
+            cache.set(digest, entry)
+
+        user_id, created = entry
+        if created <= ApiToken.oldest():
+            return None
+        try:
+            user = User.objects.get(pk=user_id, is_active=True)
+        except User.DoesNotExist:
+            return None
+        return ApiToken(user=user, digest=digest, created=created)
+
+    def authenticate_header(self, request):
+        return 'Token'
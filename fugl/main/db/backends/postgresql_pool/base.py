@@ -0,0 +1,200 @@
+"""
+PostgreSQL with a per-process connection pool.
+
+Django normally opens a new connection for every request and closes it
+when the request finishes.  With this backend, "closing" hands the
+connection back to a pool instead, and the next request (in this process)
+that needs one takes it from there, saving the connect and authentication
+round trips.
+
+A connection goes back in the pool only if it isn't broken: an open
+transaction is rolled back, and one that can't be is closed.  When it's
+taken out again, DISCARD ALL resets whatever session state the last user
+left behind (settings, temporary tables, prepared statements, advisory
+locks) and doubles as the health check.  Connections older than
+MAX_LIFETIME are closed rather than reused.
+
+Configure it in DATABASES with, optionally, a POOL dict:
+
+    'ENGINE': 'main.db.backends.postgresql_pool',
+    'POOL': {
+        'MAX_SIZE': 4,        # idle connections kept per process
+        'MAX_LIFETIME': 600,  # seconds before a connection is replaced
+    },
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from django.db.backends.postgresql_psycopg2 import base
+
+import psycopg2
+from psycopg2 import extensions
+
+
+DEFAULT_MAX_SIZE = 4
+DEFAULT_MAX_LIFETIME = 600
+
+
+class ConnectionPool(object):
+    """Idle connections to one database, shared by this process' threads."""
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE,
+                 max_lifetime=DEFAULT_MAX_LIFETIME):
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+        self.idle = deque()  # (connection, created, isolation level)
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+
+    def checkout(self):
+        """
+        An idle connection that's been reset and checked, as (connection,
+        created, isolation level), or None if there aren't any.
+        """
+        while True:
+            with self.lock:
+                self._check_fork()
+                if not self.idle:
+                    return None
+                entry = self.idle.pop()
+            if self._expired(entry) or not self._reset(entry[0]):
+                self._discard(entry[0])
+                continue
+            with self.lock:
+                self.reused += 1
+            return entry
+
+    def checkin(self, connection, created, isolation_level):
+        """Keep `connection` for reuse if it's healthy, else close it."""
+        entry = (connection, created, isolation_level)
+        if self._expired(entry) or not self._rollback(connection):
+            self._discard(connection)
+            return
+        with self.lock:
+            self._check_fork()
+            if len(self.idle) < self.max_size:
+                self.idle.append(entry)
+                return
+        self._discard(connection)
+
+    def record_created(self):
+        with self.lock:
+            self.created += 1
+
+    def clear(self):
+        """Close every idle connection."""
+        with self.lock:
+            idle, self.idle = list(self.idle), deque()
+        for connection, _, _ in idle:
+            self._discard(connection)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'idle': len(self.idle),
+                'created': self.created,
+                'reused': self.reused,
+                'discarded': self.discarded,
+            }
+
+    def _check_fork(self):
+        # connections inherited from a parent process belong to it
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.idle = deque()
+
+    def _expired(self, entry):
+        return time.time() - entry[1] > self.max_lifetime
+
+    def _rollback(self, connection):
+        if connection.closed:
+            return False
+        status = connection.get_transaction_status()
+        if status == extensions.TRANSACTION_STATUS_IDLE:
+            return True
+        if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+            return False
+        try:
+            connection.rollback()
+        except psycopg2.Error:
+            return False
+        return True
+
+    def _reset(self, connection):
+        if connection.closed:
+            return False
+        try:
+            # DISCARD ALL can't run inside a transaction block
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                cursor.execute('DISCARD ALL')
+        except psycopg2.Error:
+            return False
+        return True
+
+    def _discard(self, connection):
+        with self.lock:
+            self.discarded += 1
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, settings_dict):
+    """The pool for database `alias`, as configured by `settings_dict`."""
+    # the test runner changes NAME, so that's part of the key too
+    key = (alias, settings_dict['HOST'], settings_dict['PORT'],
+           settings_dict['NAME'], settings_dict['USER'])
+    with _pools_lock:
+        if key not in _pools:
+            options = settings_dict.get('POOL', {})
+            _pools[key] = ConnectionPool(
+                max_size=options.get('MAX_SIZE', DEFAULT_MAX_SIZE),
+                max_lifetime=options.get('MAX_LIFETIME',
+                                         DEFAULT_MAX_LIFETIME),
+            )
+        return _pools[key]
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    @property
+    def pool(self):
+        return get_pool(self.alias, self.settings_dict)
+
+    def get_new_connection(self, conn_params):
+        entry = self.pool.checkout()
+        if entry is not None:
+            connection, self.connection_created, self.isolation_level = entry
+            options = self.settings_dict['OPTIONS']
+            if 'isolation_level' in options:
+                # DISCARD ALL may have reset it
+                connection.set_session(
+                    isolation_level=options['isolation_level'])
+            return connection
+
+        connection = super().get_new_connection(conn_params)
+        self.connection_created = time.time()
+        self.pool.record_created()
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        if self.in_atomic_block:
+            # Django keeps hold of a connection closed in an atomic block,
+            # so it mustn't be handed to anyone else
+            return super()._close()
+        with self.wrap_database_errors:
+            self.pool.checkin(self.connection, self.connection_created,
+                              self.isolation_level)
@@ -0,0 +1,97 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connections
+from django.db.backends.postgresql_psycopg2 import base as plain
+from django.test import Client
+
+from main.db.backends.postgresql_pool import base as pooled
+from main.models import User
+from main.util.benchmark import Timer, make_report, summarize, write_report
+
+username = 'benchmark_user'
+password = 'benchmark_user'
+email = 'benchmark@example.com'
+
+# cheap endpoints, where connecting is most of the work
+ENDPOINTS = [
+    ('users.session', '/users/session/', {}),
+    ('users.available', '/users/available/', {'username': username}),
+    ('projects.available', '/projects/available/', {'title': 'benchmark'}),
+]
+
+BACKENDS = [
+    ('unpooled', plain.DatabaseWrapper),
+    ('pooled', pooled.DatabaseWrapper),
+]
+
+
+class Command(BaseCommand):
+
+    args = ''
+    help = ('Time cheap API requests with and without the pooled database '
+            'backend')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200,
+                            help='requests per endpoint and backend')
+        parser.add_argument('--output', default=None,
+                            help='write the JSON report here (default: '
+                                 'stdout)')
+
+    def handle(self, *args, **kwargs):
+        default = connections['default']
+        if default.vendor != 'postgresql':
+            raise CommandError('Needs a PostgreSQL database')
+
+        self._get_user()
+        client = Client()
+        client.login(username=username, password=password)
+
+        results = []
+        try:
+            for name, wrapper_class in BACKENDS:
+                self.stderr.write(name)
+                # closed at the end of every request, as in production
+                settings_dict = dict(default.settings_dict, CONN_MAX_AGE=0)
+                wrapper = wrapper_class(settings_dict, alias='default')
+                connections['default'] = wrapper
+                try:
+                    results.append(self._run(name, client, kwargs))
+                finally:
+                    wrapper.close()
+                    if isinstance(wrapper, pooled.DatabaseWrapper):
+                        wrapper.pool.clear()
+        finally:
+            connections['default'] = default
+
+        report = make_report('db_pool', results, requests=kwargs['requests'])
+        write_report(report, kwargs['output'], self.stdout)
+
+    def _get_user(self):
+        try:
+            return User.objects.get(username=username)
+        except User.DoesNotExist:
+            user = User.objects.create_user(username=username,
+                                            password=password,
+                                            email=email)
+            user.save()
+            return user
+
+    def _run(self, name, client, kwargs):
+        samples = {endpoint: [] for endpoint, _, _ in ENDPOINTS}
+        for i in range(kwargs['requests']):
+            for endpoint, url, params in ENDPOINTS:
+                with Timer() as t:
+                    resp = client.get(url, params)
+                    # what the WSGI handler does at the end of a request
+                    # (the test client skips it)
+                    close_old_connections()
+                if resp.status_code != 200:
+                    raise CommandError('%s returned %d'
+                                       % (url, resp.status_code))
+                samples[endpoint].append(t.elapsed)
+
+        return {
+            'backend': name,
+            'endpoints': {endpoint: summarize(s)
+                          for endpoint, s in samples.items()},
+        }
@@ -0,0 +1,110 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from main.models import Theme, User
+from main.util import SiteGenerator
+from main.util.benchmark import Timer, make_report, summarize, write_report
+from main.util.fixtures import PROJECT_SIZES, SyntheticProjectBuilder
+
+username = 'benchmark_user'
+password = 'benchmark_user'
+email = 'benchmark@example.com'
+
+PHASES = [
+    'generate_site_dir',
+    'write_pages',
+    'write_posts',
+    'pelican_generate',
+    'zip_output',
+    'clone',
+]
+
+
+class Command(BaseCommand):
+
+    args = ''
+    help = 'Time site generation and cloning for synthetic projects'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='small,medium,large',
+                            help='comma separated: %s'
+                                 % ', '.join(sorted(PROJECT_SIZES)))
+        parser.add_argument('--themes', default='default',
+                            help='comma separated theme titles, or "all"')
+        parser.add_argument('--repeat', type=int, default=3,
+                            help='runs per size/theme combination')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', default=None,
+                            help='write the JSON report here (default: '
+                                 'stdout)')
+
+    def handle(self, *args, **kwargs):
+        sizes = kwargs['sizes'].split(',')
+        for size in sizes:
+            if size not in PROJECT_SIZES:
+                raise CommandError('Unknown size: %s' % size)
+
+        if kwargs['themes'] == 'all':
+            themes = list(Theme.objects.order_by('title'))
+        else:
+            titles = kwargs['themes'].split(',')
+            themes = list(Theme.objects.filter(title__in=titles)
+                          .order_by('title'))
+            if len(themes) != len(titles):
+                raise CommandError('Unknown theme in: %s' % kwargs['themes'])
+
+        user = self._get_user()
+        results = []
+        try:
+            for size in sizes:
+                for theme in themes:
+                    results.append(self._run(user, size, theme, kwargs))
+        finally:
+            user.project_set.all().delete()
+
+        report = make_report('generate', results, seed=kwargs['seed'],
+                             repeat=kwargs['repeat'])
+        write_report(report, kwargs['output'], self.stdout)
+
+    def _get_user(self):
+        try:
+            return User.objects.get(username=username)
+        except User.DoesNotExist:
+            user = User.objects.create_user(username=username,
+                                            password=password,
+                                            email=email)
+            user.save()
+            return user
+
+    def _run(self, user, size, theme, kwargs):
+        counts = PROJECT_SIZES[size]
+        builder = SyntheticProjectBuilder(seed=kwargs['seed'])
+        title = 'bench-{0}-{1}'.format(size, theme.pk)
+        with Timer() as setup:
+            project = builder.build(user, theme, title, **counts)
+
+        samples = {phase: [] for phase in PHASES}
+        for i in range(kwargs['repeat']):
+            self.stderr.write('%s/%s: run %d' % (size, theme.title, i + 1))
+            for phase, elapsed in self._time_generate(project).items():
+                samples[phase].append(elapsed)
+
+            with Timer() as t:
+                clone = project.clone('{0}-clone'.format(title), True, True,
+                                      True, True)
+            samples['clone'].append(t.elapsed)
+            clone.delete()
+
+        project.delete()
+        return {
+            'size': size,
+            'theme': theme.title,
+            'counts': counts,
+            'setup_seconds': setup.elapsed,
+            'phases': {phase: summarize(s) for phase, s in samples.items()},
+        }
+
+    def _time_generate(self, project):
+        """Run SiteGenerator.generate, returning the time for each phase."""
+        generator = SiteGenerator(project, timeout=600)
+        generator.generate()
+        return {span.name: span.elapsed for span in generator.profile.spans}
@@ -0,0 +1,107 @@
+import io
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from main.models import Theme, User
+from main.parsers import FastJSONParser
+from main.renderers import FastJSONRenderer, ujson
+from main.serializers import PageSerializer, PostSerializer
+from main.util.benchmark import Timer, make_report, summarize, write_report
+from main.util.fixtures import PROJECT_SIZES, SyntheticProjectBuilder
+
+username = 'benchmark_user'
+password = 'benchmark_user'
+email = 'benchmark@example.com'
+
+# what the list endpoints render: name -> (related set, serializer)
+ENDPOINTS = [
+    ('posts.list', 'post_set', PostSerializer),
+    ('pages.list', 'page_set', PageSerializer),
+]
+
+CODECS = [
+    ('json', JSONRenderer, JSONParser),
+    ('fast', FastJSONRenderer, FastJSONParser),
+]
+
+
+class Command(BaseCommand):
+
+    args = ''
+    help = ('Time rendering and parsing post and page lists with the '
+            'standard and the fast JSON renderer/parser')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='small,medium,large',
+                            help='comma separated: %s'
+                                 % ', '.join(sorted(PROJECT_SIZES)))
+        parser.add_argument('--theme', default='default')
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='renders/parses per size and endpoint')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', default=None,
+                            help='write the JSON report here (default: '
+                                 'stdout)')
+
+    def handle(self, *args, **kwargs):
+        sizes = kwargs['sizes'].split(',')
+        for size in sizes:
+            if size not in PROJECT_SIZES:
+                raise CommandError('Unknown size: %s' % size)
+        try:
+            theme = Theme.objects.get(title=kwargs['theme'])
+        except Theme.DoesNotExist:
+            raise CommandError('Unknown theme: %s' % kwargs['theme'])
+        if ujson is None:
+            self.stderr.write('ujson is not installed: "fast" falls back '
+                              'to the standard library')
+
+        user = self._get_user()
+        results = []
+        try:
+            for size in sizes:
+                builder = SyntheticProjectBuilder(seed=kwargs['seed'])
+                project = builder.build(user, theme, 'bench-json-%s' % size,
+                                        **PROJECT_SIZES[size])
+                for endpoint, related, serializer_class in ENDPOINTS:
+                    self.stderr.write('%s/%s' % (size, endpoint))
+                    data = serializer_class(getattr(project, related).all(),
+                                            many=True).data
+                    results.append(self._run(size, endpoint, data, kwargs))
+                project.delete()
+        finally:
+            user.project_set.filter(title__startswith='bench-json-').delete()
+
+        report = make_report('json', results, repeat=kwargs['repeat'],
+                             seed=kwargs['seed'],
+                             ujson=getattr(ujson, '__version__', None))
+        write_report(report, kwargs['output'], self.stdout)
+
+    def _get_user(self):
+        try:
+            return User.objects.get(username=username)
+        except User.DoesNotExist:
+            user = User.objects.create_user(username=username,
+                                            password=password,
+                                            email=email)
+            user.save()
+            return user
+
+    def _run(self, size, endpoint, data, kwargs):
+        result = {'size': size, 'endpoint': endpoint, 'objects': len(data)}
+        for name, renderer_class, parser_class in CODECS:
+            renderer, parser = renderer_class(), parser_class()
+            render, parse = [], []
+            for i in range(kwargs['repeat']):
+                with Timer() as t:
+                    body = renderer.render(data, 'application/json', {})
+                render.append(t.elapsed)
+                with Timer() as t:
+                    parser.parse(io.BytesIO(body), 'application/json', {})
+                parse.append(t.elapsed)
+            result['bytes'] = len(body)
+            result[name] = {'render': summarize(render),
+                            'parse': summarize(parse)}
+        return result
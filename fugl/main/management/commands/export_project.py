@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from main.models import Project
+from main.util.project_archive import export_project
+
+
+class Command(BaseCommand):
+
+    args = ''
+    help = 'Write a project to an archive that import_project can read'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='owner of the project')
+        parser.add_argument('title', help='title of the project')
+        parser.add_argument('archive', help='file to write, e.g. site.fugl.gz')
+
+    def handle(self, *args, **kwargs):
+        try:
+            project = Project.objects.select_related('theme').get(
+                owner__username=kwargs['username'],
+                title=kwargs['title'],
+            )
+        except Project.DoesNotExist:
+            raise CommandError('No project %s/%s'
+                               % (kwargs['username'], kwargs['title']))
+
+        size = 0
+        with open(kwargs['archive'], 'wb') as f:
+            for chunk in export_project(project):
+                f.write(chunk)
+                size += len(chunk)
+        self.stdout.write('Wrote %s (%d bytes)' % (kwargs['archive'], size))
@@ -0,0 +1,78 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from main.models import Theme, User
+from main.util.benchmark import Timer
+from main.util.fixtures import PROJECT_SIZES, SyntheticProjectBuilder
+
+
+class Command(BaseCommand):
+
+    args = ''
+    help = 'Create a large, deterministic dataset for scale testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--projects', type=int, default=3,
+                            help='projects per user')
+        parser.add_argument('--sizes', default='small=80,medium=18,large=2',
+                            help='project sizes and their relative weights, '
+                                 'from: %s' % ', '.join(sorted(PROJECT_SIZES)))
+        parser.add_argument('--shared', type=int, default=2,
+                            help='other users each project is shared with')
+        parser.add_argument('--theme', default='default',
+                            help='title of the theme projects use')
+        parser.add_argument('--prefix', default='load_',
+                            help='prefix for generated usernames')
+        parser.add_argument('--password', default='load',
+                            help='password for every generated user')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--clear', action='store_true',
+                            help='first delete users (and so projects) '
+                                 'left by an earlier run with this prefix')
+
+    def handle(self, *args, **kwargs):
+        weights = self._parse_sizes(kwargs['sizes'])
+        try:
+            theme = Theme.objects.get(title=kwargs['theme'])
+        except Theme.DoesNotExist:
+            raise CommandError('No theme %s' % kwargs['theme'])
+
+        existing = User.objects.filter(username__startswith=kwargs['prefix'])
+        if kwargs['clear']:
+            existing.delete()
+        elif existing.exists():
+            raise CommandError('Users starting with %s already exist; use '
+                               '--clear to replace them' % kwargs['prefix'])
+
+        builder = SyntheticProjectBuilder(seed=kwargs['seed'])
+        with Timer() as t, transaction.atomic():
+            users = builder.users(kwargs['prefix'], kwargs['users'],
+                                  kwargs['password'])
+            projects = []
+            for user in users:
+                for i in range(kwargs['projects']):
+                    size = builder.size(weights)
+                    title = 'project-{0}-{1}'.format(i, size)
+                    projects.append(builder.build(user, theme, title,
+                                                  **PROJECT_SIZES[size]))
+            accesses = builder.share(projects, users, kwargs['shared'])
+
+        self.stdout.write(
+            'Created %d users, %d projects and %d shares in %.1fs'
+            % (len(users), len(projects), len(accesses), t.elapsed)
+        )
+
+    def _parse_sizes(self, spec):
+        weights = {}
+        for item in spec.split(','):
+            name, _, weight = item.partition('=')
+            if name not in PROJECT_SIZES:
+                raise CommandError('Unknown size: %s' % name)
+            try:
+                weights[name] = float(weight or 1)
+            except ValueError:
+                raise CommandError('Bad weight for %s: %s' % (name, weight))
+        if not sum(weights.values()) > 0:
+            raise CommandError('Size weights must add up to more than 0')
+        return weights
@@ -0,0 +1,55 @@
+from os.path import isdir
+from os.path import isfile
+
+from django.core.management.base import BaseCommand, CommandError
+from pelican.settings import read_settings
+
+from main.models import Project
+from main.util.pelican_importer import DEFAULT_CATEGORY
+from main.util.pelican_importer import import_sources
+
+
+class Command(BaseCommand):
+
+    args = ''
+    help = "Import a Pelican site's content directory into a project"
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='owner of the project')
+        parser.add_argument('title', help='title of the project')
+        parser.add_argument('content_dir',
+                            help="the Pelican site's content/ directory")
+        parser.add_argument('--workers', type=int, default=None,
+                            help='processes to parse with (default: one '
+                                 'per CPU)')
+        parser.add_argument('--pelicanconf', default=None,
+                            help="the site's pelicanconf.py, for its "
+                                 'DEFAULT_CATEGORY (default: %s)'
+                                 % DEFAULT_CATEGORY)
+
+    def handle(self, *args, **kwargs):
+        if not isdir(kwargs['content_dir']):
+            raise CommandError('Content directory does not exist!')
+        try:
+            project = Project.objects.get(owner__username=kwargs['username'],
+                                          title=kwargs['title'])
+        except Project.DoesNotExist:
+            raise CommandError('No project %s/%s'
+                               % (kwargs['username'], kwargs['title']))
+
+        default_category = DEFAULT_CATEGORY
+        if kwargs['pelicanconf'] is not None:
+            if not isfile(kwargs['pelicanconf']):
+                raise CommandError('pelicanconf.py does not exist!')
+            default_category = read_settings(
+                kwargs['pelicanconf'])['DEFAULT_CATEGORY']
+
+        result = import_sources(project, kwargs['content_dir'],
+                                workers=kwargs['workers'],
+                                default_category=default_category)
+        for path, error in result.errors:
+            self.stderr.write('Skipped %s: %s' % (path, error))
+        self.stdout.write(
+            'Imported %d posts and %d pages (%d categories, %d tags)'
+            % (result.posts, result.pages, result.categories, result.tags)
+        )
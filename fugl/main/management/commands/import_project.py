@@ -0,0 +1,43 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from main.models import Theme, User
+from main.util.project_archive import import_project
+
+
+class Command(BaseCommand):
+
+    args = ''
+    help = 'Create a project from an archive written by export_project'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='who will own the new project')
+        parser.add_argument('archive', help='archive to read')
+        parser.add_argument('--title', default=None,
+                            help='title for the new project (default: the '
+                                 'archived title)')
+        parser.add_argument('--theme', default=None,
+                            help='theme to use if the archived one does not '
+                                 'exist here')
+
+    def handle(self, *args, **kwargs):
+        try:
+            owner = User.objects.get(username=kwargs['username'])
+        except User.DoesNotExist:
+            raise CommandError('No user %s' % kwargs['username'])
+
+        theme = None
+        if kwargs['theme'] is not None:
+            try:
+                theme = Theme.objects.get(title=kwargs['theme'])
+            except Theme.DoesNotExist:
+                raise CommandError('No theme %s' % kwargs['theme'])
+
+        with open(kwargs['archive'], 'rb') as f:
+            try:
+                project = import_project(f, owner, title=kwargs['title'],
+                                         theme=theme)
+            except ValidationError as e:
+                raise CommandError('; '.join(e.messages))
+        self.stdout.write('Imported %s/%s (id %d)'
+                          % (owner.username, project.title, project.id))
@@ -0,0 +1,69 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from main.util.benchmark import make_report, write_report
+from main.util.fixtures import load_username
+from main.util.loadtest import SCENARIOS, LoadTest
+
+
+class Command(BaseCommand):
+
+    args = ''
+    help = ('Load test a running server as users made by generate_load_data, '
+            'reporting latency and throughput per endpoint')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://localhost:8000/',
+                            help='root of the API')
+        parser.add_argument('--users', type=int, default=10,
+                            help='how many of the generated users to log in '
+                                 'as')
+        parser.add_argument('--prefix', default='load_',
+                            help='prefix given to generate_load_data')
+        parser.add_argument('--password', default='load',
+                            help='password given to generate_load_data')
+        parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                            help='comma separated, from: %s'
+                                 % ', '.join(SCENARIOS))
+        parser.add_argument('--concurrency', type=int, default=4,
+                            help='worker threads')
+        parser.add_argument('--duration', type=float, default=30,
+                            help='seconds to run for')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', default=None,
+                            help='write the JSON report here (default: '
+                                 'stdout)')
+
+    def handle(self, *args, **kwargs):
+        scenarios = kwargs['scenarios'].split(',')
+        for scenario in scenarios:
+            if scenario not in SCENARIOS:
+                raise CommandError('Unknown scenario: %s' % scenario)
+        if kwargs['users'] < 1 or kwargs['concurrency'] < 1:
+            raise CommandError('Need at least one user and one worker')
+
+        usernames = [load_username(kwargs['prefix'], i)
+                     for i in range(kwargs['users'])]
+        self.stderr.write('Running %s for %ss with %d workers'
+                          % (', '.join(scenarios), kwargs['duration'],
+                             kwargs['concurrency']))
+        results = LoadTest(
+            kwargs['url'],
+            usernames,
+            kwargs['password'],
+            scenarios=scenarios,
+            concurrency=kwargs['concurrency'],
+            duration=kwargs['duration'],
+            seed=kwargs['seed'],
+        ).run()
+
+        report = make_report(
+            'loadtest',
+            results,
+            url=kwargs['url'],
+            scenarios=scenarios,
+            users=kwargs['users'],
+            concurrency=kwargs['concurrency'],
+            duration=kwargs['duration'],
+            seed=kwargs['seed'],
+        )
+        write_report(report, kwargs['output'], self.stdout)
@@ -1,7 +1,10 @@
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.exceptions import ValidationError
 from django.core.management.base import BaseCommand, CommandError
 from os.path import isdir, abspath, join
 from os import listdir
 from main.models import User, Theme
+from main.util import register_theme
 
 
 class Command(BaseCommand):
@@ -39,6 +42,10 @@ class Command(BaseCommand):
 
         for name, path in themes.items():
             print('Registering theme %s.' % name)
-            theme = Theme.objects.create(title=name, filepath=path,
-                                         creator=admin_user)
-            theme.save()
+            theme = Theme(title=name, filepath=path, creator=admin_user)
+            try:
+                register_theme(theme)
+            except ValidationError as e:
+                print('Skipping theme %s: %s' % (name, '; '.join(e.messages)))
+            except SuspiciousFileOperation as e:
+                print('Skipping theme %s: %s' % (name, e))
@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from main.models import Project
+from main.util.build_queue import BuildQueue
+
+
+class Command(BaseCommand):
+
+    args = ''
+    help = ('Republish every published project whose site is out of date, '
+            'e.g. because the process that queued its rebuild restarted')
+
+    def handle(self, *args, **kwargs):
+        project_ids = list(
+            Project.objects.filter(
+                dirty=True,
+                preview_url__startswith=settings.PUBLISH_URL,
+            ).order_by('pk').values_list('pk', flat=True)
+        )
+        queue = BuildQueue()
+        rebuilt = failed = 0
+        for project_id in project_ids:
+            try:
+                if queue.rebuild(project_id) is not None:
+                    rebuilt += 1
+            except Exception as e:
+                failed += 1
+                self.stderr.write('Rebuilding project %d failed: %s'
+                                  % (project_id, e))
+        self.stdout.write('Rebuilt %d projects (%d failed)'
+                          % (rebuilt, failed))
@@ -1,12 +1,18 @@
 
-from multiprocessing.pool import ThreadPool
+import os
+import tempfile
+import time
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
-from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 from django.utils import timezone
 from tswift import Song
 
 from main.models import User, Project, Post, Page, Category, Theme
+from main.util.bulk import bulk_create_with_ids
 
 artist = 'taylor-swift'
 albums = OrderedDict([
@@ -107,6 +113,21 @@ class Command(BaseCommand):
     args = ''
     help = 'create a project for taylor swift'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8,
+                            help='lyrics to fetch at once')
+        parser.add_argument('--retries', type=int, default=3,
+                            help='times to retry a failed fetch')
+        parser.add_argument('--cache-dir', default=None,
+                            help='where fetched lyrics are kept, one '
+                                 '<song>.txt per song (default: '
+                                 'BUILD_CACHE_ROOT/tswizzle)')
+        parser.add_argument('--no-cache', action='store_true',
+                            help='always fetch, and do not keep the results')
+        parser.add_argument('--fixtures', default=None,
+                            help='read lyrics from this directory (laid out '
+                                 'like the cache) instead of the network')
+
     def _get_user(self):
         try:
             return User.objects.get(username=username)
@@ -135,31 +156,75 @@ class Command(BaseCommand):
         page.save()
         return project
 
-    def _load_lyrics(self, songdict):
-        total = []
-        for songlist in songdict.values():
-            total += songlist
-
-        pool = ThreadPool()
-        pool.map(Song.load, total)
+    def _load_lyrics(self, titles, kwargs):
+        """Return {song title: lyrics}, fetching at most --workers at once."""
+        if kwargs['fixtures'] is not None:
+            fetch = lambda title: self._read_fixture(kwargs['fixtures'], title)
+        elif kwargs['no_cache']:
+            fetch = lambda title: self._fetch(title, kwargs['retries'])
+        else:
+            cache_dir = (kwargs['cache_dir'] or
+                         os.path.join(settings.BUILD_CACHE_ROOT, 'tswizzle'))
+            fetch = lambda title: self._fetch_cached(cache_dir, title,
+                                                     kwargs['retries'])
+
+        with ThreadPoolExecutor(max_workers=kwargs['workers']) as executor:
+            return dict(zip(titles, executor.map(fetch, titles)))
+
+    def _read_fixture(self, fixtures_dir, title):
+        path = os.path.join(fixtures_dir, title + '.txt')
+        try:
+            with open(path, encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            raise CommandError('No fixture for %s: %s' % (title, path))
+
+    def _fetch_cached(self, cache_dir, title, retries):
+        path = os.path.join(cache_dir, title + '.txt')
+        if os.path.isfile(path):
+            with open(path, encoding='utf-8') as f:
+                return f.read()
+
+        lyrics = self._fetch(title, retries)
+        os.makedirs(cache_dir, exist_ok=True)
+        # write somewhere else first so a crash never leaves half a file
+        fd, tmp = tempfile.mkstemp(dir=cache_dir)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(lyrics)
+        os.replace(tmp, path)
+        return lyrics
+
+    def _fetch(self, title, retries):
+        for attempt in range(retries + 1):
+            try:
+                song = Song(artist=artist, title=title)
+                song.load()
+                return song.lyrics
+            except Exception as e:
+                if attempt == retries:
+                    raise CommandError('Could not fetch %s: %s' % (title, e))
+                time.sleep(2 ** attempt)  # back off: 1s, 2s, 4s, ...
 
     def handle(self, *args, **kwargs):
-        user = self._get_user()
-        project = self._get_project(user)
-        songdict = {a: [Song(artist=artist, title=t) for t in v]
-                    for a, v in albums.items()}
-        self._load_lyrics(songdict)
-
-        for album, songlist in songdict.items():
-            category = Category.objects.create(title=album, project=project)
-            category.save()
-            for song in songlist:
-                lyriclines = song.lyrics.splitlines()
-                lyriclines = [l + '  ' for l in lyriclines]
-                post = Post.objects.create(title=song._title,
-                                           content='\n'.join(lyriclines),
-                                           category=category,
-                                           project=project,
-                                           date_created=timezone.now(),
-                                           date_updated=timezone.now())
-                post.save()
+        titles = [t for songlist in albums.values() for t in songlist]
+        # fetch everything before touching the database
+        lyrics = self._load_lyrics(titles, kwargs)
+
+        now = timezone.now()
+        with transaction.atomic():
+            user = self._get_user()
+            project = self._get_project(user)
+            categories = bulk_create_with_ids(Category, [
+                Category(title=album, project=project) for album in albums
+            ])
+            posts = []
+            for category, songlist in zip(categories, albums.values()):
+                for title in songlist:
+                    lyriclines = [l + '  ' for l in lyrics[title].splitlines()]
+                    posts.append(Post(title=title,
+                                      content='\n'.join(lyriclines),
+                                      category=category,
+                                      project=project,
+                                      date_created=now,
+                                      date_updated=now))
+            Post.objects.bulk_create(posts)
@@ -0,0 +1,156 @@
+import hashlib
+import re
+import time
+
+from django.conf import settings
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.cache import cache
+from django.utils.cache import patch_vary_headers
+
+from main import routers
+from main.util.compression import choose_encoding
+from main.util.compression import compress
+
+
+PIN_COOKIE = 'fugl_primary'
+PIN_CACHE_PREFIX = 'fugl-primary:'
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReplicaMiddleware(object):
+    """
+    Lets safe requests read from the replicas (see main.routers), unless the
+    client wrote something in the last REPLICA_PIN_SECONDS, and pins
+    clients that write to the primary for that long.
+
+    Browsers are pinned with a cookie.  API clients often don't keep
+    cookies, so requests with an Authorization header are also pinned by
+    those credentials, in the cache (which has to be shared between
+    processes for that to work; see PRODUCTION.md).  The user isn't known
+    yet when this runs, since DRF authenticates in the view.
+
+    Goes ahead of the session middleware, so the session and user are read
+    the same way as everything else.
+    """
+
+    def process_request(self, request):
+        if (request.method in SAFE_METHODS and
+                PIN_COOKIE not in request.COOKIES and
+                not self.pinned(request)):
+            routers.use_replicas()
+        else:
+            routers.reset()
+
+    def process_response(self, request, response):
+        if routers.wrote() or request.method not in SAFE_METHODS:
+            response.set_cookie(PIN_COOKIE, '1',
+                                max_age=settings.REPLICA_PIN_SECONDS,
+                                httponly=True)
+            key = self.pin_key(request)
+            if key is not None:
+                cache.set(key, True, settings.REPLICA_PIN_SECONDS)
+        routers.reset()
+        return response
+
+    def pinned(self, request):
+        key = self.pin_key(request)
+        return key is not None and cache.get(key, False)
+
+    def pin_key(self, request):
+        authorization = request.META.get('HTTP_AUTHORIZATION')
+        if not authorization:
+            return None
+        # hashed, since basic auth credentials include the password
+        digest = hashlib.sha256(authorization.encode('utf-8')).hexdigest()
+        return PIN_CACHE_PREFIX + digest
+
+
+REFRESHED_KEY = '_fugl_refreshed'
+
+
+class ThrottledSessionMiddleware(SessionMiddleware):
+    """
+    Django's SessionMiddleware, except that a session that hasn't changed is
+    only saved (to push its expiry back) once SESSION_REFRESH_FRACTION of
+    its age has gone by since it was last saved, rather than on every
+    request.  Use it with SESSION_SAVE_EVERY_REQUEST = False.
+    """
+
+    def process_response(self, request, response):
+        session = getattr(request, 'session', None)
+        if (session is not None and session.accessed and
+                self.has_data(session)):
+            now = int(time.time())
+            if session.modified or self.needs_refresh(session, now):
+                session[REFRESHED_KEY] = now
+        return super().process_response(request, response)
+
+    def has_data(self, session):
+        # don't start sessions for anonymous visitors, or revive flushed ones
+        return any(key != REFRESHED_KEY for key in session.keys())
+
+    def needs_refresh(self, session, now):
+        interval = (session.get_expiry_age() *
+                    settings.SESSION_REFRESH_FRACTION)
+        return now - session.get(REFRESHED_KEY, 0) >= interval
+
+
+def stamp_login(sender, request, user, **kwargs):
+    """
+    user_logged_in receiver: stamp new sessions as just saved, so the first
+    request after logging in doesn't save the session again to stamp it.
+    (Logins through a view are stamped by the middleware anyway; this
+    covers the rest, like the test client's.)
+    """
+    if hasattr(request, 'session'):
+        request.session[REFRESHED_KEY] = int(time.time())
+
+
+class CompressionMiddleware(object):
+    """
+    Compresses responses of at least COMPRESSION_MIN_SIZE bytes whose type
+    is in COMPRESSION_CONTENT_TYPES, with brotli (if it's installed) or
+    gzip, whichever the client prefers.
+
+    A view whose output is cached can compress it once, when it's cached
+    (see main.util.compression.precompress), and set
+    `response.precompressed` to {encoding: body}; those bodies are sent as
+    they are, whatever the content type.
+
+    Goes first in MIDDLEWARE_CLASSES, so it sees the final response.
+    """
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        precompressed = getattr(response, 'precompressed', None)
+        if not precompressed and not self.compressible(response):
+            return response
+        if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if precompressed:
+            encoding = choose_encoding(accept_encoding, precompressed)
+            content = precompressed.get(encoding)
+        else:
+            encoding = choose_encoding(accept_encoding)
+            content = (compress(response.content, encoding)
+                       if encoding else None)
+        if content is None or len(content) >= len(response.content):
+            return response
+
+        response.content = content
+        if response.has_header('ETag'):
+            response['ETag'] = re.sub(r'"$', r';{0}"'.format(encoding),
+                                      response['ETag'])
+        response['Content-Length'] = str(len(content))
+        response['Content-Encoding'] = encoding
+        return response
+
+    def compressible(self, response):
+        content_type = response.get('Content-Type', '')
+        content_type = content_type.split(';')[0].strip().lower()
+        return content_type in settings.COMPRESSION_CONTENT_TYPES
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0020_auto_20160415_1933'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='theme',
+            name='content_hash',
+            field=models.CharField(max_length=40, blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='theme',
+            name='registered_at',
+            field=models.DateTimeField(null=True, blank=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0021_theme_registration'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Build',
+            fields=[
+                ('id', models.AutoField(auto_created=True, verbose_name='ID', primary_key=True, serialize=False)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('manifest', models.TextField(default='{}')),
+                ('project', models.ForeignKey(to='main.Project')),
+            ],
+        ),
+    ]
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0022_build'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='build',
+            name='timings',
+            field=models.TextField(default='[]'),
+        ),
+        migrations.AddField(
+            model_name='build',
+            name='profile',
+            field=models.CharField(max_length=255, blank=True, default=''),
+        ),
+    ]
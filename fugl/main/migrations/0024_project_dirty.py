@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0023_build_timings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='dirty',
+            field=models.BooleanField(default=False),
+        ),
+    ]
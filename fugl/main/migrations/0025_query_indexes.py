@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+def dedupe_project_access(apps, schema_editor):
+    """
+    Keep one ProjectAccess per (user, project), preferring one that can
+    edit, so the unique constraint can be added without anyone losing
+    access.
+    """
+    ProjectAccess = apps.get_model('main', 'ProjectAccess')
+    accesses = (ProjectAccess.objects
+                .order_by('user', 'project', '-can_edit', 'id')
+                .values_list('id', 'user', 'project'))
+    seen = set()
+    duplicates = []
+    for pk, user, project in accesses.iterator():
+        if (user, project) in seen:
+            duplicates.append(pk)
+        else:
+            seen.add((user, project))
+    for i in range(0, len(duplicates), 1000):
+        ProjectAccess.objects.filter(pk__in=duplicates[i:i + 1000]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0024_project_dirty'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='post',
+            index_together=set([('project', 'date_updated'),
+                                ('project', 'category')]),
+        ),
+        migrations.RunPython(dedupe_project_access,
+                             migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='projectaccess',
+            unique_together=set([('user', 'project')]),
+        ),
+    ]
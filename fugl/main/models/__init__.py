@@ -1,3 +1,5 @@
+from .api_token import ApiToken
+from .build import Build
 from .category import Category
 from .page import Page
 from .page_plugin import PagePlugin
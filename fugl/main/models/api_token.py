@@ -0,0 +1,48 @@
+"""
+An API token: what clients send instead of a password once they've logged in.
+"""
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+
+from .user import User
+
+
+class ApiToken(models.Model):
+    """
+    Only a SHA-256 digest of the token is stored.  Tokens are long and
+    random, so unlike passwords they don't need a slow hash.
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    digest = models.CharField(max_length=64, unique=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    @classmethod
+    def issue(cls, user):
+        """
+        Create a token for `user`.  Returns (ApiToken, token).
+
+        Every login issues a new token, so expired ones are deleted here
+        to keep the table from growing without bound.
+        """
+        cls.expired().delete()
+        token = get_random_string(40)
+        return cls.objects.create(user=user, digest=cls.hash(token)), token
+
+    @classmethod
+    def expired(cls):
+        """Tokens older than API_TOKEN_AGE, which no longer authenticate."""
+        return cls.objects.filter(created__lte=cls.oldest())
+
+    @staticmethod
+    def oldest():
+        return timezone.now() - timedelta(seconds=settings.API_TOKEN_AGE)
+
+    @staticmethod
+    def hash(token):
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
@@ -0,0 +1,40 @@
+"""
+A record of one site build, and the files it produced.
+"""
+import json
+
+from django.db import models
+
+from .project import Project
+
+
+class Build(models.Model):
+
+    project = models.ForeignKey(Project, on_delete=models.CASCADE)
+    created = models.DateTimeField(auto_now_add=True)
+    # JSON object mapping output path -> SHA-1 of the file's content
+    manifest = models.TextField(default='{}')
+    # JSON list of the build's phase spans (see main.util.build_profile)
+    timings = models.TextField(default='[]')
+    # path to the cProfile stats, if this build was profiled
+    profile = models.CharField(max_length=255, blank=True, default='')
+
+    def get_manifest(self):
+        return json.loads(self.manifest)
+
+    def get_timings(self):
+        return json.loads(self.timings)
+
+    def set_manifest(self, manifest):
+        self.manifest = json.dumps(manifest, sort_keys=True)
+
+    def diff(self, manifest):
+        """
+        Compare this build's manifest with a newer one.  Returns (changed,
+        deleted): paths that were added or changed, and paths that are gone.
+        """
+        old = self.get_manifest()
+        changed = sorted(path for path, digest in manifest.items()
+                         if old.get(path) != digest)
+        deleted = sorted(path for path in old if path not in manifest)
+        return changed, deleted
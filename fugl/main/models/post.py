@@ -5,6 +5,11 @@ from main.models import Category
 
 
 class Post(models.Model):
+    class Meta:
+        # a project's posts by date, and by category
+        index_together = (('project', 'date_updated'),
+                          ('project', 'category'))
+
     title = models.CharField(max_length=50)
     content = models.TextField(max_length=50000)
     date_created = models.DateTimeField()
@@ -16,6 +16,51 @@ def validate_project(value):
         raise ValidationError('Not letters, digits, and -/_.', code='invalid')
 
 
+class ProjectQuerySet(models.QuerySet):
+
+    def visible_to(self, user):
+        """
+        The projects `user` owns or has been given access to, each with a
+        `user_can_edit` attribute, in one query.
+        """
+        # "owner = x OR id IN (...)" can't use an index on PostgreSQL, but
+        # a UNION of two index lookups can
+        project = self.model._meta.db_table
+        access = self.model.users.through._meta.db_table
+        sql = (
+            '{project}.id IN (SELECT id FROM {project} WHERE owner_id = %s'
+            ' UNION SELECT project_id FROM {access} WHERE user_id = %s)'
+        ).format(project=project, access=access)
+        visible = self.extra(where=[sql], params=[user.pk, user.pk])
+        return visible.with_can_edit(user)
+
+    def owned_by(self, user):
+        return self.filter(owner=user).with_can_edit(user)
+
+    def shared_with(self, user):
+        return self.filter(pk__in=self._shared_ids(user)).with_can_edit(user)
+
+    def with_can_edit(self, user):
+        """
+        Select whether `user` can edit each project as `user_can_edit`,
+        rather than asking UserAccess once per project.
+        """
+        project = self.model._meta.db_table
+        access = self.model.users.through._meta.db_table
+        sql = (
+            '{project}.owner_id = %s OR EXISTS ('
+            'SELECT 1 FROM {access} WHERE {access}.project_id = {project}.id'
+            ' AND {access}.user_id = %s AND {access}.can_edit)'
+        ).format(project=project, access=access)
+        return self.extra(select={'user_can_edit': sql},
+                          select_params=(user.pk, user.pk))
+
+    def _shared_ids(self, user):
+        # a subquery rather than a join, so there's one row per project
+        access = self.model.users.through.objects.filter(user=user)
+        return access.values('project_id')
+
+
 class Project(models.Model):
     """
     Represents a project: a static website
@@ -29,6 +74,8 @@ class Project(models.Model):
                              validators=[validate_project])
     description = models.CharField(max_length=1000)
     preview_url = models.URLField()
+    # set when content changes after the site was published; see main.signals
+    dirty = models.BooleanField(default=False)
 
     owner = models.ForeignKey(User)
     theme = models.ForeignKey('Theme')
@@ -36,21 +83,39 @@ class Project(models.Model):
     users = models.ManyToManyField(User, through='ProjectAccess',
         related_name='shared_projects')
 
+    objects = ProjectQuerySet.as_manager()
+
     @property
     def project_home_url(self):
         return '/project/{0}/{1}'.format(self.owner.username, self.title)
 
-    def get_pelican_conf(self, content_path='content'):
-        """Returns pelicanconf correspnding to this Project."""
+    def get_pelican_conf(self, content_path='content', site_url='',
+                         bytecode_cache_dir=None, theme=None):
+        """
+        Returns pelicanconf correspnding to this Project.
+
+        `site_url` is where the site will be served from ('' for relative).
+        If `bytecode_cache_dir` is given, Pelican is told to keep its compiled
+        templates there, so they can be reused across builds.  `theme` is
+        the theme's resolved directory (default: its filepath as it is).
+        """
         project_plugins = self.projectplugin_set.all()
         project_plugins_str = [{'markup': p.markup} for p in project_plugins]
         template_args = {
             'author': self.owner.username,
             'site_name': self.title,
+            'site_url': site_url,
             'content_path': content_path,
-            'theme': self.theme.filepath,
+            'theme': theme if theme is not None else self.theme.filepath,
             'project_plugins_str': str(project_plugins_str),
+            'jinja_environment': '',
         }
+        if bytecode_cache_dir is not None:
+            template_args['jinja_environment'] = (
+                jinja_environment_template % {
+                    'bytecode_cache_dir': repr(bytecode_cache_dir),
+                }
+            )
         return pelicanconf_template % template_args
 
     def clone(self, newtitle, theme, pages, posts, plugins):
@@ -109,7 +174,7 @@ from __future__ import unicode_literals
 
 AUTHOR = '%(author)s'
 SITENAME = '%(site_name)s'
-SITEURL = ''
+SITEURL = '%(site_url)s'
 THEME = '%(theme)s'
 
 PATH = '%(content_path)s'
@@ -140,4 +205,16 @@ PROJECT_PLUGINS = %(project_plugins_str)s
 
 PLUGIN_PATHS = ['.']
 PLUGINS = ['page_plugins']
+%(jinja_environment)s"""
+
+
+jinja_environment_template = """
+from jinja2 import FileSystemBytecodeCache
+
+JINJA_ENVIRONMENT = {
+    'trim_blocks': True,
+    'lstrip_blocks': True,
+    'extensions': [],
+    'bytecode_cache': FileSystemBytecodeCache(%(bytecode_cache_dir)s),
+}
 """
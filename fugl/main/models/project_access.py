@@ -5,6 +5,8 @@ from .user import User
 
 
 class ProjectAccess(models.Model):
+    class Meta:
+        unique_together = (('user', 'project'),)
 
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     project = models.ForeignKey(Project, on_delete=models.CASCADE)
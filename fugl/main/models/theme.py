@@ -7,6 +7,10 @@ class Theme(models.Model):
     filepath = models.FilePathField()
     body_markup = models.CharField(max_length=5000)
 
+    # Filled in by main.util.theme_registry.register_theme
+    content_hash = models.CharField(max_length=40, blank=True, default='')
+    registered_at = models.DateTimeField(null=True, blank=True)
+
     creator = models.ForeignKey(User)
 
     def __str__(self):
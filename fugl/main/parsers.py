@@ -0,0 +1,48 @@
+"""
+A faster JSON parser for the API; see main.renderers.
+
+ujson decodes escaped lone surrogates ("\\ud800") to nothing and rejects
+integers over 64 bits, where the standard library keeps them, so bodies
+with surrogate escapes, and anything ujson rejects, are parsed with the
+standard library instead.
+"""
+import json
+import re
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from .renderers import FastJSONRenderer
+from .renderers import ujson
+
+
+SURROGATE_ESCAPE = re.compile(r'\\u[dD][89a-fA-F]')
+
+
+class FastJSONParser(JSONParser):
+
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if ujson is None:
+            return super().parse(stream, media_type, parser_context)
+
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        try:
+            data = stream.read().decode(encoding)
+        except ValueError as exc:
+            raise ParseError('JSON parse error - %s' % exc)
+
+        if not SURROGATE_ESCAPE.search(data):
+            try:
+                return ujson.loads(data)
+            except ValueError:
+                pass
+        # the standard library is a little more lenient, and its errors are
+        # what clients already get
+        try:
+            return json.loads(data)
+        except ValueError as exc:
+            raise ParseError('JSON parse error - %s' % exc)
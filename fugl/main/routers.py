@@ -0,0 +1,75 @@
+"""
+Database routing for read replicas.
+
+Reads are only sent to a replica (one of settings.DATABASE_REPLICAS,
+picked at random) while ReplicaMiddleware says it's safe: during a GET,
+HEAD or OPTIONS request from a client that hasn't written anything
+recently.  Everything else -- writes, other requests, management commands,
+the build queue's thread -- uses the primary ('default') database.
+
+Sessions always use the primary.  Once anything else is written, the rest
+of the request reads from the primary too, and the middleware pins the
+client to the primary for a while (see REPLICA_PIN_SECONDS) so it can read
+its own writes despite replica lag.
+"""
+import random
+import threading
+
+from django.conf import settings
+
+
+PRIMARY = 'default'
+
+_state = threading.local()
+
+
+def use_replicas():
+    """Let reads on this thread go to a replica, if there are any."""
+    _state.replicas = True
+    _state.wrote = False
+
+
+def use_primary():
+    """Send this thread's reads back to the primary."""
+    _state.replicas = False
+
+
+def reset():
+    _state.replicas = False
+    _state.wrote = False
+
+
+def wrote():
+    """Whether this thread has written anything since use_replicas()."""
+    return getattr(_state, 'wrote', False)
+
+
+class ReplicaRouter(object):
+
+    def db_for_read(self, model, **hints):
+        replicas = getattr(settings, 'DATABASE_REPLICAS', ())
+        if (replicas and getattr(_state, 'replicas', False) and
+                not is_session(model)):
+            return random.choice(replicas)
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        # sessions are saved on every request and always read from the
+        # primary, so they don't need pinning
+        if not is_session(model):
+            # read-your-writes for the rest of the request
+            _state.replicas = False
+            _state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model=None, **hints):
+        # replicas get their schema from the primary
+        return db == PRIMARY
+
+
+def is_session(model):
+    return model._meta.app_label == 'sessions'
@@ -1,3 +1,4 @@
+from .build import BuildSerializer
 from .category import CategorySerializer
 from .page import PageSerializer
 from .page_plugin import PagePluginSerializer
@@ -0,0 +1,19 @@
+from rest_framework import serializers
+
+from main.models import Build
+
+
+class BuildSerializer(serializers.ModelSerializer):
+
+    timings = serializers.SerializerMethodField()
+    profiled = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Build
+        fields = ['id', 'project', 'created', 'timings', 'profiled']
+
+    def get_timings(self, build):
+        return build.get_timings()
+
+    def get_profiled(self, build):
+        return bool(build.profile)
@@ -0,0 +1,85 @@
+"""
+A fast path for serializing lists of simple models.
+
+A ModelSerializer builds a model instance for every row and then asks each
+of its fields for a value.  For serializers whose fields are all plain
+model fields or primary key relations, the same output can be had from
+values_list() tuples, using the serializer's own fields' to_representation
+(worked out once per serializer class) to convert each column.
+"""
+import threading
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.relations import RelatedField
+from rest_framework.serializers import ReturnList
+
+
+_plans = {}
+_plans_lock = threading.Lock()
+
+
+def get_plan(serializer_class):
+    """
+    [(key, column, converter or None)] for each field `serializer_class`
+    outputs, or None if any of them needs a model instance.
+    """
+    with _plans_lock:
+        if serializer_class not in _plans:
+            _plans[serializer_class] = make_plan(serializer_class)
+        return _plans[serializer_class]
+
+
+def make_plan(serializer_class):
+    serializer = serializer_class()
+    model = serializer.Meta.model
+    plan = []
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if len(field.source_attrs) != 1:
+            return None  # source='*' or a dotted path
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            return None  # a property, method, or reverse relation
+        if model_field.many_to_many or model_field.one_to_many:
+            return None
+
+        if isinstance(field, PrimaryKeyRelatedField):
+            if field.pk_field is not None:
+                return None
+            # values_list() gives the related object's pk, which is what
+            # the field would output
+            plan.append((field.field_name, field.source, None))
+        elif isinstance(field, RelatedField) or model_field.is_relation:
+            return None
+        else:
+            plan.append((field.field_name, field.source,
+                         field.to_representation))
+    return plan
+
+
+def list_data(serializer_class, queryset):
+    """
+    What serializer_class(queryset, many=True).data would be, without
+    building model instances when the serializer allows it.
+    """
+    plan = get_plan(serializer_class)
+    if plan is None:
+        return serializer_class(queryset, many=True).data
+
+    keys = [key for key, _, _ in plan]
+    converters = [converter for _, _, converter in plan]
+    data = []
+    for row in queryset.values_list(*[column for _, column, _ in plan]):
+        item = OrderedDict()
+        for key, converter, value in zip(keys, converters, row):
+            # like Serializer.to_representation, None is passed through
+            if value is not None and converter is not None:
+                value = converter(value)
+            item[key] = value
+        data.append(item)
+    # the browsable API looks at the serializer
+    return ReturnList(data, serializer=serializer_class(many=True))
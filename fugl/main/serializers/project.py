@@ -1,8 +1,17 @@
+from collections import OrderedDict
+
 from rest_framework import serializers
 
 from main.models import Project
 from main.util import UserAccess
 
+from .category import CategorySerializer
+from .page import PageSerializer
+from .page_plugin import PagePluginSerializer
+from .post import PostSerializer
+from .project_plugin import ProjectPluginSerializer
+from .tag import TagSerializer
+
 
 class ProjectSerializer(serializers.ModelSerializer):
 
@@ -24,6 +33,12 @@ class ProjectPermissionSerializer(ProjectSerializer):
 
     def to_representation(self, project):
         d = super().to_representation(project)
+        # set by Project.objects.visible_to() and friends
+        can_edit = getattr(project, 'user_can_edit', None)
+        if can_edit is not None:
+            d['can_edit'] = bool(can_edit)
+            return d
+
         try:
             user = self.context['user']
             user_proxy = UserAccess(user)
@@ -37,9 +52,52 @@ class ProjectPermissionSerializer(ProjectSerializer):
         return d
 
 
+# What ProjectDetailSerializer can nest, by ?include= name: a list of
+# (response key, related set, serializer, lookups to prefetch).
+INCLUDES = OrderedDict([
+    ('posts', [('posts', 'post_set', PostSerializer, ['post_set'])]),
+    ('pages', [('pages', 'page_set', PageSerializer, ['page_set'])]),
+    ('categories', [
+        ('categories', 'category_set', CategorySerializer, ['category_set']),
+    ]),
+    ('tags', [('tags', 'tag_set', TagSerializer, ['tag_set__posts'])]),
+    ('plugins', [
+        ('project_plugins', 'projectplugin_set', ProjectPluginSerializer,
+         ['projectplugin_set']),
+        ('page_plugins', 'pageplugin_set', PagePluginSerializer,
+         ['pageplugin_set']),
+    ]),
+])
+
+
 class ProjectDetailSerializer(ProjectSerializer):
+    """
+    A project with the ids of its content, plus the content itself for each
+    name in context['include'] (see INCLUDES).
+    """
 
     class Meta(ProjectSerializer.Meta):
         fields = ProjectSerializer.Meta.fields + [
             'post_set', 'page_set', 'category_set', 'tag_set',
         ]
+
+    @staticmethod
+    def prefetch(queryset, include=()):
+        """
+        Prefetch everything the serializer will read, so serializing a
+        project takes the same number of queries however big it is.
+        """
+        lookups = ['post_set', 'page_set', 'category_set', 'tag_set']
+        for name in include:
+            for _, _, _, prefetch in INCLUDES[name]:
+                lookups.extend(l for l in prefetch if l not in lookups)
+        return queryset.select_related('owner', 'theme').prefetch_related(
+            *lookups)
+
+    def to_representation(self, project):
+        d = super().to_representation(project)
+        for name in self.context.get('include', ()):
+            for key, related, serializer_class, _ in INCLUDES[name]:
+                d[key] = serializer_class(getattr(project, related).all(),
+                                          many=True).data
+        return d
@@ -1,6 +1,10 @@
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.exceptions import ValidationError
 from rest_framework import serializers
 
 from main.models import Theme
+from main.util.theme_registry import validate_theme
+from main.util.themes import theme_path
 
 
 class ThemeSerializer(serializers.ModelSerializer):
@@ -9,7 +13,20 @@ class ThemeSerializer(serializers.ModelSerializer):
         model = Theme
         fields = [
             'id', 'title', 'filepath', 'body_markup', 'creator',
+            'content_hash', 'registered_at',
         ]
+        read_only_fields = ['content_hash', 'registered_at']
         extra_kwargs = {
             'filepath': {'allow_blank': True},
         }
+
+    def validate_filepath(self, value):
+        if value:
+            try:
+                validate_theme(theme_path(value))
+            except SuspiciousFileOperation:
+                raise serializers.ValidationError(
+                    'Themes must be under THEMES_ROOT.')
+            except ValidationError as e:
+                raise serializers.ValidationError(e.messages)
+        return value
@@ -0,0 +1,38 @@
+"""
+Session storage: the database, with a write-through cache in front.
+
+This is Django's cached_db backend, except that cached copies are only
+trusted for SESSION_CACHE_TIMEOUT seconds rather than until the session
+expires.  With a per-process cache, a logout or a change made by another
+worker is seen here within that time, while most requests still never touch
+django_session.
+"""
+from django.conf import settings
+from django.contrib.sessions.backends import cached_db
+
+
+class SessionStore(cached_db.SessionStore):
+
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        self._cache = TimeoutCappedCache(self._cache,
+                                         settings.SESSION_CACHE_TIMEOUT)
+
+
+class TimeoutCappedCache(object):
+    """A cache whose entries never outlive `max_timeout` seconds."""
+
+    def __init__(self, cache, max_timeout):
+        self.cache = cache
+        self.max_timeout = max_timeout
+
+    def set(self, key, value, timeout=None):
+        if timeout is None or timeout > self.max_timeout:
+            timeout = self.max_timeout
+        return self.cache.set(key, value, timeout)
+
+    def __contains__(self, key):
+        return key in self.cache
+
+    def __getattr__(self, name):
+        return getattr(self.cache, name)
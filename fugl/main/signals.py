@@ -0,0 +1,147 @@
+"""
+Keeps published sites up to date.
+
+Saving or deleting anything that ends up in a site (or changing which tags
+and plugins a post or page has) marks its project dirty, and, if the project
+has been published, queues a rebuild so the published copy catches up
+without the request that made the change waiting for it.  Renaming a
+published project rebuilds it (sites are published under the project's id,
+so nothing moves), deleting one removes its site, and deleting a build
+(trimmed from the history, or along with its project) removes its profile.
+
+Not about sites: logging in stamps the session for
+ThrottledSessionMiddleware.
+"""
+import os
+import threading
+
+from django.conf import settings
+from django.contrib.auth.signals import user_logged_in
+from django.db.models.signals import m2m_changed
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+from django.db.models.signals import pre_delete
+from django.db.models.signals import pre_save
+
+from main.middleware import stamp_login
+from main.models import Build
+from main.models import Category
+from main.models import Page
+from main.models import PagePlugin
+from main.models import Post
+from main.models import Project
+from main.models import ProjectPlugin
+from main.models import Tag
+from main.util import get_build_queue
+from main.util import get_debouncer
+from main.util import unpublish
+
+
+CONTENT_MODELS = (Category, Page, PagePlugin, Post, ProjectPlugin, Tag)
+CONTENT_RELATIONS = (Page.post_plugins, Post.post_plugins, Post.tags,
+                     Tag.posts)
+
+
+def connect():
+    for model in CONTENT_MODELS:
+        post_save.connect(content_changed, sender=model,
+                          dispatch_uid='content_saved')
+        post_delete.connect(content_changed, sender=model,
+                            dispatch_uid='content_deleted')
+    for relation in CONTENT_RELATIONS:
+        m2m_changed.connect(relation_changed, sender=relation.through,
+                            dispatch_uid='relation_changed')
+    pre_save.connect(project_saving, sender=Project,
+                     dispatch_uid='project_saving')
+    post_save.connect(project_saved, sender=Project,
+                      dispatch_uid='project_saved')
+    pre_delete.connect(project_deleting, sender=Project,
+                       dispatch_uid='project_deleting')
+    post_delete.connect(project_deleted, sender=Project,
+                        dispatch_uid='project_deleted')
+    post_delete.connect(build_deleted, sender=Build,
+                        dispatch_uid='build_deleted')
+    user_logged_in.connect(stamp_login, dispatch_uid='stamp_login')
+
+
+def content_changed(sender, instance, **kwargs):
+    mark_dirty(instance.project_id)
+
+
+def relation_changed(sender, instance, action, **kwargs):
+    # both ends of every relation belong to the same project
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        mark_dirty(instance.project_id)
+
+
+def project_saving(sender, instance, raw=False, update_fields=None,
+                   **kwargs):
+    fields = update_fields if update_fields is not None else {'title'}
+    if raw or instance.pk is None or 'title' not in fields:
+        return
+    try:
+        old = Project.objects.get(pk=instance.pk)
+    except Project.DoesNotExist:
+        return
+    # only note it here: if the save fails, nothing has changed
+    instance._renamed = is_published(old) and old.title != instance.title
+
+
+def project_saved(sender, instance, **kwargs):
+    if getattr(instance, '_renamed', False):
+        del instance._renamed
+        # the title is all over the site
+        mark_dirty(instance.pk)
+
+
+def project_deleting(sender, instance, **kwargs):
+    # the project's content is deleted before it is; see mark_dirty()
+    deleting_projects().add(instance.pk)
+
+
+def project_deleted(sender, instance, **kwargs):
+    deleting_projects().discard(instance.pk)
+    if is_published(instance):
+        unpublish(instance)
+
+
+def build_deleted(sender, instance, **kwargs):
+    if instance.profile:
+        try:
+            os.remove(instance.profile)
+        except FileNotFoundError:
+            pass
+
+
+def is_published(project):
+    return project.preview_url.startswith(settings.PUBLISH_URL)
+
+
+_deleting = threading.local()
+
+
+def deleting_projects():
+    """Ids of the projects this thread is deleting."""
+    try:
+        return _deleting.ids
+    except AttributeError:
+        _deleting.ids = set()
+        return _deleting.ids
+
+
+def mark_dirty(project_id):
+    """
+    Flag the project's published site as out of date and queue a rebuild.
+    Projects that were never published have nothing to go stale, and
+    neither do ones being deleted (whose content goes first, one row at a
+    time).
+    """
+    if project_id in deleting_projects():
+        return
+    published = Project.objects.filter(
+        pk=project_id,
+        preview_url__startswith=settings.PUBLISH_URL,
+    )
+    if published.update(dirty=True):
+        get_debouncer().touch(project_id)
+        get_build_queue().enqueue(project_id)
@@ -0,0 +1,106 @@
+import os
+import tempfile
+
+from django.test import override_settings
+
+from main.models import Build
+
+from ..base import FuglViewTestCase
+
+
+class BuildTestCase(FuglViewTestCase):
+
+    generate_url = '/projects/{pk}/generate/'
+    _url = '/builds/{pk}/'
+    _profile_url = '/builds/{pk}/profile/'
+
+    def setUp(self):
+        super().setUp()
+
+        self.cache_root = tempfile.TemporaryDirectory()
+        self.settings = override_settings(
+            BUILD_CACHE_ROOT=self.cache_root.name,
+        )
+        self.settings.enable()
+
+        self.project = self.create_project('simple', owner=self.admin_user)
+        self.page = self.create_page('my-page', content='this is a page',
+            project=self.project)
+        self.other_user = self.create_user('other')
+        self.login(user=self.admin_user)
+
+    def tearDown(self):
+        self.page.delete()
+        self.project.delete()
+        self.other_user.delete()
+        self.settings.disable()
+        self.cache_root.cleanup()
+
+        super().tearDown()
+
+    def generate(self, **params):
+        url = self.generate_url.format(pk=self.project.id)
+        resp = self.client.get(url, params)
+        self.assertEqual(resp.status_code, 201)
+        return Build.objects.get(pk=int(resp['X-Fugl-Build']))
+
+    def test_build_has_timings(self):
+        build = self.generate()
+
+        resp = self.client.get(self._url.format(pk=build.id))
+        self.assertEqual(resp.status_code, 200)
+        spans = {span['name']: span for span in resp.data['timings']}
+        for name in ['generate_site_dir', 'write_pages', 'write_posts',
+                     'pelican_generate', 'zip_output']:
+            self.assertIn(name, spans)
+            self.assertIn('queries', spans[name])
+        self.assertEqual(spans['write_pages']['files'], 1)
+        self.assertGreater(spans['zip_output']['bytes'], 0)
+        self.assertFalse(resp.data['profiled'])
+
+    def test_list(self):
+        self.generate()
+        self.generate()
+
+        resp = self.client.get('/builds/', {'project': self.project.id})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.data), 2)
+
+    def test_retrieve_no_access(self):
+        build = self.generate()
+        self.login(user=self.other_user, password='other')
+
+        resp = self.client.get(self._url.format(pk=build.id))
+        self.assertEqual(resp.status_code, 404)
+
+    def test_profile_ignored_for_non_staff(self):
+        build = self.generate(profile=1)
+        self.assertEqual(build.profile, '')
+
+        resp = self.client.get(self._profile_url.format(pk=build.id))
+        self.assertEqual(resp.status_code, 404)
+
+    def test_profile_for_staff(self):
+        self.admin_user.is_staff = True
+        self.admin_user.save()
+
+        build = self.generate(profile=1)
+        self.assertTrue(build.profile)
+
+        resp = self.client.get(self._profile_url.format(pk=build.id))
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn('build_{0}.prof'.format(build.id),
+                      resp['Content-Disposition'])
+
+    def test_trimmed_profile_deleted(self):
+        self.admin_user.is_staff = True
+        self.admin_user.save()
+
+        with override_settings(BUILD_HISTORY=1):
+            first = self.generate(profile=1)
+            self.assertTrue(os.path.isfile(first.profile))
+            second = self.generate(profile=1)
+
+        self.assertFalse(Build.objects.filter(pk=first.pk).exists())
+        self.assertFalse(os.path.exists(first.profile))
+        self.assertTrue(os.path.isfile(second.profile))
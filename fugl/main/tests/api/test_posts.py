@@ -1,4 +1,8 @@
 import json
+import os
+import tempfile
+
+from django.test import override_settings
 
 from ..base import FuglViewTestCase
 
@@ -409,3 +413,108 @@ class DeletePostTestCase(FuglViewTestCase):
         resp = self.client.delete(url)
         self.assertEqual(resp.status_code, 404)
         self.assertEqual(self.project.post_set.count(), posts)
+
+
+class PreviewPostTestCase(FuglViewTestCase):
+
+    _url = '/posts/{pk}/preview/'
+
+    def setUp(self):
+        super().setUp()
+
+        self.project = self.create_project('project', owner=self.admin_user)
+        self.post = self.create_post('my-post', 'some **bold** content',
+            project=self.project)
+
+        self.other_user = self.create_user('other')
+        self.other_project = self.create_project('other',
+            owner=self.other_user)
+        self.other_post = self.create_post('other-post', 'content',
+            project=self.other_project)
+
+        self.login(user=self.admin_user)
+
+    def tearDown(self):
+        self.other_post.delete()
+        self.other_project.delete()
+        self.other_user.delete()
+        self.post.delete()
+        self.project.delete()
+
+        super().tearDown()
+
+    def test_preview(self):
+        resp = self.client.get(self._url.format(pk=self.post.id))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp['Content-Type'], 'text/html')
+
+        html = resp.content.decode('utf-8')
+        self.assertIn(self.post.title, html)
+        self.assertIn('<strong>bold</strong>', html)
+
+    def test_preview_sandboxed(self):
+        self.post.content = '<script>alert(document.cookie)</script>'
+        self.post.save()
+        resp = self.client.get(self._url.format(pk=self.post.id))
+        self.assertIn('<script>', resp.content.decode('utf-8'))
+        self.assertEqual(resp['Content-Security-Policy'], 'sandbox')
+        self.assertEqual(resp['X-Content-Type-Options'], 'nosniff')
+
+    def test_preview_reflects_edits(self):
+        url = self._url.format(pk=self.post.id)
+        first = self.client.get(url).content
+        self.assertEqual(self.client.get(url).content, first)
+
+        self.post.content = 'different content'
+        self.post.save()
+        resp = self.client.get(url)
+        self.assertIn('different content', resp.content.decode('utf-8'))
+
+    def test_preview_reflects_template_edits(self):
+        self.check_template_edits()
+
+    def test_preview_reflects_edits_after_registration(self):
+        # the stored hash doesn't change when the files do
+        self.check_template_edits(content_hash='0' * 40)
+
+    def check_template_edits(self, **kwargs):
+        with tempfile.TemporaryDirectory() as theme_dir, \
+                tempfile.TemporaryDirectory() as cache_dir, \
+                override_settings(BUILD_CACHE_ROOT=cache_dir,
+                                  THEMES_ROOT=tempfile.gettempdir()):
+            os.makedirs(os.path.join(theme_dir, 'templates'))
+            template = os.path.join(theme_dir, 'templates', 'article.html')
+            with open(template, 'w') as f:
+                f.write('<h1>{{ article.title }}</h1>')
+            theme = self.create_theme('edited', '', filepath=theme_dir,
+                                      **kwargs)
+            self.project.theme = theme
+            self.project.save()
+
+            url = self._url.format(pk=self.post.id)
+            self.assertEqual(self.client.get(url).content, b'<h1>my-post</h1>')
+            with open(template, 'w') as f:
+                f.write('<h2 class="edited">{{ article.title }}</h2>')
+            self.assertEqual(self.client.get(url).content,
+                             b'<h2 class="edited">my-post</h2>')
+
+            self.project.theme = self.default_theme
+            self.project.save()
+            theme.delete()
+
+    def test_preview_with_view_access(self):
+        access = self.create_access(self.admin_user, self.other_project,
+            can_edit=False)
+
+        resp = self.client.get(self._url.format(pk=self.other_post.id))
+        self.assertEqual(resp.status_code, 200)
+
+        access.delete()
+
+    def test_preview_with_no_access(self):
+        resp = self.client.get(self._url.format(pk=self.other_post.id))
+        self.assertEqual(resp.status_code, 404)
+
+    def test_preview_non_existent(self):
+        resp = self.client.get(self._url.format(pk=-1))
+        self.assertEqual(resp.status_code, 404)
@@ -1,10 +1,27 @@
+import gzip
+import io
 import json
+import os
+import tempfile
+import zipfile
+from unittest import mock
 from unittest import skip
 
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import IntegrityError
+from django.db import connection
+from django.db import transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from main.models import Build
 from main.models import Project
 from main.models import ProjectAccess
 from main.models import User
 from main.util import UserAccess
+from main.util.site_generator import DELTA_FILENAME
+from main.util.site_generator import publish_dir
+from main.util.site_generator import publish_url
 
 from ..base import FuglViewTestCase
 
@@ -97,6 +114,26 @@ class ProjectViewSetTestCase(FuglViewTestCase):
             else:
                 self.assertEqual(project['can_edit'], True)
 
+    def test_projects_index_query_count_is_fixed(self):
+        url_queries = {}
+        for url in [self.url, self.owned_url, self.shared_url]:
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(url)
+            url_queries[url] = len(queries)
+
+        for i in range(5):
+            project = Project.objects.create(title='more%d' % i,
+                description='', theme=self.default_theme,
+                owner=self.other_user)
+            ProjectAccess.objects.create(user=self.user, project=project,
+                can_edit=bool(i % 2))
+
+        for url in [self.url, self.owned_url, self.shared_url]:
+            with CaptureQueriesContext(connection) as queries:
+                resp = self.client.get(url)
+            self.assertEqual(len(queries), url_queries[url], url)
+        self.assertEqual(len(resp.data), 7)
+
     def test_project_update_for_owned(self):
         old_title = self.owned_project.title
 
@@ -405,6 +442,69 @@ class RetrieveProjectTestCase(FuglViewTestCase):
         [page.delete() for page in self.project.page_set.all()]
         [post.delete() for post in self.project.post_set.all()]
 
+    def add_content(self, count):
+        category = self.create_category('cat%d' % count, project=self.project)
+        for i in range(count):
+            post = self.create_post('post%d-%d' % (count, i), 'content',
+                project=self.project, category=category)
+            tag = self.create_tag('tag%d-%d' % (count, i),
+                project=self.project)
+            tag.posts.add(post)
+            self.create_page('page%d-%d' % (count, i), content='content',
+                project=self.project)
+            self.create_page_plugin('pp%d-%d' % (count, i),
+                project=self.project)
+            self.create_project_plugin('prp%d-%d' % (count, i),
+                project=self.project)
+
+    def test_include(self):
+        self.add_content(2)
+        url = self.url.format(pk=self.project.id)
+        resp = self.client.get(url, {
+            'include': 'posts,pages,categories,tags,plugins',
+        })
+        self.assertEqual(resp.status_code, 200)
+
+        data = resp.data
+        self.assertEqual(sorted(p['title'] for p in data['posts']),
+                         ['post2-0', 'post2-1'])
+        self.assertEqual(data['posts'][0]['category'],
+                         data['categories'][0]['id'])
+        self.assertEqual(len(data['pages']), 2)
+        self.assertEqual(len(data['tags']), 2)
+        self.assertEqual(len(data['tags'][0]['posts']), 1)
+        self.assertEqual(len(data['project_plugins']), 2)
+        self.assertEqual(len(data['page_plugins']), 2)
+        # the id lists are still there
+        self.assertEqual(len(data['post_set']), 2)
+
+    def test_include_some(self):
+        self.add_content(1)
+        url = self.url.format(pk=self.project.id)
+        resp = self.client.get(url, {'include': 'posts'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn('posts', resp.data)
+        self.assertNotIn('pages', resp.data)
+        self.assertNotIn('page_plugins', resp.data)
+
+    def test_include_query_count_is_fixed(self):
+        url = self.url.format(pk=self.project.id)
+        params = {'include': 'posts,pages,categories,tags,plugins'}
+
+        self.add_content(1)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(url, params)
+        self.add_content(10)
+        with CaptureQueriesContext(connection) as big:
+            resp = self.client.get(url, params)
+        self.assertEqual(len(resp.data['posts']), 11)
+        self.assertEqual(len(big), len(small))
+
+    def test_bad_include(self):
+        url = self.url.format(pk=self.project.id)
+        resp = self.client.get(url, {'include': 'posts,secrets'})
+        self.assertEqual(resp.status_code, 400)
+
 
 class CloneProjectTestCase(FuglViewTestCase):
 
@@ -722,6 +822,22 @@ class LookupProjectTestCase(FuglViewTestCase):
         data = resp.data
         self.assertIn('page_set', data)  # plus all the usual stuff
 
+    def test_include(self):
+        self.create_post('post', 'content', project=self.project)
+        data = {'username': self.admin_user.username, 'title': 'owned',
+                'include': 'posts'}
+
+        resp = self.client.get(self.url, data)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([p['title'] for p in resp.data['posts']], ['post'])
+
+    def test_bad_include(self):
+        data = {'username': self.admin_user.username, 'title': 'owned',
+                'include': 'nope'}
+
+        resp = self.client.get(self.url, data)
+        self.assertEqual(resp.status_code, 400)
+
     def test_for_viewable(self):
         access = self.create_access(self.admin_user, self.other_project,
             can_edit=False)
@@ -780,3 +896,309 @@ class GenerateProjectTestCase(FuglViewTestCase):
         url = self.url.format(pk=self.project.id)
         resp = self.client.get(url)
         self.assertEqual(resp.status_code, 201)
+
+    def test_records_build(self):
+        url = self.url.format(pk=self.project.id)
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 201)
+
+        build = Build.objects.get(pk=int(resp['X-Fugl-Build']))
+        self.assertEqual(build.project, self.project)
+        self.assertIn('pages/my-page.html', build.get_manifest())
+
+    def test_delta(self):
+        url = self.url.format(pk=self.project.id)
+        since = self.client.get(url)['X-Fugl-Build']
+
+        self.page.content = 'this page has changed'
+        self.page.save()
+        new_page = self.create_page('new-page', content='brand new',
+            project=self.project)
+
+        resp = self.client.get(url, {'since': since})
+        self.assertEqual(resp.status_code, 201)
+        arc = zipfile.ZipFile(io.BytesIO(resp.content))
+        names = arc.namelist()
+        self.assertIn('pages/my-page.html', names)
+        self.assertIn('pages/new-page.html', names)
+        self.assertNotIn('theme/css/main.css', names)
+
+        delta = json.loads(arc.read(DELTA_FILENAME).decode('utf-8'))
+        self.assertEqual(delta['since'], int(since))
+        self.assertEqual(delta['build'], int(resp['X-Fugl-Build']))
+        self.assertEqual(delta['deleted'], [])
+
+        since = resp['X-Fugl-Build']
+        new_page.delete()
+        resp = self.client.get(url, {'since': since})
+        arc = zipfile.ZipFile(io.BytesIO(resp.content))
+        delta = json.loads(arc.read(DELTA_FILENAME).decode('utf-8'))
+        self.assertEqual(delta['deleted'], ['pages/new-page.html'])
+
+    def test_delta_bad_since(self):
+        url = self.url.format(pk=self.project.id)
+        resp = self.client.get(url, {'since': 'yesterday'})
+        self.assertEqual(resp.status_code, 400)
+
+        resp = self.client.get(url, {'since': -1})
+        self.assertEqual(resp.status_code, 404)
+
+    def test_delta_other_projects_build(self):
+        other = self.create_project('other', owner=self.admin_user)
+        build = Build.objects.create(project=other)
+
+        url = self.url.format(pk=self.project.id)
+        resp = self.client.get(url, {'since': build.id})
+        self.assertEqual(resp.status_code, 404)
+
+        other.delete()
+
+
+class PublishProjectTestCase(FuglViewTestCase):
+
+    url = '/projects/{pk}/publish/'
+
+    def setUp(self):
+        super().setUp()
+
+        self.publish_root = tempfile.TemporaryDirectory()
+        self.settings = override_settings(
+            PUBLISH_ROOT=self.publish_root.name,
+            PUBLISH_URL='https://example.com/sites/',
+        )
+        self.settings.enable()
+
+        self.project = self.create_project('simple', owner=self.admin_user)
+        self.page = self.create_page('my-page', content='this is a page',
+            project=self.project)
+        self.other_user = self.create_user('other')
+        self.login(user=self.admin_user)
+
+    def tearDown(self):
+        # unpublish first, so deleting the page doesn't queue a rebuild
+        Project.objects.filter(pk=self.project.pk).update(preview_url='')
+        self.project.delete()
+        self.page.delete()
+        self.other_user.delete()
+        self.settings.disable()
+        self.publish_root.cleanup()
+
+        super().tearDown()
+
+    def published(self, *path):
+        return os.path.join(self.publish_root.name, str(self.admin_user.pk),
+                            str(self.project.pk), *path)
+
+    def test_it_works(self):
+        resp = self.client.post(self.url.format(pk=self.project.id))
+        self.assertEqual(resp.status_code, 200)
+
+        expected = 'https://example.com/sites/{0}/{1}/'.format(
+            self.admin_user.pk, self.project.pk)
+        self.assertEqual(resp.data['preview_url'], expected)
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.preview_url, expected)
+
+        self.assertTrue(os.path.islink(self.published()))
+        self.assertTrue(os.path.isfile(self.published('index.html')))
+
+    def test_republish_links_unchanged_files(self):
+        url = self.url.format(pk=self.project.id)
+        self.client.post(url)
+        first = os.path.realpath(self.published())
+        page = os.path.join('pages', 'my-page.html')
+        inode = os.stat(self.published(page)).st_ino
+
+        resp = self.client.post(url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(os.path.realpath(self.published()), first)
+        self.assertFalse(os.path.exists(first))
+        self.assertEqual(os.stat(self.published(page)).st_ino, inode)
+
+    def test_publish_over_directory(self):
+        os.makedirs(self.published('pages'))
+        with open(self.published('pages', 'my-page.html'), 'w') as f:
+            f.write('published by hand')
+
+        resp = self.client.post(self.url.format(pk=self.project.id))
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(os.path.islink(self.published()))
+        with open(self.published('pages', 'my-page.html')) as f:
+            self.assertIn('this is a page', f.read())
+        # the old directory is gone; only the link and its version are left
+        version = os.path.basename(os.path.realpath(self.published()))
+        self.assertEqual(
+            sorted(os.listdir(os.path.dirname(self.published()))),
+            sorted([str(self.project.pk), version]),
+        )
+
+    def test_delete_unpublishes(self):
+        self.client.post(self.url.format(pk=self.project.id))
+        owner_dir = os.path.dirname(self.published())
+        self.assertTrue(os.listdir(owner_dir))
+
+        Project.objects.get(pk=self.project.pk).delete()
+        self.assertEqual(os.listdir(owner_dir), [])
+
+    def test_rename_republishes(self):
+        self.client.post(self.url.format(pk=self.project.id))
+        version = os.path.realpath(self.published())
+
+        project = Project.objects.get(pk=self.project.pk)
+        project.title = 'renamed'
+        with mock.patch('main.signals.get_build_queue') as get_queue:
+            project.save()
+        # still published, in the same place, until the rebuild
+        self.assertEqual(os.path.realpath(self.published()), version)
+        self.assertTrue(Project.objects.get(pk=project.pk).dirty)
+        get_queue.return_value.enqueue.assert_called_with(project.pk)
+
+    def test_failed_rename_keeps_site(self):
+        self.client.post(self.url.format(pk=self.project.id))
+        self.create_project('taken', owner=self.admin_user)
+
+        project = Project.objects.get(pk=self.project.pk)
+        project.title = 'taken'
+        with mock.patch('main.signals.get_build_queue') as get_queue, \
+                self.assertRaises(IntegrityError), transaction.atomic():
+            project.save()
+        self.assertTrue(os.path.isfile(self.published('index.html')))
+        self.assertFalse(get_queue.called)
+
+    def test_dot_dot_username(self):
+        owner = self.create_user('..')
+        project = self.create_project('static', owner=owner)
+        try:
+            path = publish_dir(project)
+            self.assertEqual(
+                path,
+                os.path.join(os.path.realpath(self.publish_root.name),
+                             str(owner.pk), str(project.pk)),
+            )
+            self.assertTrue(publish_url(project).endswith(
+                '/sites/{0}/{1}/'.format(owner.pk, project.pk)))
+        finally:
+            project.delete()
+            owner.delete()
+
+    def test_publish_dir_outside_root(self):
+        elsewhere = tempfile.TemporaryDirectory()
+        self.addCleanup(elsewhere.cleanup)
+        os.symlink(elsewhere.name, os.path.join(self.publish_root.name,
+                                                str(self.admin_user.pk)))
+        with self.assertRaises(SuspiciousFileOperation):
+            publish_dir(self.project)
+
+    def test_editor_can_publish(self):
+        self.create_access(self.other_user, self.project, can_edit=True)
+        self.login(user=self.other_user, password='other')
+
+        resp = self.client.post(self.url.format(pk=self.project.id))
+        self.assertEqual(resp.status_code, 200)
+
+    def test_viewer_cannot_publish(self):
+        self.create_access(self.other_user, self.project, can_edit=False)
+        self.login(user=self.other_user, password='other')
+
+        resp = self.client.post(self.url.format(pk=self.project.id))
+        self.assertEqual(resp.status_code, 404)
+        self.assertFalse(os.path.exists(self.published()))
+
+    def test_wrong_method(self):
+        resp = self.client.get(self.url.format(pk=self.project.id))
+        self.assertEqual(resp.status_code, 405)
+
+
+class ExportImportProjectTestCase(FuglViewTestCase):
+
+    export_url = '/projects/{pk}/export/'
+    import_url = '/projects/import/'
+
+    def setUp(self):
+        super().setUp()
+
+        self.project = self.create_project('simple', owner=self.admin_user)
+        self.page = self.create_page('my-page', content='this is a page',
+            project=self.project)
+        self.other_user = self.create_user('other')
+        self.login(user=self.admin_user)
+
+    def tearDown(self):
+        self.project.delete()
+        self.page.delete()
+        self.other_user.delete()
+
+        super().tearDown()
+
+    def export(self):
+        resp = self.client.get(self.export_url.format(pk=self.project.id))
+        self.assertEqual(resp.status_code, 200)
+        return b''.join(resp.streaming_content)
+
+    def test_export(self):
+        resp = self.client.get(self.export_url.format(pk=self.project.id))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp['Content-Type'], 'application/gzip')
+        self.assertIn('simple.fugl.gz', resp['Content-Disposition'])
+
+        lines = gzip.decompress(b''.join(resp.streaming_content)).splitlines()
+        self.assertEqual(json.loads(lines[0].decode())['version'], 1)
+        self.assertIn(b'this is a page', b''.join(lines[1:]))
+
+    def test_export_no_access(self):
+        self.login(user=self.other_user, password='other')
+        resp = self.client.get(self.export_url.format(pk=self.project.id))
+        self.assertEqual(resp.status_code, 404)
+
+    def test_import(self):
+        archive = io.BytesIO(self.export())
+        archive.name = 'simple.fugl.gz'
+        self.login(user=self.other_user, password='other')
+
+        resp = self.client.post(self.import_url, {'archive': archive})
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(resp.data['owner'], self.other_user.id)
+        self.assertEqual(resp.data['title'], 'simple')
+
+        project = Project.objects.get(pk=resp.data['id'])
+        self.assertEqual(project.page_set.get().content, 'this is a page')
+
+    def test_import_duplicate_title(self):
+        archive = io.BytesIO(self.export())
+        archive.name = 'simple.fugl.gz'
+
+        resp = self.client.post(self.import_url, {'archive': archive})
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn('archive', resp.data)
+
+        archive.seek(0)
+        resp = self.client.post(self.import_url,
+                                {'archive': archive, 'title': 'copy'})
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(resp.data['title'], 'copy')
+
+    def test_import_garbage(self):
+        archive = io.BytesIO(b'not an archive')
+        archive.name = 'garbage.fugl.gz'
+        resp = self.client.post(self.import_url, {'archive': archive})
+        self.assertEqual(resp.status_code, 400)
+
+    def test_import_conflicting_records(self):
+        header = {
+            'format': 'fugl-project',
+            'version': 1,
+            'project': {'title': 'dupes', 'description': '',
+                        'theme': 'default'},
+            'fields': {'tag': ['title']},
+        }
+        lines = [json.dumps(record).encode('utf-8')
+                 for record in [header, ['tag', 1, 'a'], ['tag', 2, 'a']]]
+        archive = io.BytesIO(gzip.compress(b'\n'.join(lines)))
+        archive.name = 'dupes.fugl.gz'
+        resp = self.client.post(self.import_url, {'archive': archive})
+        self.assertEqual(resp.status_code, 400)
+        self.assertFalse(Project.objects.filter(title='dupes').exists())
+
+    def test_import_no_archive(self):
+        resp = self.client.post(self.import_url, {})
+        self.assertEqual(resp.status_code, 400)
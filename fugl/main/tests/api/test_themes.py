@@ -53,6 +53,20 @@ class CreateThemeTestCase(FuglViewTestCase):
 
         theme1.delete()
 
+    def test_create_outside_themes_root(self):
+        count = Theme.objects.count()
+        for filepath in ['/etc', '../../etc']:
+            data = {
+                'title': 'my-theme',
+                'body_markup': 'some-markup',
+                'filepath': filepath,
+            }
+
+            resp = self.client.post(self.url, data=data)
+            self.assertEqual(resp.status_code, 400)
+            self.assertIn('filepath', resp.data)
+        self.assertEqual(Theme.objects.count(), count)
+
     def test_create_bad_data(self):
         count = Theme.objects.count()
         data = {
@@ -0,0 +1,45 @@
+from main.models import Build
+from main.models import Project
+
+from ..base import FuglTestCase
+
+
+class BuildTestCase(FuglTestCase):
+
+    def setUp(self):
+        self.setUpTheme()
+
+        self.project = Project.objects.create(title='project',
+                                              description='project',
+                                              owner=self.admin_user,
+                                              theme=self.default_theme)
+        self.project.save()
+
+        self.build = Build(project=self.project)
+        self.build.set_manifest({
+            'index.html': 'a',
+            'pages/about.html': 'b',
+            'pages/old.html': 'c',
+        })
+        self.build.save()
+
+    def tearDown(self):
+        self.build.delete()
+        self.project.delete()
+        self.tearDownTheme()
+
+    def test_manifest_round_trip(self):
+        build = Build.objects.get(pk=self.build.pk)
+        self.assertEqual(build.get_manifest()['index.html'], 'a')
+
+    def test_diff(self):
+        changed, deleted = self.build.diff({
+            'index.html': 'a',
+            'pages/about.html': 'changed',
+            'pages/new.html': 'd',
+        })
+        self.assertEqual(changed, ['pages/about.html', 'pages/new.html'])
+        self.assertEqual(deleted, ['pages/old.html'])
+
+    def test_diff_unchanged(self):
+        self.assertEqual(self.build.diff(self.build.get_manifest()), ([], []))
@@ -1,4 +1,5 @@
 from main.models import Project
+from main.models import ProjectAccess
 
 from ..base import FuglTestCase
 
@@ -27,3 +28,37 @@ class ProjectTestCase(FuglTestCase):
         url = '/project/%s/%s' % (self.project.owner.username,
                                   self.project.title)
         self.assertEqual(url, self.project.project_home_url)
+
+    def test_config_bytecode_cache(self):
+        conf = self.project.get_pelican_conf()
+        self.assertNotIn('JINJA_ENVIRONMENT', conf)
+
+        conf = self.project.get_pelican_conf(bytecode_cache_dir='/tmp/cache')
+        self.assertIn('JINJA_ENVIRONMENT', conf)
+        self.assertIn("FileSystemBytecodeCache('/tmp/cache')", conf)
+
+    def test_visible_to(self):
+        other = self.create_user('other')
+        edit = self.create_project('edit', owner=other)
+        view = self.create_project('view', owner=other)
+        self.create_project('hidden', owner=other)
+        ProjectAccess.objects.create(user=self.admin_user, project=edit,
+                                     can_edit=True)
+        ProjectAccess.objects.create(user=self.admin_user, project=view)
+        # another user's access doesn't make a project visible
+        ProjectAccess.objects.create(user=other, project=self.project)
+
+        visible = {p.title: bool(p.user_can_edit)
+                   for p in Project.objects.visible_to(self.admin_user)}
+        self.assertEqual(visible, {'project': True, 'edit': True,
+                                   'view': False})
+
+        shared = {p.title: bool(p.user_can_edit)
+                  for p in Project.objects.shared_with(self.admin_user)}
+        self.assertEqual(shared, {'edit': True, 'view': False})
+
+        owned = Project.objects.owned_by(other)
+        self.assertEqual(sorted(p.title for p in owned),
+                         ['edit', 'hidden', 'view'])
+        self.assertTrue(all(p.user_can_edit for p in owned))
+        other.delete()
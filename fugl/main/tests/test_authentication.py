@@ -0,0 +1,122 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.db import connection
+from django.test import Client
+from django.test import SimpleTestCase
+from django.test.utils import CaptureQueriesContext
+
+from main.authentication import TokenCache
+from main.authentication import get_token_cache
+from main.models import ApiToken
+
+from .base import FuglViewTestCase
+
+
+class TokenAuthenticationTestCase(FuglViewTestCase):
+
+    session_url = '/users/session/'
+
+    def setUp(self):
+        super().setUp()
+        get_token_cache().clear()
+        resp = self.client.post('/users/authenticate/', {
+            'username': self.admin_user.username,
+            'password': self.admin_password,
+        })
+        self.assertEqual(resp.status_code, 200)
+        self.token = resp.data['token']
+        # no session: only the token
+        self.client = Client(HTTP_AUTHORIZATION='Token ' + self.token)
+
+    def test_issued(self):
+        token = ApiToken.objects.get()
+        self.assertEqual(token.user, self.admin_user)
+        self.assertEqual(token.digest, ApiToken.hash(self.token))
+        self.assertNotIn(self.token, token.digest)
+
+    def test_authenticates(self):
+        resp = self.client.get(self.session_url)
+        self.assertEqual(resp.data, {'valid': True})
+
+        resp = self.client.get('/projects/')
+        self.assertEqual(resp.status_code, 200)
+
+    def test_cached(self):
+        self.client.get(self.session_url)
+        # only the user is loaded, not the token
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get(self.session_url)
+        self.assertEqual(resp.data, {'valid': True})
+        self.assertEqual(len(queries), 1)
+
+    def test_bad_token(self):
+        client = Client(HTTP_AUTHORIZATION='Token nope')
+        resp = client.get(self.session_url)
+        self.assertEqual(resp.status_code, 401)
+
+    def test_expired(self):
+        ApiToken.objects.update(created=ApiToken.objects.get().created -
+                                timedelta(days=365))
+        resp = self.client.get(self.session_url)
+        self.assertEqual(resp.status_code, 401)
+
+    def test_logout_revokes(self):
+        self.client.get(self.session_url)
+        resp = self.client.delete('/users/logout/')
+        self.assertEqual(resp.status_code, 204)
+        self.assertFalse(ApiToken.objects.exists())
+
+        resp = self.client.get(self.session_url)
+        self.assertEqual(resp.status_code, 401)
+
+    def test_inactive_user(self):
+        self.admin_user.is_active = False
+        self.admin_user.save()
+        resp = self.client.get(self.session_url)
+        self.assertEqual(resp.status_code, 401)
+
+    def test_inactive_user_cached(self):
+        self.client.get(self.session_url)
+        self.admin_user.is_active = False
+        self.admin_user.save()
+        resp = self.client.get(self.session_url)
+        self.assertEqual(resp.status_code, 401)
+
+    def test_expired_pruned(self):
+        ApiToken.objects.update(created=ApiToken.objects.get().created -
+                                timedelta(days=365))
+        _, token = ApiToken.issue(self.admin_user)
+        self.assertEqual(ApiToken.objects.get().digest, ApiToken.hash(token))
+
+
+class TokenCacheTestCase(SimpleTestCase):
+
+    def test_lru(self):
+        cache = TokenCache(max_size=2, timeout=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+
+    def test_timeout(self):
+        cache = TokenCache(max_size=2, timeout=60)
+        with mock.patch('main.authentication.time.monotonic',
+                        return_value=100):
+            cache.set('a', 1)
+        with mock.patch('main.authentication.time.monotonic',
+                        return_value=159):
+            self.assertEqual(cache.get('a'), 1)
+        with mock.patch('main.authentication.time.monotonic',
+                        return_value=160):
+            self.assertIsNone(cache.get('a'))
+
+    def test_discard(self):
+        cache = TokenCache(max_size=2, timeout=60)
+        cache.set('a', 1)
+        cache.discard('a')
+        cache.discard('b')
+        self.assertIsNone(cache.get('a'))
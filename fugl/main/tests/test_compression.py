@@ -0,0 +1,143 @@
+import gzip
+import json
+from unittest import mock
+from unittest import skipUnless
+
+from django.http import HttpResponse
+from django.http import StreamingHttpResponse
+from django.test import RequestFactory
+from django.test import SimpleTestCase
+
+from main.middleware import CompressionMiddleware
+from main.util.compression import ENCODINGS
+from main.util.compression import brotli
+from main.util.compression import choose_encoding
+from main.util.compression import precompress
+
+from .base import FuglViewTestCase
+
+
+BODY = json.dumps([{'title': 'post %d' % i, 'content': 'same old content'}
+                   for i in range(100)]).encode('utf-8')
+
+
+class CompressionMiddlewareTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.middleware = CompressionMiddleware()
+
+    def process(self, response, accept_encoding='gzip, deflate'):
+        request = self.factory.get('/', HTTP_ACCEPT_ENCODING=accept_encoding)
+        return self.middleware.process_response(request, response)
+
+    def test_gzip(self):
+        resp = self.process(HttpResponse(BODY,
+                                         content_type='application/json'))
+        self.assertEqual(resp['Content-Encoding'], 'gzip')
+        self.assertEqual(resp['Content-Length'], str(len(resp.content)))
+        self.assertEqual(resp['Vary'], 'Accept-Encoding')
+        self.assertEqual(gzip.decompress(resp.content), BODY)
+
+    def test_not_accepted(self):
+        for accept_encoding in ['', 'identity', 'gzip;q=0']:
+            resp = self.process(
+                HttpResponse(BODY, content_type='application/json'),
+                accept_encoding)
+            self.assertFalse(resp.has_header('Content-Encoding'))
+            self.assertEqual(resp.content, BODY)
+
+    def test_small(self):
+        resp = self.process(HttpResponse(b'[]',
+                                         content_type='application/json'))
+        self.assertFalse(resp.has_header('Content-Encoding'))
+        self.assertEqual(resp.content, b'[]')
+
+    def test_content_types(self):
+        for content_type in ['text/html', 'application/zip',
+                             'application/gzip']:
+            resp = self.process(HttpResponse(BODY,
+                                             content_type=content_type))
+            self.assertFalse(resp.has_header('Content-Encoding'))
+
+    def test_streaming(self):
+        resp = self.process(StreamingHttpResponse(
+            [BODY], content_type='application/json'))
+        self.assertFalse(resp.has_header('Content-Encoding'))
+
+    def test_etag(self):
+        resp = HttpResponse(BODY, content_type='application/json')
+        resp['ETag'] = '"abc"'
+        resp = self.process(resp)
+        self.assertEqual(resp['ETag'], '"abc;gzip"')
+
+    def test_precompressed(self):
+        resp = HttpResponse(BODY, content_type='text/html')
+        resp.precompressed = {'gzip': b'already compressed'}
+        with mock.patch('main.middleware.compress') as compress:
+            resp = self.process(resp)
+        self.assertFalse(compress.called)
+        self.assertEqual(resp['Content-Encoding'], 'gzip')
+        self.assertEqual(resp.content, b'already compressed')
+
+    def test_precompressed_not_accepted(self):
+        resp = HttpResponse(BODY, content_type='text/html')
+        resp.precompressed = {'br': b'already compressed'}
+        resp = self.process(resp)
+        self.assertFalse(resp.has_header('Content-Encoding'))
+        self.assertEqual(resp.content, BODY)
+
+    @skipUnless(brotli, 'brotli is not installed')
+    def test_brotli(self):
+        resp = self.process(HttpResponse(BODY,
+                                         content_type='application/json'),
+                            'gzip, deflate, br')
+        self.assertEqual(resp['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(resp.content), BODY)
+
+
+class NegotiationTestCase(SimpleTestCase):
+
+    def test_choose_encoding(self):
+        self.assertEqual(choose_encoding('gzip'), 'gzip')
+        self.assertEqual(choose_encoding('GZIP;q=0.5, compress'), 'gzip')
+        self.assertEqual(choose_encoding('*'), next(iter(ENCODINGS)))
+        self.assertIsNone(choose_encoding('*, gzip;q=0, br;q=0'))
+        self.assertIsNone(choose_encoding('deflate'))
+        self.assertIsNone(choose_encoding('gzip;q=nope'))
+
+    def test_choose_from(self):
+        self.assertEqual(choose_encoding('br;q=1, gzip;q=0.5', ['gzip']),
+                         'gzip')
+        self.assertEqual(choose_encoding('br;q=0.5, gzip', ['br', 'gzip']),
+                         'gzip')
+
+    def test_precompress(self):
+        compressed = precompress(BODY)
+        self.assertEqual(list(compressed), list(ENCODINGS))
+        self.assertEqual(gzip.decompress(compressed['gzip']), BODY)
+        self.assertEqual(precompress(b'[]'), {})
+
+
+class PreviewCompressionTestCase(FuglViewTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.project = self.create_project('project', owner=self.admin_user)
+        self.post = self.create_post('my-post', 'a paragraph\n\n' * 200,
+                                     project=self.project)
+        self.url = '/posts/{0}/preview/'.format(self.post.id)
+        self.login(user=self.admin_user)
+
+    def tearDown(self):
+        self.post.delete()
+        self.project.delete()
+        super().tearDown()
+
+    def test_compressed_once(self):
+        html = self.client.get(self.url).content
+        with mock.patch('main.util.compression.gzip_compress') as compress:
+            resp = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(compress.called)
+        self.assertEqual(resp['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(resp.content), html)
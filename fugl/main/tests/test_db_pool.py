@@ -0,0 +1,78 @@
+from unittest import skipUnless
+
+from django.db import connection
+
+from main.tests.base import FuglTestCase
+
+if connection.vendor == 'postgresql':
+    from main.db.backends.postgresql_pool.base import DatabaseWrapper
+
+
+@skipUnless(connection.vendor == 'postgresql', 'needs PostgreSQL')
+class ConnectionPoolTestCase(FuglTestCase):
+    """
+    Uses its own connections (to the test database), alongside the one the
+    test case runs in.
+    """
+
+    def setUp(self):
+        self.wrapper = self.make_wrapper()
+
+    def tearDown(self):
+        self.wrapper.close()
+        self.wrapper.pool.clear()
+
+    def make_wrapper(self, **pool):
+        settings_dict = dict(connection.settings_dict, CONN_MAX_AGE=0,
+                             POOL=pool)
+        # a pool of its own
+        return DatabaseWrapper(settings_dict, alias=self.id())
+
+    def backend_pid(self):
+        with self.wrapper.cursor() as cursor:
+            cursor.execute('SELECT pg_backend_pid()')
+            return cursor.fetchone()[0]
+
+    def test_reuse(self):
+        pid = self.backend_pid()
+        self.wrapper.close()
+        self.assertEqual(self.backend_pid(), pid)
+
+        stats = self.wrapper.pool.stats()
+        self.assertEqual(stats['created'], 1)
+        self.assertEqual(stats['reused'], 1)
+
+    def test_session_state_reset(self):
+        with self.wrapper.cursor() as cursor:
+            cursor.execute("SET application_name = 'leftover'")
+        self.wrapper.close()
+
+        with self.wrapper.cursor() as cursor:
+            cursor.execute('SHOW application_name')
+            self.assertNotEqual(cursor.fetchone()[0], 'leftover')
+
+    def test_open_transaction_rolled_back(self):
+        self.wrapper.set_autocommit(False)
+        with self.wrapper.cursor() as cursor:
+            cursor.execute('CREATE TEMPORARY TABLE pool_test (id int)')
+        self.wrapper.close()
+
+        with self.wrapper.cursor() as cursor:
+            cursor.execute("SELECT to_regclass('pool_test')")
+            self.assertIsNone(cursor.fetchone()[0])
+
+    def test_max_lifetime(self):
+        self.wrapper = self.make_wrapper(MAX_LIFETIME=0)
+        pid = self.backend_pid()
+        self.wrapper.close()
+        self.assertNotEqual(self.backend_pid(), pid)
+
+    def test_dead_connection_replaced(self):
+        pid = self.backend_pid()
+        self.wrapper.close()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_terminate_backend(%s)', [pid])
+
+        new_pid = self.backend_pid()
+        self.assertNotEqual(new_pid, pid)
+        self.assertEqual(self.wrapper.pool.stats()['discarded'], 1)
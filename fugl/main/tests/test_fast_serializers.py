@@ -0,0 +1,85 @@
+"""
+Contract tests: the values_list() fast path has to render to exactly the
+same bytes as the serializers it stands in for.
+"""
+from datetime import datetime
+
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from main.renderers import FastJSONRenderer
+from main.serializers import CategorySerializer
+from main.serializers import PageSerializer
+from main.serializers import PostSerializer
+from main.serializers import TagSerializer
+from main.serializers.fast import get_plan
+from main.serializers.fast import list_data
+
+from .base import FuglViewTestCase
+
+
+class FastListDataTestCase(FuglViewTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.project = self.create_project('fast', owner=self.admin_user)
+        category = self.create_category('caf\xe9', project=self.project)
+        tag = self.create_tag('tag', project=self.project)
+
+        self.create_post('plain', 'content', project=self.project,
+                         category=category)
+        post = self.create_post(
+            'odd </script> "chars"', 'line\nbreak   \U0001f426 \x01',
+            project=self.project,
+            date_created=timezone.make_aware(datetime(2016, 4, 14, 19, 38)),
+            date_updated=timezone.make_aware(
+                datetime(2016, 4, 15, 9, 0, 0, 123456)))
+        tag.posts.add(post)
+        self.create_post('empty', '', project=self.project)
+
+        self.create_page('about', content='about *me*', project=self.project)
+        self.create_page('blank', content='', project=self.project)
+
+    def tearDown(self):
+        self.project.delete()
+        super().tearDown()
+
+    def assertSameOutput(self, serializer_class, queryset):
+        queryset = queryset.order_by('id')
+        expected = serializer_class(queryset, many=True).data
+        actual = list_data(serializer_class, queryset)
+        self.assertEqual(actual, expected)
+        for renderer in [JSONRenderer(), FastJSONRenderer()]:
+            self.assertEqual(renderer.render(actual),
+                             renderer.render(expected))
+
+    def test_posts(self):
+        self.assertIsNotNone(get_plan(PostSerializer))
+        self.assertSameOutput(PostSerializer, self.project.post_set.all())
+
+    def test_pages(self):
+        self.assertIsNotNone(get_plan(PageSerializer))
+        self.assertSameOutput(PageSerializer, self.project.page_set.all())
+
+    def test_categories(self):
+        self.assertSameOutput(CategorySerializer,
+                              self.project.category_set.all())
+
+    def test_many_to_many_falls_back(self):
+        self.assertIsNone(get_plan(TagSerializer))
+        self.assertSameOutput(TagSerializer, self.project.tag_set.all())
+
+    def test_empty(self):
+        self.assertSameOutput(PostSerializer,
+                              self.project.post_set.filter(title='none'))
+
+    def test_list_endpoints(self):
+        self.login()
+        for url, serializer_class, queryset in [
+                ('/posts/', PostSerializer, self.project.post_set.all()),
+                ('/pages/', PageSerializer, self.project.page_set.all())]:
+            resp = self.client.get(url, {'project': self.project.id})
+            self.assertEqual(resp.status_code, 200)
+            expected = serializer_class(queryset, many=True).data
+            self.assertEqual(sorted(resp.data, key=lambda d: d['id']),
+                             sorted(expected, key=lambda d: d['id']))
@@ -0,0 +1,101 @@
+"""
+EXPLAIN the queries behind the main API endpoints and fail if any of them
+has to scan a whole table.
+
+The plans only mean something on PostgreSQL, so these are skipped on other
+databases.  Sequential scans are priced out while explaining, so one only
+shows up when no index can serve the query at all -- which is what we want
+to catch -- rather than whenever a test-sized table is cheap to read.
+"""
+import json
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+
+from main.models import Category
+from main.models import Page
+from main.models import Post
+from main.models import Project
+from main.models import ProjectAccess
+from main.models import Tag
+from main.models import Theme
+from main.util.fixtures import SyntheticProjectBuilder
+
+
+def seq_scans(queryset):
+    """The tables `queryset`'s plan reads with a sequential scan."""
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('SET LOCAL enable_seqscan = off')
+        try:
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+            plan = cursor.fetchone()[0]
+        finally:
+            cursor.execute('SET LOCAL enable_seqscan = on')
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    tables = []
+    nodes = [plan[0]['Plan']]
+    while nodes:
+        node = nodes.pop()
+        if node['Node Type'] == 'Seq Scan':
+            tables.append(node['Relation Name'])
+        nodes.extend(node.get('Plans', []))
+    return tables
+
+
+@skipUnless(connection.vendor == 'postgresql', 'needs PostgreSQL')
+class QueryPlanTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        builder = SyntheticProjectBuilder(seed=0)
+        users = builder.users('plan_', 50, 'plan')
+        theme = Theme.objects.create(title='default', filepath='notmyidea',
+                                     creator=users[0])
+        projects = [
+            builder.build(users[i % len(users)], theme, 'project %d' % i,
+                          posts=20, pages=2, categories=5, tags=10,
+                          plugins=1, words=5)
+            for i in range(200)
+        ]
+        builder.share(projects, users, 3)
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        cls.user = users[0]
+        cls.project = projects[1]
+        cls.category = cls.project.category_set.first()
+
+    def assertNoSeqScan(self, queryset):
+        self.assertEqual(seq_scans(queryset), [], str(queryset.query))
+
+    def test_project_lists(self):
+        self.assertNoSeqScan(Project.objects.visible_to(self.user))
+        self.assertNoSeqScan(Project.objects.owned_by(self.user))
+        self.assertNoSeqScan(Project.objects.shared_with(self.user))
+
+    def test_project_lookup(self):
+        self.assertNoSeqScan(Project.objects.filter(
+            owner=self.project.owner, title=self.project.title))
+
+    def test_project_access(self):
+        self.assertNoSeqScan(ProjectAccess.objects.filter(
+            user=self.user, project=self.project))
+        self.assertNoSeqScan(self.project.projectaccess_set.all())
+
+    def test_posts(self):
+        self.assertNoSeqScan(Post.objects.filter(project=self.project))
+        self.assertNoSeqScan(Post.objects.filter(project=self.project)
+                             .order_by('-date_updated')[:10])
+        self.assertNoSeqScan(Post.objects.filter(project=self.project,
+                                                 category=self.category))
+
+    def test_project_content(self):
+        for model in [Page, Category, Tag]:
+            self.assertNoSeqScan(model.objects.filter(project=self.project))
+        self.assertNoSeqScan(Tag.objects.filter(project=self.project,
+                                                title='tag'))
@@ -0,0 +1,117 @@
+import io
+from collections import OrderedDict
+from datetime import datetime
+from decimal import Decimal
+from unittest import mock
+from unittest import skipUnless
+
+from django.test import SimpleTestCase
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from main.parsers import FastJSONParser
+from main.renderers import FastJSONRenderer
+from main.renderers import is_plain
+from main.renderers import ujson
+
+
+DATA = [
+    OrderedDict([
+        ('id', 1),
+        ('title', 'caf\xe9 </script> & "quotes"'),
+        ('content', 'line\nbreak\ttab     \x01 \U0001f426'),
+        ('project', 2),
+        ('category', None),
+        ('published', True),
+        ('score', 0.1),
+        ('tags', [1, 2, 3]),
+    ]),
+]
+
+# what ujson encodes or decodes differently from the standard library
+FLOATS = [0.1, 1e16, 1e-07, 1e300]
+KEYS = [{True: 1}, {None: 1}, {1: 2}, {1.5: 1}]
+
+
+class FastJSONRendererTestCase(SimpleTestCase):
+
+    def assertSameAsDRF(self, data, accepted_media_type='application/json'):
+        expected = JSONRenderer().render(data, accepted_media_type, {})
+        self.assertEqual(
+            FastJSONRenderer().render(data, accepted_media_type, {}),
+            expected)
+
+    def test_same_output(self):
+        self.assertSameAsDRF(DATA)
+        self.assertSameAsDRF({})
+        self.assertSameAsDRF(None)
+
+    def test_fallback(self):
+        self.assertSameAsDRF({'when': datetime(2016, 4, 14, 19, 38),
+                              'amount': Decimal('1.50')})
+        self.assertSameAsDRF(DATA, 'application/json; indent=4')
+
+    def test_without_ujson(self):
+        with mock.patch('main.renderers.ujson', None):
+            self.assertSameAsDRF(DATA)
+
+    @skipUnless(ujson, 'ujson is not installed')
+    def test_uses_ujson(self):
+        data = [dict(item, score=1) for item in DATA]
+        expected = JSONRenderer().render(data, 'application/json', {})
+        with mock.patch.object(JSONRenderer, 'render') as render:
+            self.assertEqual(
+                FastJSONRenderer().render(data, 'application/json', {}),
+                expected)
+        self.assertFalse(render.called)
+
+    @skipUnless(ujson, 'ujson is not installed')
+    def test_ujson_fallback(self):
+        self.assertSameAsDRF(FLOATS)
+        self.assertSameAsDRF([{'score': value} for value in FLOATS])
+        self.assertSameAsDRF([1, 2 ** 70])
+        for data in KEYS:
+            self.assertSameAsDRF(data)
+        # which json refuses, and ujson would write as "(1, 2)"
+        with self.assertRaises(TypeError):
+            FastJSONRenderer().render({(1, 2): 1})
+
+    def test_is_plain(self):
+        self.assertTrue(is_plain(DATA[0]['tags']))
+        self.assertTrue(is_plain([OrderedDict([('a', ('b', None, True))])]))
+        self.assertFalse(is_plain(DATA))
+        for data in KEYS + [{(1, 2): 1}]:
+            self.assertFalse(is_plain(data))
+        self.assertFalse(is_plain([[{'a': [Decimal('1')]}]]))
+
+
+class FastJSONParserTestCase(SimpleTestCase):
+
+    def parse(self, parser, body):
+        return parser.parse(io.BytesIO(body), 'application/json', {})
+
+    def test_same_result(self):
+        body = JSONRenderer().render(DATA)
+        self.assertEqual(self.parse(FastJSONParser(), body),
+                         self.parse(JSONParser(), body))
+
+    def test_invalid(self):
+        with self.assertRaises(ParseError):
+            self.parse(FastJSONParser(), b'{"title": ')
+        with self.assertRaises(ParseError):
+            self.parse(FastJSONParser(), b'\xff\xfe')
+
+    @skipUnless(ujson, 'ujson is not installed')
+    def test_ujson_fallback(self):
+        for body in [b'"\\ud800"', b'["a\\uDC00b"]', b'"\\ud83d\\ude00"',
+                     str(2 ** 70).encode('ascii'), b'[0.1, 1e-7, 1e300]']:
+            self.assertEqual(self.parse(FastJSONParser(), body),
+                             self.parse(JSONParser(), body))
+        self.assertEqual(self.parse(FastJSONParser(), b'"\\ud800"'),
+                         '\ud800')
+
+    def test_without_ujson(self):
+        with mock.patch('main.parsers.ujson', None):
+            self.assertEqual(self.parse(FastJSONParser(), b'{"a": [1]}'),
+                             {'a': [1]})
@@ -0,0 +1,156 @@
+from unittest import skipUnless
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.db import connections
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test import SimpleTestCase
+from django.test import TransactionTestCase
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from main import routers
+from main.middleware import PIN_COOKIE
+from main.middleware import ReplicaMiddleware
+from main.models import Project
+from main.models import Theme
+from main.models import User
+
+
+class ReplicaRouterTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.settings = override_settings(DATABASE_REPLICAS=['replica'])
+        self.settings.enable()
+        self.router = routers.ReplicaRouter()
+
+    def tearDown(self):
+        routers.reset()
+        self.settings.disable()
+
+    def test_primary_by_default(self):
+        self.assertEqual(self.router.db_for_read(Project), 'default')
+        self.assertEqual(self.router.db_for_write(Project), 'default')
+
+    def test_replicas(self):
+        routers.use_replicas()
+        self.assertEqual(self.router.db_for_read(Project), 'replica')
+        self.assertEqual(self.router.db_for_read(Session), 'default')
+
+    def test_no_replicas_configured(self):
+        routers.use_replicas()
+        with override_settings(DATABASE_REPLICAS=[]):
+            self.assertEqual(self.router.db_for_read(Project), 'default')
+
+    def test_write_pins_to_primary(self):
+        routers.use_replicas()
+        self.router.db_for_write(Session)
+        self.assertFalse(routers.wrote())
+        self.assertEqual(self.router.db_for_read(Project), 'replica')
+
+        self.router.db_for_write(Project)
+        self.assertTrue(routers.wrote())
+        self.assertEqual(self.router.db_for_read(Project), 'default')
+
+    def test_migrate_primary_only(self):
+        self.assertTrue(self.router.allow_migrate('default', 'main'))
+        self.assertFalse(self.router.allow_migrate('replica', 'main'))
+
+
+class ReplicaMiddlewareTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.settings = override_settings(DATABASE_REPLICAS=['replica'])
+        self.settings.enable()
+        self.factory = RequestFactory()
+        self.middleware = ReplicaMiddleware()
+        self.router = routers.ReplicaRouter()
+
+    def tearDown(self):
+        routers.reset()
+        self.settings.disable()
+
+    def run_request(self, request, write=False):
+        """Returns (database read from, response)."""
+        self.middleware.process_request(request)
+        db = self.router.db_for_read(Project)
+        if write:
+            self.router.db_for_write(Project)
+        response = self.middleware.process_response(request, HttpResponse())
+        return db, response
+
+    def test_get(self):
+        db, response = self.run_request(self.factory.get('/projects/'))
+        self.assertEqual(db, 'replica')
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        # back to the primary after the request
+        self.assertEqual(self.router.db_for_read(Project), 'default')
+
+    def test_post_pins(self):
+        db, response = self.run_request(self.factory.post('/posts/'))
+        self.assertEqual(db, 'default')
+        cookie = response.cookies[PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], settings.REPLICA_PIN_SECONDS)
+
+    def test_get_that_writes_pins(self):
+        _, response = self.run_request(self.factory.get('/projects/1/'),
+                                       write=True)
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+    def test_pinned_get(self):
+        request = self.factory.get('/projects/')
+        request.COOKIES[PIN_COOKIE] = '1'
+        db, _ = self.run_request(request)
+        self.assertEqual(db, 'default')
+
+    def test_pinned_by_credentials(self):
+        token = 'Token {0}'.format(self.id())
+        self.run_request(self.factory.post('/posts/',
+                                           HTTP_AUTHORIZATION=token))
+
+        # no cookie, but the same credentials
+        db, _ = self.run_request(self.factory.get('/posts/',
+                                                  HTTP_AUTHORIZATION=token))
+        self.assertEqual(db, 'default')
+
+        db, _ = self.run_request(self.factory.get(
+            '/posts/', HTTP_AUTHORIZATION=token + '-other'))
+        self.assertEqual(db, 'replica')
+
+
+@skipUnless(getattr(settings, 'DATABASE_REPLICAS', None),
+            'needs a replica in DATABASES (see settings.DATABASE_REPLICAS)')
+class ReplicaRoutingTestCase(TransactionTestCase):
+    """
+    End to end, with a second database set up as a test mirror of the
+    primary.
+    """
+    multi_db = True
+
+    def setUp(self):
+        self.user = User.objects.create_user('replica_user', password='pw')
+        theme = Theme.objects.create(title='default', filepath='notmyidea',
+                                     creator=self.user)
+        self.project = Project.objects.create(title='replicated',
+                                              description='', theme=theme,
+                                              owner=self.user)
+        self.client.login(username='replica_user', password='pw')
+        self.replica = connections[settings.DATABASE_REPLICAS[0]]
+
+    def test_read_your_writes(self):
+        with CaptureQueriesContext(self.replica) as queries:
+            resp = self.client.get('/projects/')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.data), 1)
+        self.assertGreater(len(queries), 0)
+
+        resp = self.client.post('/posts/', {'title': 'new', 'content': 'x',
+                                            'project': self.project.id})
+        self.assertEqual(resp.status_code, 201)
+        self.assertIn(PIN_COOKIE, resp.cookies)
+
+        with CaptureQueriesContext(self.replica) as queries:
+            resp = self.client.get('/posts/', {'project': self.project.id})
+        self.assertEqual(len(resp.data), 1)
+        self.assertEqual(len(queries), 0)
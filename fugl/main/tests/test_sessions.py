@@ -0,0 +1,80 @@
+from django.conf import settings
+from django.db import connection
+from django.test import SimpleTestCase
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from main.middleware import REFRESHED_KEY
+from main.sessions import TimeoutCappedCache
+
+from .base import FuglViewTestCase
+
+
+class SessionThrottlingTestCase(FuglViewTestCase):
+
+    url = '/users/session/'
+
+    def session_queries(self, queries):
+        return [q['sql'] for q in queries.captured_queries
+                if 'django_session' in q['sql']]
+
+    def test_unchanged_session_not_saved(self):
+        self.login()
+        self.assertIn(REFRESHED_KEY, self.client.session)
+        # not saved again, even the first time
+        resp = self.client.get(self.url)
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, resp.cookies)
+
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get(self.url)
+        self.assertEqual(resp.data, {'valid': True})
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, resp.cookies)
+        # read from the cache, too
+        self.assertEqual(self.session_queries(queries), [])
+
+    def test_refresh(self):
+        self.login()
+        self.client.get(self.url)
+        with override_settings(SESSION_REFRESH_FRACTION=0):
+            with CaptureQueriesContext(connection) as queries:
+                resp = self.client.get(self.url)
+        self.assertIn(settings.SESSION_COOKIE_NAME, resp.cookies)
+        self.assertNotEqual(self.session_queries(queries), [])
+        self.assertIn(REFRESHED_KEY, self.client.session)
+
+    def test_anonymous(self):
+        resp = self.client.get(self.url)
+        self.assertEqual(resp.data, {'valid': False})
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, resp.cookies)
+
+    def test_changed_session_saved(self):
+        resp = self.client.post('/users/authenticate/', {
+            'username': self.admin_user.username,
+            'password': self.admin_password,
+        })
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn(settings.SESSION_COOKIE_NAME, resp.cookies)
+
+
+class RecordingCache(object):
+
+    def __init__(self):
+        self.timeouts = []
+
+    def set(self, key, value, timeout=None):
+        self.timeouts.append(timeout)
+
+    def get(self, key, default=None):
+        return default
+
+
+class TimeoutCappedCacheTestCase(SimpleTestCase):
+
+    def test_set(self):
+        recording = RecordingCache()
+        cache = TimeoutCappedCache(recording, 60)
+        cache.set('a', 1, 3600)
+        cache.set('b', 1, 10)
+        cache.set('c', 1, None)
+        self.assertEqual(recording.timeouts, [60, 10, 60])
+        self.assertIsNone(cache.get('a'))
@@ -0,0 +1,123 @@
+"""
+Tests for marking projects dirty (and queueing rebuilds) on content changes.
+"""
+from unittest import mock
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from .base import FuglTestCase
+from main.models import Project
+
+
+class ContentChangedTestCase(FuglTestCase):
+
+    def setUp(self):
+        super().setUpTheme()
+        self.settings = override_settings(
+            PUBLISH_URL='https://example.com/sites/',
+        )
+        self.settings.enable()
+        self.project = self.create_project(
+            'published',
+            owner=self.admin_user,
+            preview_url='https://example.com/sites/admin_user/published/',
+        )
+        self.unpublished = self.create_project('unpublished',
+                                               owner=self.admin_user)
+
+        self.patcher = mock.patch('main.signals.get_build_queue')
+        self.queue = self.patcher.start().return_value
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.settings.disable()
+        super().tearDownTheme()
+
+    def assertDirty(self, project, dirty=True):
+        self.assertEqual(Project.objects.get(pk=project.pk).dirty, dirty)
+
+    def clean(self):
+        Project.objects.update(dirty=False)
+        self.queue.reset_mock()
+
+    def test_save(self):
+        post = self.create_post('post', 'content', project=self.project)
+        self.assertDirty(self.project)
+        self.queue.enqueue.assert_called_with(self.project.id)
+
+        self.clean()
+        post.content = 'new content'
+        post.save()
+        self.assertDirty(self.project)
+        self.queue.enqueue.assert_called_with(self.project.id)
+
+    def test_delete(self):
+        page = self.create_page('page', project=self.project)
+        self.clean()
+        page.delete()
+        self.assertDirty(self.project)
+        self.queue.enqueue.assert_called_with(self.project.id)
+
+    def test_every_content_model(self):
+        creators = [
+            self.create_category,
+            self.create_page,
+            self.create_page_plugin,
+            lambda title, **kwargs: self.create_post(title, 'content',
+                                                     **kwargs),
+            self.create_project_plugin,
+            self.create_tag,
+        ]
+        for create in creators:
+            self.clean()
+            create('thing', project=self.project)
+            self.assertDirty(self.project)
+            self.queue.enqueue.assert_called_with(self.project.id)
+
+    def test_relations(self):
+        post = self.create_post('post', 'content', project=self.project)
+        tag = self.create_tag('tag', project=self.project)
+        plugin = self.create_page_plugin('plugin', project=self.project)
+        self.clean()
+
+        post.tags.add(tag)
+        self.assertDirty(self.project)
+        self.clean()
+        post.post_plugins.add(plugin)
+        self.assertDirty(self.project)
+        self.clean()
+        post.post_plugins.clear()
+        self.assertDirty(self.project)
+
+    def test_unpublished(self):
+        self.create_post('post', 'content', project=self.unpublished)
+        self.assertDirty(self.unpublished, False)
+        self.assertFalse(self.queue.enqueue.called)
+
+    def test_delete_project(self):
+        post = self.create_post('post', 'content', project=self.project)
+        tag = self.create_tag('tag', project=self.project)
+        post.tags.add(tag)
+        self.create_category('category', project=self.project)
+        self.create_page('page', project=self.project)
+        self.clean()
+
+        with mock.patch('main.signals.get_debouncer') as get_debouncer, \
+                CaptureQueriesContext(connection) as queries:
+            Project.objects.get(pk=self.project.pk).delete()
+        self.assertFalse(self.queue.enqueue.called)
+        self.assertFalse(get_debouncer.called)
+        self.assertFalse([q for q in queries
+                          if q['sql'].startswith('UPDATE "main_project"')])
+
+        # editing other projects still marks them dirty
+        other = self.create_project(
+            'other',
+            owner=self.admin_user,
+            preview_url='https://example.com/sites/admin_user/other/',
+        )
+        self.clean()
+        self.create_post('post', 'content', project=other)
+        self.assertDirty(other)
@@ -0,0 +1,42 @@
+import io
+import json
+
+from django.test import SimpleTestCase
+
+from main.util.benchmark import Timer
+from main.util.benchmark import make_report
+from main.util.benchmark import percentile
+from main.util.benchmark import summarize
+from main.util.benchmark import write_report
+
+
+class BenchmarkTestCase(SimpleTestCase):
+
+    def test_timer(self):
+        with Timer() as t:
+            pass
+        self.assertGreaterEqual(t.elapsed, 0)
+
+    def test_percentile(self):
+        samples = list(range(1, 101))
+        self.assertEqual(percentile(samples, 0), 1)
+        self.assertEqual(percentile(samples, 50), 51)
+        self.assertEqual(percentile(samples, 100), 100)
+        self.assertIsNone(percentile([], 50))
+
+    def test_summarize(self):
+        summary = summarize([3, 1, 2])
+        self.assertEqual(summary['count'], 3)
+        self.assertEqual(summary['min'], 1)
+        self.assertEqual(summary['max'], 3)
+        self.assertEqual(summary['mean'], 2)
+        self.assertEqual(summary['p50'], 2)
+        self.assertEqual(summarize([]), {'count': 0})
+
+    def test_report(self):
+        stream = io.StringIO()
+        write_report(make_report('test', [{'a': 1}], seed=3), stream=stream)
+        report = json.loads(stream.getvalue())
+        self.assertEqual(report['benchmark'], 'test')
+        self.assertEqual(report['results'], [{'a': 1}])
+        self.assertEqual(report['seed'], 3)
@@ -0,0 +1,153 @@
+import threading
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from main.util.build_debouncer import BuildDebouncer
+
+# only reached if something is broken; the tests don't depend on timing
+TIMEOUT = 60
+
+
+class BuildDebouncerTestCase(SimpleTestCase):
+
+    def setUp(self):
+        # the debouncer's clock only moves when a test moves it
+        patcher = mock.patch('main.util.build_debouncer.time.monotonic',
+                             return_value=100)
+        self.clock = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def start(self, debouncer, project_id, key, fn, results):
+        def target():
+            try:
+                result = debouncer.run(project_id, key, fn)
+            except Exception as e:
+                result = e
+            results.append(result)
+        thread = threading.Thread(target=target)
+        thread.start()
+        return thread
+
+    def join(self, threads):
+        for thread in threads:
+            thread.join(TIMEOUT)
+            self.assertFalse(thread.is_alive())
+
+    def wait_for(self, predicate):
+        deadline = time.time() + TIMEOUT
+        while not predicate():
+            if time.time() > deadline:
+                self.fail('timed out')
+            time.sleep(0.001)
+
+    def test_runs_immediately_without_edits(self):
+        debouncer = BuildDebouncer(window=0, max_delay=0)
+        self.assertEqual(debouncer.run(1, 'a', lambda: 42), 42)
+
+    def test_waits_for_quiet(self):
+        debouncer = BuildDebouncer(window=0.1, max_delay=5)
+        debouncer.touch(1)
+        results = []
+        thread = self.start(debouncer, 1, 'a', lambda: 42, results)
+        self.wait_for(lambda: debouncer.stats()['pending'] == 1)
+        self.assertEqual(results, [])
+
+        self.clock.return_value = 100.1
+        self.join([thread])
+        self.assertEqual(results, [42])
+
+    def test_edits_to_other_projects_dont_delay(self):
+        debouncer = BuildDebouncer(window=5, max_delay=5)
+        debouncer.touch(2)
+        results = []
+        for _ in range(2):
+            # the clock never moves, so this only finishes without waiting
+            self.join([self.start(debouncer, 1, 'a', lambda: 42, results)])
+        self.assertEqual(results, [42, 42])
+
+    def test_max_delay(self):
+        debouncer = BuildDebouncer(window=5, max_delay=0.1)
+        debouncer.touch(1)
+        results = []
+        thread = self.start(debouncer, 1, 'a', lambda: 42, results)
+        self.wait_for(lambda: debouncer.stats()['pending'] == 1)
+        self.clock.return_value = 100.05
+        debouncer.touch(1)
+
+        self.clock.return_value = 100.1
+        self.join([thread])
+        self.assertEqual(results, [42])
+
+    def test_burst_collapses_to_newest(self):
+        debouncer = BuildDebouncer(window=0.2, max_delay=5)
+        calls = []
+
+        def build(n):
+            def fn():
+                calls.append(n)
+                return n
+            return fn
+
+        results = []
+        threads = []
+        for n in range(5):
+            debouncer.touch(1)
+            threads.append(self.start(debouncer, 1, 'a', build(n), results))
+            self.wait_for(lambda: debouncer.stats()['waiting'] == n + 1)
+        self.assertEqual(calls, [])
+
+        self.clock.return_value = 100.2
+        self.join(threads)
+        self.assertEqual(calls, [4])
+        self.assertEqual(results, [4] * 5)
+
+    def test_exception_propagates(self):
+        debouncer = BuildDebouncer(window=0.1, max_delay=5)
+        debouncer.touch(1)
+
+        def fail():
+            raise RuntimeError('nope')
+
+        results = []
+        threads = [self.start(debouncer, 1, 'a', fail, results)
+                   for _ in range(2)]
+        self.wait_for(lambda: debouncer.stats()['waiting'] == 2)
+
+        self.clock.return_value = 100.1
+        self.join(threads)
+        self.assertEqual(len(results), 2)
+        for result in results:
+            self.assertIsInstance(result, RuntimeError)
+
+    def test_waits_for_running_build(self):
+        debouncer = BuildDebouncer(window=0, max_delay=0)
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def slow():
+            calls.append('slow')
+            started.set()
+            release.wait(TIMEOUT)
+            return 'slow'
+
+        def fast():
+            calls.append('fast')
+            return 'fast'
+
+        results = []
+        first = self.start(debouncer, 1, 'a', slow, results)
+        self.assertTrue(started.wait(TIMEOUT))
+        # started after an edit the running build may not include, so it
+        # must not share that build's result
+        second = self.start(debouncer, 1, 'a', fast, results)
+        self.wait_for(lambda: debouncer.stats() == {
+            'running': 1, 'pending': 1, 'waiting': 1})
+        self.assertEqual(calls, ['slow'])
+        release.set()
+        self.join([first, second])
+
+        self.assertEqual(calls, ['slow', 'fast'])
+        self.assertEqual(results, ['slow', 'fast'])
@@ -0,0 +1,48 @@
+from django.db import connection
+
+from main.models import Theme
+from main.util.build_profile import BuildProfile
+
+from ..base import FuglTestCase
+
+
+class BuildProfileTestCase(FuglTestCase):
+
+    def test_spans(self):
+        profile = BuildProfile()
+        with profile.span('outer') as outer:
+            with profile.span('inner') as inner:
+                inner.count(files=1, bytes=10)
+                inner.count(files=1, bytes=5)
+            list(Theme.objects.all())
+
+        self.assertEqual([s.name for s in profile.spans], ['outer', 'inner'])
+        self.assertEqual(inner.counts['files'], 2)
+        self.assertEqual(inner.counts['bytes'], 15)
+        self.assertEqual(inner.counts['queries'], 0)
+        self.assertEqual(outer.counts['queries'], 1)
+        self.assertGreaterEqual(outer.elapsed, inner.elapsed)
+        self.assertIs(profile.get('inner'), inner)
+        self.assertIsNone(profile.get('missing'))
+
+    def test_queries_not_logged(self):
+        profile = BuildProfile()
+        with profile.span('phase') as span:
+            self.assertFalse(connection.force_debug_cursor)
+            list(Theme.objects.all())
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        self.assertEqual(span.counts['queries'], 2)
+
+        # and the connection is back to normal afterwards
+        self.assertNotIn('make_cursor', connection.__dict__)
+
+    def test_as_list(self):
+        profile = BuildProfile()
+        with profile.span('phase') as span:
+            span.count(files=3)
+
+        d = profile.as_list()[0]
+        self.assertEqual(d['name'], 'phase')
+        self.assertEqual(d['files'], 3)
+        self.assertIn('seconds', d)
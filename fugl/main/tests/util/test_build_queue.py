@@ -0,0 +1,85 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.test import override_settings
+
+from main.models import Project
+from main.tests.base import FuglTestCase
+from main.util.build_queue import BuildQueue
+
+
+class BuildQueueTestCase(FuglTestCase):
+
+    def setUp(self):
+        super().setUpTheme()
+        self.publish_root = tempfile.TemporaryDirectory()
+        self.settings = override_settings(
+            PUBLISH_ROOT=self.publish_root.name,
+            PUBLISH_URL='https://example.com/sites/',
+        )
+        self.settings.enable()
+
+        # created unpublished, so the signals don't queue anything
+        self.project = self.create_project('simple', owner=self.admin_user)
+        self.create_page('my-page', content='this is a page',
+                         project=self.project)
+        self.queue = BuildQueue()
+
+    def tearDown(self):
+        self.settings.disable()
+        self.publish_root.cleanup()
+        super().tearDownTheme()
+
+    def published(self, *path):
+        return os.path.join(self.publish_root.name, str(self.admin_user.pk),
+                            str(self.project.pk), *path)
+
+    def test_rebuilds_dirty_project(self):
+        Project.objects.filter(pk=self.project.pk).update(dirty=True)
+
+        url = self.queue.rebuild(self.project.id)
+
+        expected = 'https://example.com/sites/{0}/{1}/'.format(
+            self.admin_user.pk, self.project.pk)
+        self.assertEqual(url, expected)
+        self.assertTrue(os.path.isfile(self.published('pages',
+                                                      'my-page.html')))
+        project = Project.objects.get(pk=self.project.pk)
+        self.assertFalse(project.dirty)
+        self.assertEqual(project.preview_url, expected)
+
+    def test_skips_clean_project(self):
+        self.assertIsNone(self.queue.rebuild(self.project.id))
+        self.assertFalse(os.path.exists(self.published()))
+
+    def test_skips_deleted_project(self):
+        project_id = self.project.id
+        self.project.delete()
+        self.assertIsNone(self.queue.rebuild(project_id))
+
+    def test_failed_build_stays_dirty(self):
+        Project.objects.filter(pk=self.project.pk).update(dirty=True)
+
+        with mock.patch('main.util.site_generator.SiteGenerator.build',
+                        side_effect=RuntimeError('Pelican returned 1')):
+            with self.assertRaises(RuntimeError):
+                self.queue.rebuild(self.project.id)
+        self.assertTrue(Project.objects.get(pk=self.project.pk).dirty)
+
+    @override_settings(BUILD_RETRIES=2)
+    @mock.patch('main.util.build_queue.db')  # don't close the test's
+    def test_retries_failed_build(self, db):
+        with mock.patch.object(self.queue, 'rebuild',
+                               side_effect=RuntimeError), \
+                mock.patch('main.util.build_queue.threading.Timer') as timer:
+            for i in range(3):
+                self.queue._run(self.project.id)
+        # retried twice, then given up on
+        self.assertEqual(timer.call_count, 2)
+        self.assertEqual(timer.call_args[0][2], [self.project.id])
+
+        with mock.patch.object(self.queue, 'rebuild'), \
+                mock.patch('main.util.build_queue.threading.Timer') as timer:
+            self.queue._run(self.project.id)
+        self.assertFalse(timer.called)
@@ -0,0 +1,144 @@
+import threading
+import time
+
+from django.test import SimpleTestCase
+
+from main.util.build_scheduler import BuildScheduler
+
+# only reached if something is broken; the tests don't depend on timing
+TIMEOUT = 60
+
+
+class BuildSchedulerTestCase(SimpleTestCase):
+
+    def start(self, scheduler, user_id, key, fn, results):
+        def target():
+            try:
+                results[key, threading.get_ident()] = scheduler.run(
+                    user_id, key, fn)
+            except Exception as e:
+                results[key, threading.get_ident()] = e
+        thread = threading.Thread(target=target)
+        thread.start()
+        return thread
+
+    def join(self, threads):
+        for thread in threads:
+            thread.join(TIMEOUT)
+            self.assertFalse(thread.is_alive())
+
+    def wait_for(self, predicate, timeout=TIMEOUT):
+        deadline = time.time() + timeout
+        while not predicate():
+            if time.time() > deadline:
+                self.fail('timed out')
+            time.sleep(0.001)
+
+    def test_runs_and_returns(self):
+        scheduler = BuildScheduler(1, 1)
+        self.assertEqual(scheduler.run(1, 'a', lambda: 42), 42)
+        self.assertEqual(scheduler.stats(),
+                         {'running': 0, 'queued': 0, 'waiting': 0})
+
+    def test_exception_propagates(self):
+        scheduler = BuildScheduler(1, 1)
+
+        def fail():
+            raise RuntimeError('nope')
+        with self.assertRaises(RuntimeError):
+            scheduler.run(1, 'a', fail)
+        # the slot was released
+        self.assertEqual(scheduler.run(1, 'a', lambda: 1), 1)
+
+    def test_coalesces_duplicates(self):
+        scheduler = BuildScheduler(2, 2)
+        release = threading.Event()
+        calls = []
+
+        def build():
+            calls.append(1)
+            release.wait(TIMEOUT)
+            return object()
+
+        results = {}
+        threads = [self.start(scheduler, 1, 'same', build, results)]
+        self.wait_for(lambda: calls)
+        threads += [self.start(scheduler, 2, 'same', build, results)
+                    for _ in range(3)]
+        self.wait_for(lambda: scheduler.stats()['waiting'] == 3)
+        release.set()
+        self.join(threads)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(set(map(id, results.values()))), 1)
+
+    def test_caps(self):
+        scheduler = BuildScheduler(2, 1)
+        release = threading.Event()
+        lock = threading.Lock()
+        running = {'now': 0, 'max': 0, 'users': {}, 'max_users': {}}
+
+        def build(user_id):
+            def fn():
+                with lock:
+                    running['now'] += 1
+                    running['max'] = max(running['max'], running['now'])
+                    per_user = running['users'].get(user_id, 0) + 1
+                    running['users'][user_id] = per_user
+                    running['max_users'][user_id] = max(
+                        running['max_users'].get(user_id, 0), per_user)
+                release.wait(TIMEOUT)
+                with lock:
+                    running['now'] -= 1
+                    running['users'][user_id] -= 1
+                return user_id
+            return fn
+
+        results = {}
+        threads = []
+        for user_id in [1, 2, 3]:
+            for i in range(3):
+                key = (user_id, i)
+                threads.append(self.start(scheduler, user_id, key,
+                                          build(user_id), results))
+        self.wait_for(lambda: scheduler.stats()['queued'] == 7 and
+                      running['now'] == 2)
+        self.assertEqual(scheduler.stats()['running'], 2)
+        with lock:
+            self.assertEqual(list(running['users'].values()), [1, 1])
+        release.set()
+        self.join(threads)
+
+        self.assertEqual(len(results), 9)
+        self.assertLessEqual(running['max'], 2)
+        self.assertEqual(set(running['max_users'].values()), {1})
+
+    def test_fair_across_users(self):
+        scheduler = BuildScheduler(1, 1)
+        release = threading.Event()
+        order = []
+
+        def build(name):
+            def fn():
+                order.append(name)
+                if name == 'a0':
+                    release.wait(TIMEOUT)
+                return name
+            return fn
+
+        results = {}
+        threads = [self.start(scheduler, 'a', 'a0', build('a0'), results)]
+        self.wait_for(lambda: order)
+        for i in [1, 2]:
+            threads.append(self.start(scheduler, 'a', 'a%d' % i,
+                                      build('a%d' % i), results))
+        self.wait_for(lambda: scheduler.stats()['queued'] == 2)
+        threads.append(self.start(scheduler, 'b', 'b0', build('b0'),
+                                  results))
+        self.wait_for(lambda: scheduler.stats()['queued'] == 3)
+
+        release.set()
+        self.join(threads)
+
+        # b doesn't wait behind all of a's queued builds
+        self.assertEqual(order, ['a0', 'a1', 'b0', 'a2'])
@@ -0,0 +1,84 @@
+from django.contrib.auth import authenticate
+
+from main.models import ProjectAccess
+from main.models import User
+from main.util.fixtures import SyntheticProjectBuilder
+
+from ..base import FuglTestCase
+
+
+class SyntheticProjectBuilderTestCase(FuglTestCase):
+
+    def setUp(self):
+        super().setUpTheme()
+
+    def tearDown(self):
+        super().tearDownTheme()
+
+    def build(self, title, seed=0):
+        return SyntheticProjectBuilder(seed=seed).build(
+            self.admin_user, self.default_theme, title,
+            posts=20, pages=3, categories=4, tags=6, plugins=2, words=50,
+        )
+
+    def test_counts(self):
+        project = self.build('synthetic')
+        self.assertEqual(project.post_set.count(), 20)
+        self.assertEqual(project.page_set.count(), 3)
+        self.assertEqual(project.category_set.count(), 4)
+        self.assertEqual(project.tag_set.count(), 6)
+        self.assertEqual(project.pageplugin_set.count(), 2)
+        self.assertEqual(project.projectplugin_set.count(), 2)
+        for post in project.post_set.all():
+            self.assertEqual(post.category.project, project)
+        # linked through Tag.posts too, which is what the tags API reads
+        tags = project.tag_set.all()
+        links = {(post.pk, tag.pk)
+                 for tag in tags for post in tag.posts.all()}
+        self.assertTrue(links)
+        self.assertEqual(links, {(post.pk, tag.pk)
+                                 for post in project.post_set.all()
+                                 for tag in post.tags.all()})
+        project.delete()
+
+    def test_deterministic(self):
+        first = self.build('first')
+        second = self.build('second')
+        titles = lambda p: list(p.post_set.order_by('id')
+                                .values_list('title', 'content'))
+        self.assertEqual(titles(first), titles(second))
+        first.delete()
+        second.delete()
+
+    def test_users(self):
+        users = SyntheticProjectBuilder().users('load_', 3, 'secret')
+        self.assertEqual([u.username for u in users],
+                         ['load_00000', 'load_00001', 'load_00002'])
+        self.assertEqual(
+            User.objects.filter(username__startswith='load_').count(), 3)
+        self.assertEqual(authenticate(username='load_00001',
+                                      password='secret'), users[1])
+        User.objects.filter(username__startswith='load_').delete()
+
+    def test_size(self):
+        builder = SyntheticProjectBuilder()
+        self.assertEqual({builder.size({'small': 1}) for _ in range(10)},
+                         {'small'})
+        picked = [builder.size({'small': 1, 'large': 1}) for _ in range(100)]
+        self.assertEqual(set(picked), {'small', 'large'})
+
+    def test_share(self):
+        builder = SyntheticProjectBuilder()
+        users = builder.users('load_', 4, 'secret')
+        projects = [
+            self.create_project('shared-%d' % i, owner=user)
+            for i, user in enumerate(users)
+        ]
+
+        builder.share(projects, users, 2)
+        for project in projects:
+            accesses = ProjectAccess.objects.filter(project=project)
+            self.assertEqual(accesses.count(), 2)
+            self.assertNotIn(project.owner_id,
+                             [a.user_id for a in accesses])
+        User.objects.filter(username__startswith='load_').delete()
@@ -0,0 +1,59 @@
+from django.test import LiveServerTestCase
+from django.test import SimpleTestCase
+
+from main.models import Theme
+from main.models import User
+from main.util.fixtures import SyntheticProjectBuilder
+from main.util.loadtest import LoadTest
+from main.util.loadtest import Recorder
+
+
+class RecorderTestCase(SimpleTestCase):
+
+    def test_results(self):
+        recorder = Recorder()
+        for elapsed in [0.1, 0.2, 0.3, 0.4]:
+            recorder.record('posts.create', elapsed)
+        recorder.record('projects.list', 0.5, ok=False)
+
+        results = recorder.results(wall_seconds=2)
+        self.assertEqual(list(results), ['posts.create', 'projects.list'])
+        self.assertEqual(results['posts.create']['count'], 4)
+        self.assertEqual(results['posts.create']['errors'], 0)
+        self.assertEqual(results['posts.create']['rps'], 2)
+        self.assertEqual(results['posts.create']['max'], 0.4)
+        self.assertEqual(results['projects.list']['errors'], 1)
+
+
+class LoadTestTestCase(LiveServerTestCase):
+
+    def setUp(self):
+        builder = SyntheticProjectBuilder(seed=0)
+        self.users = builder.users('load_', 2, 'load')
+        theme = Theme.objects.create(title='default', filepath='notmyidea',
+                                     creator=self.users[0])
+        projects = [
+            builder.build(user, theme, 'project', posts=3, pages=1,
+                          categories=1, tags=2, plugins=1, words=20)
+            for user in self.users
+        ]
+        builder.share(projects, self.users, 1)
+
+    def tearDown(self):
+        User.objects.filter(username__startswith='load_').delete()
+
+    def test_run(self):
+        results = LoadTest(
+            self.live_server_url,
+            [user.username for user in self.users],
+            'load',
+            scenarios=['list', 'lookup', 'posts', 'access'],
+            concurrency=2,
+            duration=1,
+        ).run()
+
+        self.assertIn('projects.list', results)
+        for endpoint, summary in results.items():
+            self.assertGreater(summary['count'], 0)
+            self.assertEqual(summary['errors'], 0, endpoint)
+            self.assertGreater(summary['rps'], 0)
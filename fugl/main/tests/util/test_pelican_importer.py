@@ -0,0 +1,187 @@
+import os
+import tempfile
+from collections import Counter
+from datetime import datetime
+
+from django.test import SimpleTestCase
+from django.utils import timezone
+
+from main.models import Category
+from main.tests.base import FuglTestCase
+from main.util.pelican_importer import PARALLEL_THRESHOLD
+from main.util.pelican_importer import import_sources
+from main.util.pelican_importer import parse_metadata
+from main.util.pelican_importer import parse_source
+from main.util.pelican_importer import parse_sources
+from main.util.site_generator import SiteGenerator
+
+
+def write(root, path, text):
+    full = os.path.join(root, path)
+    os.makedirs(os.path.dirname(full), exist_ok=True)
+    with open(full, 'w', encoding='utf-8') as f:
+        f.write(text)
+    return full
+
+
+class ParseMetadataTestCase(SimpleTestCase):
+
+    def test_basic(self):
+        meta, content = parse_metadata('Title: Hi\nTags: a, b\n\nBody\n')
+        self.assertEqual(meta, {'title': 'Hi', 'tags': 'a, b'})
+        self.assertEqual(content, 'Body\n')
+
+    def test_keys_are_case_insensitive(self):
+        meta, _ = parse_metadata('TITLE: Hi\n\n')
+        self.assertEqual(meta, {'title': 'Hi'})
+
+    def test_continuation(self):
+        meta, _ = parse_metadata('Summary: one\n    two\n\nBody')
+        self.assertEqual(meta['summary'], 'one\ntwo')
+
+    def test_content_without_blank_line(self):
+        meta, content = parse_metadata('Title: Hi\nSlug: hi\nSome *text*')
+        self.assertEqual(meta, {'title': 'Hi', 'slug': 'hi'})
+        self.assertEqual(content, 'Some *text*')
+
+    def test_no_metadata(self):
+        meta, content = parse_metadata('Just text\n')
+        self.assertEqual(meta, {})
+        self.assertEqual(content, 'Just text\n')
+
+
+class ParseSourcesTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.content_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.content_dir.cleanup()
+
+    def test_errors_are_reported(self):
+        write(self.content_dir.name, 'good.md', 'Title: good\n\ntext')
+        write(self.content_dir.name, 'bad.md', 'Title: bad\nDate: soon\n\n')
+        write(self.content_dir.name, 'notes.txt', 'not markdown')
+
+        sources, errors = parse_sources(self.content_dir.name, workers=1)
+        self.assertEqual([s.title for s in sources], ['good'])
+        self.assertEqual([path for path, _ in errors], ['bad.md'])
+
+    def test_parallel(self):
+        count = PARALLEL_THRESHOLD + 10
+        for i in range(count):
+            write(self.content_dir.name, 'post-%03d.md' % i,
+                  'Title: post %d\nDate: 2016-01-01\n\ntext' % i)
+
+        sources, errors = parse_sources(self.content_dir.name, workers=2)
+        self.assertEqual(errors, [])
+        self.assertEqual([s.title for s in sources],
+                         ['post %d' % i for i in range(count)])
+
+
+class PelicanImporterTestCase(FuglTestCase):
+
+    def setUp(self):
+        super().setUpTheme()
+        self.project = self.create_project('imported', owner=self.admin_user)
+        self.content_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.content_dir.cleanup()
+        self.project.delete()
+        super().tearDownTheme()
+
+    def test_round_trip_post(self):
+        created = timezone.make_aware(datetime(2016, 4, 14, 19, 38))
+        updated = timezone.make_aware(datetime(2016, 4, 15, 9, 0))
+        post = self.create_post('Hello World', 'some *markdown*\n\nmore',
+                                project=self.project, date_created=created,
+                                date_updated=updated)
+        path = os.path.join('news', 'hello-world.md')
+        full = write(self.content_dir.name, path,
+                     post.get_markdown(slug='hello-world'))
+
+        source = parse_source(path, full)
+        self.assertEqual(source.kind, 'post')
+        self.assertEqual(source.title, 'Hello World')
+        self.assertEqual(source.date.date(), created.date())
+        self.assertEqual(source.modified.date(), updated.date())
+        self.assertEqual(source.category, 'news')
+        self.assertEqual(source.content, 'some *markdown*\n\nmore')
+
+    def test_top_level_post(self):
+        full = write(self.content_dir.name, 'loose.md',
+                     'Title: Loose\nDate: 2016-01-01\n\ntext')
+        self.assertEqual(parse_source('loose.md', full).category, 'misc')
+        self.assertEqual(parse_source('loose.md', full, 'notes').category,
+                         'notes')
+
+        result = import_sources(self.project, self.content_dir.name,
+                                workers=1, default_category='notes')
+        self.assertEqual(result.categories, 1)
+        post = self.project.post_set.get()
+        self.assertEqual(post.category.title, 'notes')
+        # which the site generator can write out
+        with tempfile.TemporaryDirectory() as site_dir:
+            SiteGenerator(self.project).write_posts([post], Counter(),
+                                                    site_dir)
+            self.assertTrue(os.path.isfile(
+                os.path.join(site_dir, 'content', 'notes', 'loose.md')))
+
+    def test_round_trip_page(self):
+        page = self.create_page('About', content='about *me*',
+                                project=self.project)
+        path = os.path.join('pages', 'about.md')
+        full = write(self.content_dir.name, path,
+                     page.get_markdown(slug='about'))
+
+        source = parse_source(path, full)
+        self.assertEqual(source.kind, 'page')
+        self.assertEqual(source.title, 'About')
+        self.assertEqual(source.content, 'about *me*')
+
+    def test_import(self):
+        existing = self.create_category('news', project=self.project)
+        write(self.content_dir.name, os.path.join('news', 'one.md'),
+              'Title: One\nDate: 2016-01-01 10:00\nTags: a, b\n\nfirst')
+        write(self.content_dir.name, 'two.md',
+              'Title: Two\nDate: 2016-01-02\nCategory: misc\nTags: b\n\n'
+              'second')
+        write(self.content_dir.name, 'three.md',
+              'Title: Three\nDate: 2016-01-03\n\nthird')
+        write(self.content_dir.name, os.path.join('pages', 'about.md'),
+              'Title: About\n\nabout me')
+        write(self.content_dir.name, 'broken.md',
+              'Title: Broken\nDate: whenever\n\n')
+
+        result = import_sources(self.project, self.content_dir.name,
+                                workers=1)
+        self.assertEqual(result.posts, 3)
+        self.assertEqual(result.pages, 1)
+        self.assertEqual(result.categories, 2)
+        self.assertEqual(result.tags, 2)
+        self.assertEqual([path for path, _ in result.errors], ['broken.md'])
+
+        one = self.project.post_set.get(title='One')
+        self.assertEqual(one.category, existing)
+        self.assertEqual(one.content, 'first')
+        self.assertEqual(one.date_created, timezone.make_aware(
+            datetime(2016, 1, 1, 10, 0)))
+        self.assertEqual(one.date_updated, one.date_created)
+        self.assertEqual(sorted(t.title for t in one.tags.all()), ['a', 'b'])
+
+        two = self.project.post_set.get(title='Two')
+        self.assertEqual(two.category.title, 'misc')
+        self.assertEqual([t.title for t in two.tags.all()], ['b'])
+        # top level, no Category: Pelican's DEFAULT_CATEGORY
+        self.assertEqual(
+            self.project.post_set.get(title='Three').category, two.category)
+
+        self.assertEqual(self.project.page_set.get().content, 'about me')
+        self.assertEqual(
+            Category.objects.filter(project=self.project).count(), 2)
+        self.assertEqual(self.project.tag_set.count(), 2)
+        # what the tags API shows
+        b = self.project.tag_set.get(title='b')
+        self.assertEqual(sorted(p.title for p in b.posts.all()),
+                         ['One', 'Two'])
@@ -0,0 +1,197 @@
+import gzip
+import io
+import json
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+from main.models import Project
+from main.tests.base import FuglTestCase
+from main.util.project_archive import export_project
+from main.util.project_archive import import_project
+
+
+def archive_of(project):
+    return io.BytesIO(b''.join(export_project(project)))
+
+
+def make_archive(*records):
+    lines = [json.dumps(record).encode('utf-8') for record in records]
+    return io.BytesIO(gzip.compress(b'\n'.join(lines) + b'\n'))
+
+
+class ProjectArchiveTestCase(FuglTestCase):
+
+    def setUp(self):
+        super().setUpTheme()
+        self.user = self.create_user('importer')
+        self.project = self.create_project('source', description='a site',
+                                           owner=self.admin_user)
+        self.category = self.create_category('news', project=self.project)
+        self.tag = self.create_tag('fun', project=self.project)
+        self.page_plugin = self.create_page_plugin('analytics',
+                                                   project=self.project)
+        self.create_project_plugin('footer', project=self.project)
+
+        created = timezone.now() - timedelta(days=3)
+        self.post = self.create_post('hello', 'hello *world*',
+                                     project=self.project,
+                                     category=self.category,
+                                     date_created=created)
+        self.uncategorized = self.create_post('loose', 'no category',
+                                              project=self.project)
+        self.page = self.create_page('about', content='about me',
+                                     project=self.project)
+        self.post.tags.add(self.tag)
+        self.post.post_plugins.add(self.page_plugin)
+        self.page.post_plugins.add(self.page_plugin)
+        self.tag.posts.add(self.uncategorized)
+
+    def tearDown(self):
+        self.user.delete()
+        super().tearDownTheme()
+
+    def test_header(self):
+        with gzip.GzipFile(fileobj=archive_of(self.project)) as f:
+            header = json.loads(f.readline().decode('utf-8'))
+        self.assertEqual(header['format'], 'fugl-project')
+        self.assertEqual(header['version'], 1)
+        self.assertEqual(header['project']['title'], 'source')
+        self.assertEqual(header['project']['theme'], 'default')
+
+    def test_round_trip(self):
+        project = import_project(archive_of(self.project), self.user)
+
+        self.assertEqual(project.title, 'source')
+        self.assertEqual(project.description, 'a site')
+        self.assertEqual(project.owner, self.user)
+        self.assertEqual(project.theme, self.default_theme)
+
+        post = project.post_set.get(title='hello')
+        self.assertNotEqual(post.pk, self.post.pk)
+        self.assertEqual(post.content, 'hello *world*')
+        self.assertEqual(post.date_created, self.post.date_created)
+        self.assertEqual(post.date_updated, self.post.date_updated)
+        self.assertEqual(post.category.title, 'news')
+        self.assertEqual(post.category.project, project)
+        self.assertEqual([t.title for t in post.tags.all()], ['fun'])
+        self.assertEqual([p.title for p in post.post_plugins.all()],
+                         ['analytics'])
+        self.assertIsNone(project.post_set.get(title='loose').category)
+
+        page = project.page_set.get()
+        self.assertEqual(page.content, 'about me')
+        self.assertEqual([p.title for p in page.post_plugins.all()],
+                         ['analytics'])
+        tag = project.tag_set.get()
+        self.assertEqual([p.title for p in tag.posts.all()], ['loose'])
+        self.assertEqual(project.projectplugin_set.get().title, 'footer')
+        self.assertEqual(project.pageplugin_set.get().body_markup,
+                         'body_markup')
+
+        # the original is untouched
+        self.assertEqual(self.project.post_set.count(), 2)
+
+    def test_new_title(self):
+        project = import_project(archive_of(self.project), self.admin_user,
+                                 title='copy')
+        self.assertEqual(project.title, 'copy')
+        self.assertEqual(project.post_set.count(), 2)
+
+    def test_duplicate_title(self):
+        with self.assertRaises(ValidationError):
+            import_project(archive_of(self.project), self.admin_user)
+        self.assertEqual(Project.objects.filter(title='source').count(), 1)
+
+    def test_missing_theme(self):
+        archive = archive_of(self.project)
+        self.default_theme.title = 'renamed'
+        self.default_theme.save()
+
+        with self.assertRaises(ValidationError):
+            import_project(archive, self.user)
+
+        archive.seek(0)
+        project = import_project(archive, self.user, theme=self.default_theme)
+        self.assertEqual(project.theme, self.default_theme)
+
+    def test_not_an_archive(self):
+        with self.assertRaises(ValidationError):
+            import_project(io.BytesIO(b'not gzip'), self.user)
+        with self.assertRaises(ValidationError):
+            import_project(make_archive({'format': 'zip'}), self.user)
+
+    def test_wrong_version(self):
+        archive = make_archive({'format': 'fugl-project', 'version': 99})
+        with self.assertRaises(ValidationError):
+            import_project(archive, self.user)
+
+    def test_no_description(self):
+        self.project.description = ''
+        self.project.save()
+        project = import_project(archive_of(self.project), self.user)
+        self.assertEqual(project.description, '')
+
+    def test_malformed_header(self):
+        header = {'format': 'fugl-project', 'version': 1}
+        for extra in [{}, {'project': 'x', 'fields': {}},
+                      {'project': {'title': 'x', 'description': '',
+                                   'theme': 'default'},
+                       'fields': {'tag': 'title'}},
+                      {'project': {'title': 'x', 'theme': 'default'},
+                       'fields': {}}]:
+            with self.assertRaises(ValidationError):
+                import_project(make_archive(dict(header, **extra)),
+                               self.user)
+        self.assertFalse(Project.objects.filter(title='x').exists())
+
+    def test_malformed_records(self):
+        header = {
+            'format': 'fugl-project',
+            'version': 1,
+            'project': {'title': 'broken', 'description': '',
+                        'theme': 'default'},
+            'fields': {'tag': ['title']},
+        }
+        for record in [{'tag': 1}, ['tag'], 'tag', [['tag'], 1]]:
+            with self.assertRaises(ValidationError):
+                import_project(make_archive(header, record), self.user)
+        self.assertFalse(Project.objects.filter(title='broken').exists())
+
+    def test_invalid_records(self):
+        header = {
+            'format': 'fugl-project',
+            'version': 1,
+            'project': {'title': 'broken', 'description': '',
+                        'theme': 'default'},
+            'fields': {'tag': ['title'],
+                       'post': ['title', 'content', 'date_created',
+                                'date_updated', 'category']},
+        }
+        now = timezone.now().isoformat()
+        for records in [
+                [['tag', 1]],                           # short
+                [['tag', 1, 'a', 'b']],                 # long
+                [['tag', 1, None]],                     # null title
+                [['tag', 1, 'x' * 51]],                 # too long
+                [['tag', 1, 'a'], ['tag', 2, 'a']],     # duplicate
+                [['post', 1, 'a', 'b', 'never', now, None]],
+                [['tag', 1, 'a'], ['post.tags', 1]],
+        ]:
+            with self.assertRaises(ValidationError):
+                import_project(make_archive(header, *records), self.user)
+        self.assertFalse(Project.objects.filter(title='broken').exists())
+
+    def test_bad_reference_saves_nothing(self):
+        header = {
+            'format': 'fugl-project',
+            'version': 1,
+            'project': {'title': 'broken', 'description': '',
+                        'theme': 'default'},
+            'fields': {'tag': ['title']},
+        }
+        archive = make_archive(header, ['tag', 1, 'a'], ['post.tags', 7, 1])
+        with self.assertRaises(ValidationError):
+            import_project(archive, self.user)
+        self.assertFalse(Project.objects.filter(title='broken').exists())
@@ -0,0 +1,102 @@
+import os
+import tempfile
+import zipfile
+
+from django.core.exceptions import ValidationError
+from django.test import override_settings
+
+from main.models import Theme
+from main.util import register_theme
+from main.util.theme_registry import static_archive
+from main.util.theme_registry import validate_theme
+
+from ..base import FuglTestCase
+
+
+class ThemeRegistryTestCase(FuglTestCase):
+
+    def setUp(self):
+        super().setUpTheme()
+
+        self.theme_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.settings = override_settings(
+            BUILD_CACHE_ROOT=self.cache_dir.name,
+            THEMES_ROOT=tempfile.gettempdir(),
+        )
+        self.settings.enable()
+
+        self.write('templates/base.html', '<body>{% block content %}'
+                                          '{% endblock %}</body>')
+        self.write('templates/article.html', '{% extends "base.html" %}'
+                                             '{% block content %}'
+                                             '{{ article.title }}'
+                                             '{% endblock %}')
+        self.write('static/css/main.css', 'body { color: red; }')
+
+    def tearDown(self):
+        self.settings.disable()
+        self.cache_dir.cleanup()
+        self.theme_dir.cleanup()
+        super().tearDownTheme()
+
+    def write(self, name, content):
+        path = os.path.join(self.theme_dir.name, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(content)
+
+    def test_validate_good_theme(self):
+        validate_theme(self.theme_dir.name)
+
+    def test_validate_missing_templates(self):
+        with tempfile.TemporaryDirectory() as empty:
+            with self.assertRaises(ValidationError):
+                validate_theme(empty)
+
+    def test_validate_syntax_error(self):
+        self.write('templates/page.html', '{% block content %}')
+        with self.assertRaises(ValidationError) as cm:
+            validate_theme(self.theme_dir.name)
+        self.assertIn('page.html', cm.exception.messages[0])
+
+    def test_validate_missing_reference(self):
+        self.write('templates/page.html', '{% include "nope.html" %}')
+        with self.assertRaises(ValidationError) as cm:
+            validate_theme(self.theme_dir.name)
+        self.assertIn('nope.html', cm.exception.messages[0])
+
+    def test_register(self):
+        theme = Theme(title='registered', filepath=self.theme_dir.name,
+                      creator=self.admin_user)
+        register_theme(theme)
+
+        theme = Theme.objects.get(pk=theme.pk)
+        self.assertEqual(len(theme.content_hash), 40)
+        self.assertIsNotNone(theme.registered_at)
+
+        archive = static_archive(theme)
+        self.assertIsNotNone(archive)
+        with zipfile.ZipFile(archive) as arc:
+            self.assertEqual(arc.namelist(), ['theme/css/main.css'])
+
+        theme.delete()
+
+    def test_register_invalid_saves_nothing(self):
+        self.write('templates/page.html', '{% block content %}')
+        theme = Theme(title='broken', filepath=self.theme_dir.name,
+                      creator=self.admin_user)
+        with self.assertRaises(ValidationError):
+            register_theme(theme)
+        self.assertFalse(Theme.objects.filter(title='broken').exists())
+
+    def test_static_archive_goes_stale(self):
+        theme = Theme(title='registered', filepath=self.theme_dir.name,
+                      creator=self.admin_user)
+        register_theme(theme)
+        self.assertIsNotNone(static_archive(theme))
+
+        self.write('static/css/extra.css', 'p { color: blue; }')
+        self.assertIsNone(static_archive(theme))
+
+        theme.delete()
@@ -0,0 +1,69 @@
+import os
+import tempfile
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.test import SimpleTestCase
+from django.test import override_settings
+
+from main.models import Theme
+from main.util.themes import bytecode_cache_dir
+from main.util.themes import get_environment
+from main.util.themes import template_fingerprint
+from main.util.themes import theme_path
+
+
+class ThemesTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.theme_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = tempfile.TemporaryDirectory()
+        templates = os.path.join(self.theme_dir.name, 'templates')
+        os.makedirs(templates)
+        self.template = os.path.join(templates, 'article.html')
+        with open(self.template, 'w') as f:
+            f.write('<h1>{{ article.title }}</h1>')
+
+        self.theme = Theme(pk=1, title='theme', filepath=self.theme_dir.name)
+        self.settings = override_settings(
+            BUILD_CACHE_ROOT=self.cache_dir.name,
+            THEMES_ROOT=tempfile.gettempdir(),
+        )
+        self.settings.enable()
+
+    def tearDown(self):
+        self.settings.disable()
+        self.cache_dir.cleanup()
+        self.theme_dir.cleanup()
+
+    def test_theme_path(self):
+        path = os.path.realpath(self.theme_dir.name)
+        self.assertEqual(theme_path(self.theme_dir.name), path)
+        self.assertEqual(theme_path(os.path.basename(path)), path)
+        self.assertTrue(theme_path('notmyidea').endswith('notmyidea'))
+
+    def test_theme_path_outside_root(self):
+        for filepath in ['/etc', '..', '../etc', 'notmyidea/../..']:
+            with self.assertRaises(SuspiciousFileOperation):
+                theme_path(filepath)
+
+    def test_fingerprint_changes_with_templates(self):
+        before = template_fingerprint(self.theme_dir.name)
+        self.assertEqual(template_fingerprint(self.theme_dir.name), before)
+
+        with open(self.template, 'a') as f:
+            f.write('<p>{{ article.content }}</p>')
+        self.assertNotEqual(template_fingerprint(self.theme_dir.name), before)
+
+    def test_bytecode_cache_dir(self):
+        path = bytecode_cache_dir(self.theme)
+        self.assertTrue(os.path.isdir(path))
+        self.assertTrue(path.startswith(self.cache_dir.name))
+        self.assertEqual(bytecode_cache_dir(self.theme), path)
+
+    def test_environment_writes_bytecode(self):
+        env = get_environment(self.theme)
+        template = env.get_template('article.html')
+        self.assertEqual(template.render(article={'title': 'hi'}),
+                         '<h1>hi</h1>')
+        self.assertTrue(os.listdir(bytecode_cache_dir(self.theme)))
+        self.assertIs(get_environment(self.theme), env)
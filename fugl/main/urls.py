@@ -1,5 +1,6 @@
 from rest_framework import routers
 
+from .api import BuildViewSet
 from .api import CategoryViewSet
 from .api import PagePluginViewSet
 from .api import PageViewSet
@@ -21,4 +22,5 @@ router.register(r'tags', TagViewSet)
 router.register(r'project_plugins', ProjectPluginViewSet)
 router.register(r'page_plugins', PagePluginViewSet)
 router.register(r'themes', ThemeViewSet)
+router.register(r'builds', BuildViewSet)
 urlpatterns = router.urls
@@ -1,3 +1,11 @@
+from .build_debouncer import get_debouncer
+from .build_queue import get_build_queue
+from .build_queue import run_build
+from .build_scheduler import get_scheduler
+from .post_preview import PostPreviewer
 from .site_generator import GeneratedSite
 from .site_generator import SiteGenerator
+from .site_generator import publish_dir
+from .site_generator import unpublish
+from .theme_registry import register_theme
 from .user_access import UserAccess
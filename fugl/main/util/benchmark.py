@@ -0,0 +1,78 @@
+"""
+Small helpers shared by the benchmark management commands: timing, summary
+statistics, and a common JSON report format so results can be compared
+across releases.
+"""
+import json
+import platform
+import sys
+import time
+from datetime import datetime
+
+import django
+
+
+REPORT_VERSION = 1
+
+
+class Timer(object):
+    """Context manager measuring wall-clock time, in seconds."""
+
+    def __init__(self):
+        self.elapsed = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.elapsed = time.perf_counter() - self._start
+        return False
+
+
+def percentile(sorted_samples, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_samples:
+        return None
+    rank = int(round(pct / 100.0 * (len(sorted_samples) - 1)))
+    return sorted_samples[rank]
+
+
+def summarize(samples):
+    """Summary statistics (in the samples' unit) for a list of timings."""
+    ordered = sorted(samples)
+    if not ordered:
+        return {'count': 0}
+    return {
+        'count': len(ordered),
+        'min': ordered[0],
+        'max': ordered[-1],
+        'mean': sum(ordered) / len(ordered),
+        'p50': percentile(ordered, 50),
+        'p95': percentile(ordered, 95),
+        'p99': percentile(ordered, 99),
+    }
+
+
+def make_report(name, results, **extra):
+    report = {
+        'benchmark': name,
+        'version': REPORT_VERSION,
+        'created': datetime.utcnow().isoformat() + 'Z',
+        'python': sys.version.split()[0],
+        'django': django.get_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+    report.update(extra)
+    return report
+
+
+def write_report(report, path=None, stream=None):
+    """Write a report as JSON to `path`, or to `stream` if no path given."""
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if path:
+        with open(path, 'w') as f:
+            f.write(text + '\n')
+    else:
+        stream.write(text + '\n')
@@ -0,0 +1,126 @@
+"""
+Collapses rapid successive build requests for a project into one build.
+
+Editors tend to save a few posts in a row, regenerating after each one.
+Rather than building the site for every save, a build request waits until
+the project has been quiet (no edits, no new requests for the same build)
+for a short window, and then runs once (straight away, if nothing happened
+recently); everyone who asked in the meantime gets the result of that one
+build, which is the newest one.  A build is never held back for more than
+`max_delay` seconds, so a steady stream of edits can't starve it.
+
+The write endpoints report edits with `touch(project_id)`.  Like the
+BuildScheduler, state is per process (an edit handled by one uWSGI process
+doesn't delay a build in another) and builds run on a caller's thread.
+"""
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+
+
+class BuildDebouncer(object):
+
+    def __init__(self, window, max_delay):
+        self.window = window
+        self.max_delay = max_delay
+        self._cond = threading.Condition()
+        self._edits = {}  # project -> time of the last edit
+        self._pending = {}  # key -> _Batch waiting to start
+        self._running = set()  # keys with a build running
+
+    def touch(self, project_id):
+        """Note that a project was just edited."""
+        with self._cond:
+            self._edits[project_id] = time.monotonic()
+
+    def run(self, project_id, key, fn):
+        """
+        Run `fn()` as build `key` of the project once things have settled
+        down, and return its result (or raise its exception).  If build
+        `key` is already waiting to start, the newest `fn` replaces it and
+        every caller gets its result.
+        """
+        with self._cond:
+            batch = self._pending.get(key)
+            if batch is not None:
+                batch.fn = fn
+                batch.last = time.monotonic()
+                batch.callers += 1
+                leader = False
+            else:
+                batch = self._pending[key] = _Batch(fn)
+                leader = True
+                self._wait(project_id, key, batch)
+                del self._pending[key]
+                self._running.add(key)
+
+        if not leader:
+            return batch.future.result()
+
+        try:
+            result = batch.fn()
+        except BaseException as e:
+            batch.future.set_exception(e)
+            raise
+        else:
+            batch.future.set_result(result)
+            return result
+        finally:
+            with self._cond:
+                self._running.discard(key)
+                self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'running': len(self._running),
+                'pending': len(self._pending),
+                'waiting': sum(batch.callers
+                               for batch in self._pending.values()),
+            }
+
+    def _wait(self, project_id, key, batch):
+        """
+        Block until the batch is due and no build with the same key is still
+        running (that one started before the latest edits).  Caller holds
+        the lock.
+        """
+        while True:
+            now = time.monotonic()
+            last = max(batch.last, self._edits.get(project_id, 0))
+            if last:
+                due = min(last + self.window, batch.created + self.max_delay)
+            else:
+                due = now  # nothing to wait for
+            if key in self._running:
+                self._cond.wait(due - now if now < due else None)
+            elif now < due:
+                self._cond.wait(due - now)
+            else:
+                return
+
+
+class _Batch(object):
+
+    def __init__(self, fn):
+        self.fn = fn
+        self.future = Future()
+        self.created = time.monotonic()
+        self.last = 0  # when another request last joined
+        self.callers = 1
+
+
+_debouncer = None
+_debouncer_lock = threading.Lock()
+
+
+def get_debouncer():
+    """The process-wide BuildDebouncer, configured from settings."""
+    global _debouncer
+    with _debouncer_lock:
+        if _debouncer is None:
+            _debouncer = BuildDebouncer(settings.BUILD_DEBOUNCE_WINDOW,
+                                        settings.BUILD_DEBOUNCE_MAX_DELAY)
+        return _debouncer
@@ -0,0 +1,144 @@
+"""
+Timing spans for the phases of a site build.
+
+SiteGenerator wraps each phase in `profile.span(name)`; each span records
+its wall-clock time, the number of database queries made inside it, and
+whatever counts (files, bytes, ...) the phase adds.  The finished spans are
+stored on the Build, so we can tell where the time went for a slow build.
+"""
+import time
+from collections import OrderedDict
+
+from django.db import connections
+
+
+class Span(object):
+
+    def __init__(self, name):
+        self.name = name
+        self.elapsed = None
+        self.counts = OrderedDict()
+
+    def count(self, **counts):
+        for key, value in counts.items():
+            self.counts[key] = self.counts.get(key, 0) + value
+
+    def as_dict(self):
+        d = OrderedDict([('name', self.name), ('seconds', self.elapsed)])
+        d.update(self.counts)
+        return d
+
+
+class BuildProfile(object):
+
+    def __init__(self):
+        self.spans = []
+
+    def span(self, name):
+        return _SpanContext(self, name)
+
+    def get(self, name):
+        """The most recent span called `name`, or None."""
+        for span in reversed(self.spans):
+            if span.name == name:
+                return span
+        return None
+
+    def as_list(self):
+        return [span.as_dict() for span in self.spans]
+
+
+class _SpanContext(object):
+
+    def __init__(self, profile, name):
+        self.profile = profile
+        self.span = Span(name)
+        self.queries = QueryCounter()
+
+    def __enter__(self):
+        # spans are listed in the order they start
+        self.profile.spans.append(self.span)
+        self.queries.__enter__()
+        self.start = time.perf_counter()
+        return self.span
+
+    def __exit__(self, *exc_info):
+        self.span.elapsed = time.perf_counter() - self.start
+        self.queries.__exit__(*exc_info)
+        self.span.count(queries=self.queries.count)
+        return False
+
+
+class QueryCounter(object):
+    """
+    Counts the queries this thread makes on any database (replicas
+    included) while it's active.  Unlike CaptureQueriesContext, it doesn't
+    turn on the debug cursor or keep the SQL around.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __enter__(self):
+        for conn in connections.all():
+            counters = conn.__dict__.setdefault('_query_counters', [])
+            if not counters:
+                _wrap_cursors(conn, counters)
+            counters.append(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        for conn in connections.all():
+            counters = conn.__dict__.get('_query_counters', [])
+            if self in counters:
+                counters.remove(self)
+                if not counters:
+                    # back to the class's methods
+                    del conn.make_cursor
+                    del conn.make_debug_cursor
+        return False
+
+
+def _wrap_cursors(conn, counters):
+    make_cursor = conn.make_cursor
+    make_debug_cursor = conn.make_debug_cursor
+    conn.make_cursor = lambda cursor: _CountingCursor(
+        make_cursor(cursor), counters)
+    conn.make_debug_cursor = lambda cursor: _CountingCursor(
+        make_debug_cursor(cursor), counters)
+
+
+class _CountingCursor(object):
+    """Wraps one of Django's cursor wrappers, counting what it runs."""
+
+    def __init__(self, cursor, counters):
+        self.cursor = cursor
+        self.counters = counters
+
+    def __getattr__(self, attr):
+        return getattr(self.cursor, attr)
+
+    def __iter__(self):
+        return iter(self.cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return self.cursor.__exit__(*exc_info)
+
+    def _counted(self):
+        for counter in self.counters:
+            counter.count += 1
+
+    def callproc(self, *args, **kwargs):
+        self._counted()
+        return self.cursor.callproc(*args, **kwargs)
+
+    def execute(self, *args, **kwargs):
+        self._counted()
+        return self.cursor.execute(*args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        self._counted()
+        return self.cursor.executemany(*args, **kwargs)
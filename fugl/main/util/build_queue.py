@@ -0,0 +1,126 @@
+"""
+Rebuilds published sites in the background when their content changes.
+
+main.signals marks a published project dirty whenever one of its posts,
+pages, categories, tags or plugins is saved or deleted, and enqueues it
+here.  A worker thread republishes it, going through the same debouncer
+and scheduler as requests do, so a burst of edits still makes one build and
+background builds count against the owner's share of build slots.
+Publishing only rewrites the files that changed (see publish_output).  A
+rebuild that fails leaves the project dirty and is retried a few times.
+
+The queue, its worker thread and the retry timers live in the process that
+saw the edit.  Under uWSGI they only run with `enable-threads`, and
+whatever is queued is lost when the process restarts; the project stays
+dirty in the database, though, and `manage.py rebuild_dirty` (run from
+cron) picks it up.  See PRODUCTION.md.
+"""
+import logging
+import queue
+import threading
+
+from django import db
+from django.conf import settings
+
+from main.models import Project
+
+from .build_debouncer import get_debouncer
+from .build_scheduler import get_scheduler
+from .site_generator import SiteGenerator
+
+
+logger = logging.getLogger(__name__)
+
+
+def run_build(project_id, user_id, key, fn):
+    """
+    Run build `key` of a project once its edits have settled down, within
+    the user's share of build slots, and return the result.
+    """
+    return get_debouncer().run(
+        project_id,
+        key,
+        lambda: get_scheduler().run(user_id, key, fn),
+    )
+
+
+class BuildQueue(object):
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._queued = set()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._failures = {}  # project id -> failed attempts in a row
+
+    def enqueue(self, project_id):
+        """Republish the project soon, unless it's already waiting to be."""
+        with self._lock:
+            if project_id in self._queued:
+                return
+            self._queued.add(project_id)
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._work,
+                                                name='fugl-build-queue',
+                                                daemon=True)
+                self._worker.start()
+        self._queue.put(project_id)
+
+    def _work(self):
+        while True:
+            self._run(self._queue.get())
+
+    def _run(self, project_id):
+        with self._lock:
+            # edits from here on need another build
+            self._queued.discard(project_id)
+        try:
+            self.rebuild(project_id)
+        except Exception:
+            logger.exception('Rebuilding project %s failed', project_id)
+            self._retry(project_id)
+        else:
+            self._failures.pop(project_id, None)
+        finally:
+            # this thread has its own connection; don't hold it open
+            db.connection.close()
+
+    def _retry(self, project_id):
+        failures = self._failures.get(project_id, 0) + 1
+        if failures > settings.BUILD_RETRIES:
+            self._failures.pop(project_id, None)
+            return
+        self._failures[project_id] = failures
+        timer = threading.Timer(settings.BUILD_RETRY_DELAY, self.enqueue,
+                                [project_id])
+        timer.daemon = True
+        timer.start()
+
+    def rebuild(self, project_id):
+        owner_id = (Project.objects.filter(pk=project_id)
+                    .values_list('owner_id', flat=True).first())
+        if owner_id is None:
+            return None  # deleted
+
+        def publish():
+            project = (Project.objects.select_related('owner', 'theme')
+                       .filter(pk=project_id, dirty=True).first())
+            if project is None:
+                return None  # somebody published it in the meantime
+            return SiteGenerator(project).publish()
+
+        return run_build(project_id, owner_id, ('publish', project_id),
+                         publish)
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_build_queue():
+    """The process-wide BuildQueue."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = BuildQueue()
+        return _queue
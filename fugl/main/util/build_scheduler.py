@@ -0,0 +1,141 @@
+"""
+Limits how many site builds run at once, and shares identical builds.
+
+Each build spawns a Pelican process, so left alone one user hammering
+`generate` can starve everybody else.  The scheduler enforces a global cap
+and a per-user cap on running builds, and hands out free slots round-robin
+across users, so a user with a long queue only gets their fair share.
+
+Builds are identified by a key; if a build with the same key is already
+queued or running, later callers wait for it and get the same result
+instead of starting their own.
+
+Builds run on the calling thread once it has been given a slot (so they use
+the request's own database connection).
+
+Everything here is held in process memory.  Under uWSGI each worker process
+has its own scheduler, so the caps, the fair shares and the sharing of
+identical builds only hold within a process: N processes may run up to N
+times BUILD_MAX_CONCURRENT builds between them (see PRODUCTION.md).
+"""
+import threading
+from collections import Counter
+from collections import OrderedDict
+from collections import deque
+from concurrent.futures import Future
+
+from django.conf import settings
+
+
+class BuildScheduler(object):
+
+    def __init__(self, max_concurrent, max_per_user):
+        self.max_concurrent = max_concurrent
+        self.max_per_user = max_per_user
+        self._cond = threading.Condition()
+        self._queues = OrderedDict()  # user -> deque of waiting tickets
+        self._running = Counter()  # user -> running builds
+        self._running_total = 0
+        self._inflight = {}  # key -> Future
+        self._waiting = 0  # callers waiting for someone else's build
+
+    def run(self, user_id, key, fn):
+        """
+        Run `fn()` as user `user_id`'s build `key`, once a slot is free, and
+        return its result (or raise its exception).  If that build is
+        already queued or running, wait for it instead.
+        """
+        with self._cond:
+            future = self._inflight.get(key)
+            if future is not None:
+                owner = False
+                self._waiting += 1
+            else:
+                owner = True
+                future = Future()
+                self._inflight[key] = future
+                ticket = _Ticket(user_id)
+                self._queues.setdefault(user_id, deque()).append(ticket)
+                self._dispatch()
+                while not ticket.ready:
+                    self._cond.wait()
+
+        if not owner:
+            try:
+                return future.result()
+            finally:
+                with self._cond:
+                    self._waiting -= 1
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._cond:
+                self._running[user_id] -= 1
+                self._running_total -= 1
+                del self._inflight[key]
+                self._dispatch()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'running': self._running_total,
+                'queued': sum(len(q) for q in self._queues.values()),
+                'waiting': self._waiting,
+            }
+
+    def _dispatch(self):
+        """Hand free slots to waiting tickets.  Caller holds the lock."""
+        dispatched = False
+        while self._running_total < self.max_concurrent:
+            ticket = self._next_ticket()
+            if ticket is None:
+                break
+            ticket.ready = True
+            self._running[ticket.user_id] += 1
+            self._running_total += 1
+            dispatched = True
+        if dispatched:
+            self._cond.notify_all()
+
+    def _next_ticket(self):
+        """
+        Pop the first ticket from the first user (in round-robin order) who
+        is under the per-user cap; that user then goes to the back.
+        """
+        for user_id in list(self._queues):
+            if self._running[user_id] >= self.max_per_user:
+                continue
+            queue = self._queues.pop(user_id)
+            ticket = queue.popleft()
+            if queue:
+                self._queues[user_id] = queue
+            return ticket
+        return None
+
+
+class _Ticket(object):
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.ready = False
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """The process-wide BuildScheduler, configured from settings."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = BuildScheduler(settings.BUILD_MAX_CONCURRENT,
+                                        settings.BUILD_MAX_PER_USER)
+        return _scheduler
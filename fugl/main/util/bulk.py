@@ -0,0 +1,33 @@
+"""
+Bulk insert helpers.
+
+Django's bulk_create doesn't hand back primary keys, which we need whenever
+the rows we insert are referenced by other rows we're about to insert.  We
+get around that by reserving ids from the table's sequence up front
+(PostgreSQL only, like the rest of fugl) and inserting with explicit pks.
+"""
+from django.db import connections
+from django.db import router
+
+
+def reserve_ids(model, count):
+    """Reserve `count` primary keys from `model`'s id sequence."""
+    if count <= 0:
+        return []
+    connection = connections[router.db_for_write(model)]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT nextval(pg_get_serial_sequence(%s, %s)) '
+            'FROM generate_series(1, %s)',
+            [model._meta.db_table, model._meta.pk.column, count],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def bulk_create_with_ids(model, objs, batch_size=1000):
+    """bulk_create `objs`, assigning each one a pk first.  Returns `objs`."""
+    objs = list(objs)
+    for obj, pk in zip(objs, reserve_ids(model, len(objs))):
+        obj.pk = pk
+    model.objects.bulk_create(objs, batch_size=batch_size)
+    return objs
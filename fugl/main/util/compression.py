@@ -0,0 +1,102 @@
+"""
+Content-Encoding negotiation and compression, for CompressionMiddleware.
+
+gzip always works; brotli is used when the `brotli` package is installed
+and the client asks for it.  Bodies that get cached (see PostPreviewer) can
+be compressed once, at a higher level than is worth spending on every
+response, and handed to the middleware ready to send.
+"""
+import gzip
+import io
+from collections import OrderedDict
+
+from django.conf import settings
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+
+# levels for responses compressed as they go out, and for precompressed
+# bodies that are compressed once and then cached (brotli's 10 and 11 are
+# too slow even for that)
+GZIP_LEVEL = 6
+GZIP_PRECOMPRESS_LEVEL = 9
+BROTLI_QUALITY = 5
+BROTLI_PRECOMPRESS_QUALITY = 9
+
+
+def gzip_compress(data, level=GZIP_LEVEL):
+    buf = io.BytesIO()
+    # mtime=0 so the same body always compresses to the same bytes
+    with gzip.GzipFile(fileobj=buf, mode='wb', compresslevel=level,
+                       mtime=0) as f:
+        f.write(data)
+    return buf.getvalue()
+
+
+def brotli_compress(data, quality=BROTLI_QUALITY):
+    return brotli.compress(data, quality=quality)
+
+
+# most preferred first: encoding -> (compress, precompress)
+ENCODINGS = OrderedDict()
+if brotli is not None:
+    ENCODINGS['br'] = (
+        brotli_compress,
+        lambda data: brotli_compress(data, BROTLI_PRECOMPRESS_QUALITY),
+    )
+ENCODINGS['gzip'] = (
+    gzip_compress,
+    lambda data: gzip_compress(data, GZIP_PRECOMPRESS_LEVEL),
+)
+
+
+def accepted_encodings(accept_encoding):
+    """{encoding: q} from an Accept-Encoding header."""
+    accepted = {}
+    for part in accept_encoding.split(','):
+        params = part.strip().split(';')
+        encoding = params[0].strip().lower()
+        if not encoding:
+            continue
+        q = 1.0
+        for param in params[1:]:
+            name, _, value = param.strip().partition('=')
+            if name.strip() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[encoding] = q
+    return accepted
+
+
+def choose_encoding(accept_encoding, available=None):
+    """
+    The best of `available` (default: everything we can produce) that the
+    client accepts, or None to send the body as it is.
+    """
+    accepted = accepted_encodings(accept_encoding)
+    best, best_q = None, 0.0
+    for encoding in (available if available is not None else ENCODINGS):
+        q = accepted.get(encoding, accepted.get('*', 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(data, encoding):
+    return ENCODINGS[encoding][0](data)
+
+
+def precompress(data):
+    """
+    {encoding: compressed data} for every encoding we can produce, or {} if
+    `data` is too small for the middleware to bother.
+    """
+    if len(data) < settings.COMPRESSION_MIN_SIZE:
+        return OrderedDict()
+    return OrderedDict((encoding, functions[1](data))
+                       for encoding, functions in ENCODINGS.items())
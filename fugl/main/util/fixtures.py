@@ -0,0 +1,202 @@
+"""
+Deterministic synthetic content, for benchmarks and scale testing.
+
+Everything is derived from a seeded random.Random, so the same arguments
+always produce the same project.  Rows are inserted with bulk_create.
+"""
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+
+from main.models import Category
+from main.models import Page
+from main.models import PagePlugin
+from main.models import Post
+from main.models import Project
+from main.models import ProjectAccess
+from main.models import ProjectPlugin
+from main.models import Tag
+from main.models import User
+
+from .bulk import bulk_create_with_ids
+
+
+WORDS = (
+    'lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod '
+    'tempor incididunt ut labore et dolore magna aliqua enim ad minim veniam '
+    'quis nostrud exercitation ullamco laboris nisi aliquip ex ea commodo '
+    'consequat duis aute irure in reprehenderit voluptate velit esse cillum '
+    'fugiat nulla pariatur excepteur sint occaecat cupidatat non proident '
+    'sunt culpa qui officia deserunt mollit anim id est laborum'
+).split()
+
+
+# name -> counts of each kind of object in a synthetic project
+PROJECT_SIZES = {
+    'small': {'posts': 10, 'pages': 2, 'categories': 2, 'tags': 5,
+              'plugins': 2, 'words': 200},
+    'medium': {'posts': 100, 'pages': 10, 'categories': 5, 'tags': 20,
+               'plugins': 5, 'words': 400},
+    'large': {'posts': 1000, 'pages': 25, 'categories': 20, 'tags': 100,
+              'plugins': 10, 'words': 800},
+}
+
+
+def load_username(prefix, index):
+    return '{0}{1:05d}'.format(prefix, index)
+
+
+class SyntheticProjectBuilder(object):
+
+    def __init__(self, seed=0):
+        self.random = random.Random(seed)
+
+    def words(self, count):
+        return ' '.join(self.random.choice(WORDS) for _ in range(count))
+
+    def title(self, prefix, index):
+        return '{0} {1} {2}'.format(prefix, index, self.words(2))[:50]
+
+    def markdown(self, count):
+        """Roughly `count` words of markdown, split into paragraphs."""
+        paragraphs = []
+        while count > 0:
+            length = min(count, self.random.randint(20, 80))
+            paragraphs.append(self.words(length))
+            count -= length
+        return '\n\n'.join(paragraphs)
+
+    def size(self, weights):
+        """Pick a name from PROJECT_SIZES, given {name: relative weight}."""
+        names = sorted(weights)
+        total = sum(weights[name] for name in names)
+        point = self.random.uniform(0, total)
+        for name in names:
+            point -= weights[name]
+            if point <= 0:
+                return name
+        return names[-1]
+
+    def users(self, prefix, count, password):
+        """
+        Create users <prefix>00000, <prefix>00001, ... all with the same
+        password.  Returns the saved Users.
+        """
+        # hashing is deliberately slow, so only do it once
+        hashed = make_password(password)
+        return bulk_create_with_ids(User, [
+            User(username=load_username(prefix, i),
+                 email='{0}@example.com'.format(load_username(prefix, i)),
+                 password=hashed)
+            for i in range(count)
+        ])
+
+    def share(self, projects, users, per_project):
+        """
+        Give up to `per_project` random users (never the owner) access to
+        each project, about half of them with edit rights.
+        """
+        rows = []
+        for project in projects:
+            # one extra, in case the owner is picked
+            picked = self.random.sample(users,
+                                        min(per_project + 1, len(users)))
+            others = [u for u in picked if u.pk != project.owner_id]
+            for user in others[:per_project]:
+                rows.append(ProjectAccess(user_id=user.pk,
+                                          project_id=project.pk,
+                                          can_edit=self.random.random() < 0.5))
+        ProjectAccess.objects.bulk_create(rows, batch_size=1000)
+        return rows
+
+    def build(self, owner, theme, title, posts=10, pages=2, categories=2,
+              tags=5, plugins=2, words=200):
+        """Create a project full of content.  Returns the saved Project."""
+        project = Project.objects.create(
+            title=title,
+            description=self.words(10),
+            preview_url='',
+            owner=owner,
+            theme=theme,
+        )
+
+        category_objs = bulk_create_with_ids(Category, [
+            Category(title=self.title('category', i), project=project)
+            for i in range(categories)
+        ])
+        tag_objs = bulk_create_with_ids(Tag, [
+            Tag(title=self.title('tag', i), project=project)
+            for i in range(tags)
+        ])
+        plugin_objs = bulk_create_with_ids(PagePlugin, [
+            PagePlugin(
+                title=self.title('plugin', i),
+                head_markup='<script>/* {0} */</script>'.format(i),
+                body_markup='<p>{0}</p>'.format(self.words(5)),
+                project=project,
+            )
+            for i in range(plugins)
+        ])
+        ProjectPlugin.objects.bulk_create([
+            ProjectPlugin(
+                title=self.title('project plugin', i),
+                markup='<!-- {0} -->'.format(self.words(5)),
+                project=project,
+            )
+            for i in range(plugins)
+        ])
+
+        now = timezone.now()
+        post_objs = []
+        for i in range(posts):
+            created = now - timedelta(days=self.random.randint(0, 1000))
+            post_objs.append(Post(
+                title=self.title('post', i),
+                content=self.markdown(words),
+                date_created=created,
+                date_updated=created + timedelta(
+                    hours=self.random.randint(0, 48)),
+                project=project,
+                category=(self.random.choice(category_objs)
+                          if category_objs else None),
+            ))
+        post_objs = bulk_create_with_ids(Post, post_objs)
+
+        page_objs = bulk_create_with_ids(Page, [
+            Page(title=self.title('page', i), content=self.markdown(words),
+                 project=project)
+            for i in range(pages)
+        ])
+
+        tag_links = self.link(Post.tags.through, 'post_id', 'tag_id',
+                              post_objs, tag_objs)
+        # Post.tags and Tag.posts are separate tables, and the tags API reads
+        # Tag.posts, so fill in both (as the Pelican importer does)
+        Tag.posts.through.objects.bulk_create([
+            Tag.posts.through(tag_id=row.tag_id, post_id=row.post_id)
+            for row in tag_links
+        ], batch_size=1000)
+        self.link(Post.post_plugins.through, 'post_id', 'pageplugin_id',
+                  post_objs, plugin_objs)
+        self.link(Page.post_plugins.through, 'page_id', 'pageplugin_id',
+                  page_objs, plugin_objs)
+        return project
+
+    def link(self, through, from_field, to_field, sources, targets,
+             max_links=3):
+        """
+        Attach up to `max_links` random targets to each source.  Returns the
+        rows of `through` it created.
+        """
+        if not targets:
+            return []
+        rows = []
+        for source in sources:
+            count = self.random.randint(0, min(max_links, len(targets)))
+            for target in self.random.sample(targets, count):
+                rows.append(through(**{from_field: source.pk,
+                                       to_field: target.pk}))
+        through.objects.bulk_create(rows, batch_size=1000)
+        return rows
@@ -0,0 +1,296 @@
+"""
+HTTP load testing for the REST API.
+
+Worker threads each log in as one of the users made by generate_load_data
+(trading the password for an API token) and keep running randomly chosen
+scenarios against a running server until time is up.  Every request is
+timed and filed under an endpoint name, and the results come out as
+latency percentiles and requests per second per endpoint, in the same
+report format as the other benchmarks.
+"""
+import base64
+import http.client
+import json
+import random
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode
+from urllib.parse import urlsplit
+
+from .benchmark import summarize
+
+
+class ApiClient(object):
+    """
+    One keep-alive connection to the API, authenticated as one user.
+    Not thread safe; each worker has its own.
+    """
+
+    def __init__(self, url, username, password, recorder, timeout=60):
+        parts = urlsplit(url)
+        self.host = parts.netloc
+        self.prefix = parts.path.rstrip('/')
+        self.connection_class = (http.client.HTTPSConnection
+                                 if parts.scheme == 'https'
+                                 else http.client.HTTPConnection)
+        self.timeout = timeout
+        self.username = username
+        self.password = password
+        credentials = '{0}:{1}'.format(username, password).encode('utf-8')
+        self.auth = 'Basic ' + base64.b64encode(credentials).decode('ascii')
+        self.recorder = recorder
+        self.connection = None
+
+    def login(self):
+        """
+        Swap Basic auth for an API token, as real clients do.  Returns
+        whether it worked.
+        """
+        auth, self.auth = self.auth, None
+        status, user = self.request(
+            'users.authenticate', 'POST', '/users/authenticate/',
+            data={'username': self.username, 'password': self.password})
+        if status == 200 and user and 'token' in user:
+            self.auth = 'Token ' + user['token']
+            return True
+        self.auth = auth
+        return False
+
+    def request(self, endpoint, method, path, data=None, params=None,
+                expect=(200,)):
+        """
+        Make a request, timing it under `endpoint` (unless that's None), and
+        return (status, decoded JSON body or None).  Statuses other than
+        `expect` count as errors.
+        """
+        url = self.prefix + path
+        if params:
+            url += '?' + urlencode(params)
+        headers = {'Accept': 'application/json'}
+        if self.auth is not None:
+            headers['Authorization'] = self.auth
+        body = None
+        if data is not None:
+            body = json.dumps(data).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+
+        start = time.perf_counter()
+        try:
+            status, content_type, content = self._send(method, url, body,
+                                                       headers)
+        except (OSError, http.client.HTTPException):
+            self.close()
+            if endpoint is not None:
+                self.recorder.record(endpoint, time.perf_counter() - start,
+                                     False)
+            return None, None
+        elapsed = time.perf_counter() - start
+        if endpoint is not None:
+            self.recorder.record(endpoint, elapsed, status in expect)
+
+        if content and content_type.startswith('application/json'):
+            return status, json.loads(content.decode('utf-8'))
+        return status, None
+
+    def _send(self, method, url, body, headers):
+        if self.connection is None:
+            self.connection = self.connection_class(self.host,
+                                                    timeout=self.timeout)
+        self.connection.request(method, url, body=body, headers=headers)
+        resp = self.connection.getresponse()
+        content = resp.read()
+        if resp.getheader('Connection', '').lower() == 'close':
+            self.close()
+        return resp.status, resp.getheader('Content-Type', ''), content
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+class Recorder(object):
+    """Collects request timings from every worker."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = OrderedDict()  # endpoint -> [seconds]
+        self.errors = OrderedDict()  # endpoint -> count
+
+    def record(self, endpoint, elapsed, ok=True):
+        with self.lock:
+            self.samples.setdefault(endpoint, []).append(elapsed)
+            self.errors.setdefault(endpoint, 0)
+            if not ok:
+                self.errors[endpoint] += 1
+
+    def results(self, wall_seconds):
+        """{endpoint: latency summary plus errors and requests/second}"""
+        with self.lock:
+            results = OrderedDict()
+            for endpoint in sorted(self.samples):
+                samples = self.samples[endpoint]
+                summary = summarize(samples)
+                summary['errors'] = self.errors[endpoint]
+                summary['rps'] = (len(samples) / wall_seconds
+                                  if wall_seconds else None)
+                results[endpoint] = summary
+            return results
+
+
+class Session(object):
+    """What a worker knows about its user's projects."""
+
+    def __init__(self, client, rand):
+        self.client = client
+        self.random = rand
+        self.counter = 0
+        _, owned = client.request(None, 'GET', '/projects/owned/')
+        _, shared = client.request(None, 'GET', '/projects/shared/')
+        self.owned = owned or []
+        self.shared = shared or []
+
+    def unique(self, prefix):
+        self.counter += 1
+        return '{0}-{1}-{2}-{3}'.format(prefix, threading.get_ident(),
+                                        self.counter,
+                                        self.random.randint(0, 1 << 30))
+
+    def project(self, editable=False):
+        projects = self.owned + [p for p in self.shared
+                                 if p.get('can_edit') or not editable]
+        return self.random.choice(projects) if projects else None
+
+
+def list_projects(session):
+    session.client.request('projects.list', 'GET', '/projects/')
+
+
+def lookup_project(session):
+    # lookup goes by owner username, and we only know our own
+    if not session.owned:
+        return
+    project = session.random.choice(session.owned)
+    session.client.request('projects.lookup', 'GET', '/projects/lookup/',
+                           params={'username': session.client.username,
+                                   'title': project['title']})
+    session.client.request('projects.retrieve', 'GET',
+                           '/projects/{0}/'.format(project['id']))
+
+
+def post_crud(session):
+    project = session.project(editable=True)
+    if project is None:
+        return
+    client = session.client
+    status, post = client.request(
+        'posts.create', 'POST', '/posts/',
+        data={'title': session.unique('load')[:50], 'content': 'load test',
+              'project': project['id']},
+        expect=(201,))
+    if status != 201:
+        return
+    url = '/posts/{0}/'.format(post['id'])
+    client.request('posts.list', 'GET', '/posts/',
+                   params={'project': project['id']})
+    client.request('posts.retrieve', 'GET', url)
+    client.request('posts.update', 'PUT', url,
+                   data={'content': 'load test, updated'})
+    client.request('posts.delete', 'DELETE', url, expect=(204,))
+
+
+def check_access(session):
+    project = session.project()
+    if project is None:
+        return
+    session.client.request('projects.access', 'GET',
+                           '/projects/{0}/access/'.format(project['id']))
+    # probably someone else's project, which we may or may not see
+    session.client.request('projects.retrieve_other', 'GET',
+                           '/projects/{0}/'.format(project['id'] + 1),
+                           expect=(200, 404))
+
+
+def clone_project(session):
+    if not session.owned:
+        return
+    project = session.random.choice(session.owned)
+    status, clone = session.client.request(
+        'projects.clone', 'POST',
+        '/projects/{0}/clone/'.format(project['id']),
+        data={'title': session.unique('clone')[:50], 'posts': True,
+              'pages': True, 'plugins': True},
+        expect=(201,))
+    if status == 201:
+        session.client.request('projects.delete', 'DELETE',
+                               '/projects/{0}/'.format(clone['id']),
+                               expect=(204,))
+
+
+def generate_project(session):
+    project = session.project()
+    if project is None:
+        return
+    session.client.request('projects.generate', 'GET',
+                           '/projects/{0}/generate/'.format(project['id']),
+                           expect=(201,))
+
+
+# name -> (relative weight, scenario)
+SCENARIOS = OrderedDict([
+    ('list', (10, list_projects)),
+    ('lookup', (10, lookup_project)),
+    ('posts', (5, post_crud)),
+    ('access', (5, check_access)),
+    ('clone', (1, clone_project)),
+    ('generate', (1, generate_project)),
+])
+
+
+class LoadTest(object):
+
+    def __init__(self, url, usernames, password, scenarios=None,
+                 concurrency=4, duration=30, seed=0):
+        self.url = url
+        self.usernames = usernames
+        self.password = password
+        self.scenarios = [(name,) + SCENARIOS[name]
+                          for name in (scenarios or SCENARIOS)]
+        self.concurrency = concurrency
+        self.duration = duration
+        self.seed = seed
+        self.recorder = Recorder()
+
+    def run(self):
+        """Run the scenarios for `duration` seconds and return the results."""
+        start = time.perf_counter()
+        deadline = start + self.duration
+        threads = [
+            threading.Thread(target=self._work, args=(i, deadline))
+            for i in range(self.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.recorder.results(time.perf_counter() - start)
+
+    def _work(self, index, deadline):
+        rand = random.Random(self.seed * 1000 + index)
+        username = self.usernames[index % len(self.usernames)]
+        client = ApiClient(self.url, username, self.password, self.recorder)
+        try:
+            client.login()
+            session = Session(client, rand)
+            weights = [weight for _, weight, _ in self.scenarios]
+            total = sum(weights)
+            while time.perf_counter() < deadline:
+                point = rand.uniform(0, total)
+                for _, weight, scenario in self.scenarios:
+                    point -= weight
+                    if point <= 0:
+                        break
+                scenario(session)
+        finally:
+            client.close()
@@ -0,0 +1,240 @@
+"""
+Imports an existing Pelican site's `content/` directory into a project.
+
+This is roughly the reverse of SiteGenerator.write_pages/write_posts: every
+markdown file under `pages/` becomes a Page, and every other markdown file
+becomes a Post, filed under its `Category:`, or else the folder it's in, or
+else (for posts at the top level) the site's DEFAULT_CATEGORY, as Pelican
+does by default.  Front matter is read the way Python-Markdown's
+meta extension (which Pelican uses) reads it.
+
+Parsing is independent per file, so big trees are spread over a process
+pool; everything is then saved with a few bulk inserts.
+"""
+import os
+import re
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from django.db import transaction
+from django.utils import timezone
+from pelican.settings import DEFAULT_CONFIG
+from pelican.utils import get_date
+
+from main.models import Category
+from main.models import Page
+from main.models import Post
+from main.models import Tag
+
+from .bulk import bulk_create_with_ids
+from .themes import walk_files
+
+
+MARKDOWN_EXTENSIONS = ('.md', '.markdown', '.mkd', '.mdown')
+PAGES_DIR = 'pages'
+
+# fewer files than this aren't worth starting processes for
+PARALLEL_THRESHOLD = 50
+
+# same as markdown.extensions.meta
+META_RE = re.compile(r'^[ ]{0,3}(?P<key>[A-Za-z0-9_-]+):\s*(?P<value>.*)')
+META_MORE_RE = re.compile(r'^[ ]{4,}(?P<value>.*)')
+
+TITLE_LENGTH = Post._meta.get_field('title').max_length
+
+# what Pelican files posts under when nothing else says
+DEFAULT_CATEGORY = DEFAULT_CONFIG['DEFAULT_CATEGORY']
+
+
+Source = namedtuple('Source', [
+    'path',  # relative to the content directory
+    'kind',  # 'page' or 'post'
+    'title',
+    'date',
+    'modified',
+    'category',
+    'tags',
+    'content',
+])
+
+ImportResult = namedtuple('ImportResult', [
+    'pages', 'posts', 'categories', 'tags', 'errors',
+])
+
+
+def parse_metadata(text):
+    """
+    Split markdown `text` into ({lowercased key: value}, content), reading
+    front matter the way the markdown meta extension does.
+    """
+    meta = {}
+    lines = text.split('\n')
+    key = None
+    while lines:
+        line = lines.pop(0)
+        if not line.strip():
+            break  # blank line: end of the metadata
+        m = META_RE.match(line)
+        if m:
+            key = m.group('key').lower().strip()
+            meta[key] = m.group('value').strip()
+            continue
+        m = META_MORE_RE.match(line)
+        if m and key is not None:
+            meta[key] = '{0}\n{1}'.format(meta[key], m.group('value').strip())
+            continue
+        lines.insert(0, line)  # not metadata: it's the start of the content
+        break
+    return meta, '\n'.join(lines)
+
+
+def parse_source(path, full_path, default_category=DEFAULT_CATEGORY):
+    """
+    Parse one markdown file into a Source.  Raises ValueError if it can't.
+
+    Runs in worker processes, so it mustn't touch the database.
+    """
+    with open(full_path, encoding='utf-8') as f:
+        meta, content = parse_metadata(f.read())
+
+    parts = path.split(os.sep)
+    kind = 'page' if parts[0] == PAGES_DIR and len(parts) > 1 else 'post'
+    # posts have no slug of their own (SiteGenerator slugifies the title),
+    # so a `Slug:` isn't read
+    title = meta.get('title') or os.path.splitext(parts[-1])[0]
+
+    date = None
+    if 'date' in meta:
+        date = get_date(meta['date'])
+    elif kind == 'post':
+        date = datetime.fromtimestamp(os.path.getmtime(full_path))
+    modified = get_date(meta['modified']) if 'modified' in meta else date
+
+    category = meta.get('category') or None
+    if category is None and kind == 'post':
+        category = parts[0] if len(parts) > 1 else default_category
+    tags = [tag.strip() for tag in meta.get('tags', '').split(',')
+            if tag.strip()]
+
+    return Source(path, kind, title, date, modified, category, tags,
+                  content.strip('\n'))
+
+
+def _parse(args):
+    path, full_path, default_category = args
+    try:
+        return parse_source(path, full_path, default_category), None
+    except (OSError, UnicodeDecodeError, ValueError) as e:
+        return None, (path, str(e))
+
+
+def parse_sources(content_dir, workers=None,
+                  default_category=DEFAULT_CATEGORY):
+    """
+    Parse every markdown file under `content_dir`, over `workers` processes
+    (default: one per CPU) if there are enough of them.  Returns
+    ([Source], [(path, error)]).
+    """
+    paths = [(path, full, default_category)
+             for path, full in walk_files(content_dir)
+             if path.lower().endswith(MARKDOWN_EXTENSIONS)]
+
+    if workers == 1 or len(paths) < PARALLEL_THRESHOLD:
+        results = map(_parse, paths)
+    else:
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunksize = max(1, len(paths) // (workers * 4))
+            results = list(executor.map(_parse, paths, chunksize=chunksize))
+
+    sources, errors = [], []
+    for source, error in results:
+        if error is not None:
+            errors.append(error)
+        else:
+            sources.append(source)
+    return sources, errors
+
+
+def import_sources(project, content_dir, workers=None,
+                   default_category=DEFAULT_CATEGORY):
+    """
+    Add the pages and posts of the Pelican content directory `content_dir`
+    to `project`, reusing its categories and tags where the titles match.
+    Files that can't be parsed are skipped and listed in the result's
+    `errors`.  Posts at the top level with no `Category:` go under
+    `default_category`, the site's DEFAULT_CATEGORY.
+    """
+    sources, errors = parse_sources(content_dir, workers, default_category)
+    pages = [s for s in sources if s.kind == 'page']
+    posts = [s for s in sources if s.kind == 'post']
+
+    with transaction.atomic():
+        categories = get_or_create_titled(
+            Category, project, (s.category for s in posts if s.category))
+        tags = get_or_create_titled(
+            Tag, project, (tag for s in posts for tag in s.tags))
+
+        bulk_create_with_ids(Page, [
+            Page(title=s.title[:TITLE_LENGTH], content=s.content,
+                 project=project)
+            for s in pages
+        ])
+
+        post_objs = bulk_create_with_ids(Post, [
+            Post(
+                title=s.title[:TITLE_LENGTH],
+                content=s.content,
+                date_created=make_aware(s.date),
+                date_updated=make_aware(s.modified),
+                category=categories[s.category] if s.category else None,
+                project=project,
+            )
+            for s in posts
+        ])
+        links = [(post.pk, tag_id)
+                 for post, s in zip(post_objs, posts)
+                 for tag_id in {tags[tag].pk for tag in s.tags}]
+        # Post.tags and Tag.posts are separate tables; the tags API reads
+        # Tag.posts, so fill in both
+        Post.tags.through.objects.bulk_create([
+            Post.tags.through(post_id=post_id, tag_id=tag_id)
+            for post_id, tag_id in links
+        ], batch_size=1000)
+        Tag.posts.through.objects.bulk_create([
+            Tag.posts.through(tag_id=tag_id, post_id=post_id)
+            for post_id, tag_id in links
+        ], batch_size=1000)
+
+    return ImportResult(
+        pages=len(pages),
+        posts=len(posts),
+        categories=len(set(categories.values())),
+        tags=len(set(tags.values())),
+        errors=errors,
+    )
+
+
+def get_or_create_titled(model, project, titles):
+    """
+    Return {title: object} for the project's categories/tags with these
+    titles, creating the ones that don't exist yet.
+    """
+    max_length = model._meta.get_field('title').max_length
+    stored = {title: title[:max_length] for title in titles}
+    existing = model.objects.filter(project=project,
+                                    title__in=set(stored.values()))
+    by_title = {obj.title: obj for obj in existing}
+    created = bulk_create_with_ids(model, [
+        model(title=title, project=project)
+        for title in sorted(set(stored.values())) if title not in by_title
+    ])
+    by_title.update((obj.title, obj) for obj in created)
+    return {title: by_title[stored[title]] for title in stored}
+
+
+def make_aware(value):
+    if value is not None and timezone.is_naive(value):
+        return timezone.make_aware(value)
+    return value
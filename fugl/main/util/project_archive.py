@@ -0,0 +1,349 @@
+"""
+Export a project's content to a compact archive, and import it back.
+
+An archive is a gzipped stream of JSON lines.  The first line is a header:
+
+    {"format": "fugl-project", "version": 1,
+     "project": {"title": ..., "description": ..., "theme": ...},
+     "fields": {"post": ["title", "content", ...], ...}}
+
+and every following line is a flat JSON array, either an object,
+
+    ["post", <id>, <value of each field listed in the header>...]
+
+or a link between two objects (a row of a many-to-many table),
+
+    ["post.tags", <post id>, <tag id>]
+
+Objects come in dependency order (categories before the posts that use
+them, all objects before any links), so importing never has to look ahead.
+Both directions work record by record, so memory use doesn't grow with the
+size of the project; the importer only keeps a map of old ids to new ones.
+"""
+import gzip
+import json
+import zlib
+from datetime import datetime
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError
+from django.db import transaction
+
+from main.models import Category
+from main.models import Page
+from main.models import PagePlugin
+from main.models import Post
+from main.models import Project
+from main.models import ProjectPlugin
+from main.models import Tag
+from main.models import Theme
+
+from .bulk import bulk_create_with_ids
+
+
+FORMAT = 'fugl-project'
+VERSION = 1
+BATCH_SIZE = 1000
+
+# (model, fields) in the order they're written, which is an order that never
+# refers to an object before it's been seen
+OBJECTS = [
+    (Category, ['title']),
+    (Tag, ['title']),
+    (PagePlugin, ['title', 'head_markup', 'body_markup']),
+    (ProjectPlugin, ['title', 'markup']),
+    (Page, ['title', 'content']),
+    (Post, ['title', 'content', 'date_created', 'date_updated', 'category']),
+]
+
+# (model, many-to-many field)
+LINKS = [
+    (Page, 'post_plugins'),
+    (Post, 'post_plugins'),
+    (Post, 'tags'),
+    (Tag, 'posts'),
+]
+
+
+def record_type(model):
+    return model._meta.model_name
+
+
+def link_type(model, field_name):
+    return '{0}.{1}'.format(record_type(model), field_name)
+
+
+def export_project(project):
+    """Yield the project's archive as chunks of gzipped bytes."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for record in iter_records(project):
+        line = json.dumps(record, separators=(',', ':'), ensure_ascii=False)
+        chunk = compressor.compress(line.encode('utf-8') + b'\n')
+        if chunk:
+            yield chunk
+    yield compressor.flush()
+
+
+def iter_records(project):
+    """Yield the header and then every record of the project's archive."""
+    yield {
+        'format': FORMAT,
+        'version': VERSION,
+        'project': {
+            'title': project.title,
+            'description': project.description,
+            'theme': project.theme.title,
+        },
+        'fields': {record_type(model): fields for model, fields in OBJECTS},
+    }
+
+    for model, fields in OBJECTS:
+        rows = (model.objects.filter(project=project).order_by('pk')
+                .values_list('pk', *fields))
+        name = record_type(model)
+        for row in rows.iterator():
+            yield [name] + [encode(value) for value in row]
+
+    for model, field_name in LINKS:
+        field = model._meta.get_field(field_name)
+        from_name = field.m2m_field_name()
+        to_name = field.m2m_reverse_field_name()
+        rows = (field.rel.through.objects
+                .filter(**{from_name + '__project': project})
+                .order_by('pk')
+                .values_list(from_name, to_name))
+        name = link_type(model, field_name)
+        for from_id, to_id in rows.iterator():
+            yield [name, from_id, to_id]
+
+
+def encode(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def import_project(fileobj, owner, title=None, theme=None):
+    """
+    Create a new project belonging to `owner` from the archive in the
+    (binary) file `fileobj`, and return it.
+
+    The project keeps its title unless `title` is given, and uses the theme
+    with the archived theme's title, or `theme` if there's no such theme.
+    Raises ValidationError if the archive can't be imported; nothing is
+    saved in that case.
+    """
+    with gzip.GzipFile(fileobj=fileobj, mode='rb') as f:
+        try:
+            lines = iter(f)
+            header = read_header(next(lines, b''))
+            with transaction.atomic():
+                project = create_project(header, owner, title, theme)
+                importer = ArchiveImporter(project, header['fields'])
+                try:
+                    for line in lines:
+                        importer.add(json.loads(line.decode('utf-8')))
+                    importer.flush()
+                except DatabaseError as e:
+                    # what validating each record can't catch, like two
+                    # tags with the same title
+                    raise ValidationError('Conflicting records: %(error)s',
+                                          code='invalid',
+                                          params={'error': e})
+        except (OSError, EOFError, ValueError) as e:
+            # not gzip, truncated, or not JSON
+            raise ValidationError('Corrupt archive: %(error)s',
+                                  code='invalid', params={'error': e})
+        except (KeyError, TypeError) as e:
+            # JSON, but not records (see ArchiveImporter.add)
+            raise ValidationError('Malformed record: %(error)s',
+                                  code='invalid', params={'error': e})
+    return project
+
+
+def read_header(line):
+    try:
+        header = json.loads(line.decode('utf-8'))
+    except ValueError:
+        header = None
+    if not isinstance(header, dict) or header.get('format') != FORMAT:
+        raise ValidationError('Not a fugl project archive.', code='invalid')
+    if header.get('version') != VERSION:
+        raise ValidationError(
+            'Unsupported archive version: %(version)s',
+            code='invalid',
+            params={'version': header.get('version')},
+        )
+    info = header.get('project')
+    fields = header.get('fields')
+    if (not isinstance(info, dict) or not isinstance(fields, dict) or
+            not all(isinstance(info.get(key), str)
+                    for key in ('title', 'description', 'theme')) or
+            not all(isinstance(names, list) and
+                    all(isinstance(name, str) for name in names)
+                    for names in fields.values())):
+        raise ValidationError('Malformed archive header.', code='invalid')
+    return header
+
+
+def create_project(header, owner, title=None, theme=None):
+    info = header['project']
+    title = title or info['title']
+    if Project.objects.filter(owner=owner, title=title).exists():
+        raise ValidationError(
+            'You already have a project called %(title)s.',
+            code='invalid',
+            params={'title': title},
+        )
+    theme = Theme.objects.filter(title=info['theme']).first() or theme
+    if theme is None:
+        raise ValidationError(
+            'No theme called %(theme)s.',
+            code='invalid',
+            params={'theme': info['theme']},
+        )
+    project = Project(
+        title=title,
+        description=info['description'],
+        preview_url='',
+        owner=owner,
+        theme=theme,
+    )
+    # projects can be created without a description (and so exported
+    # without one), but it mustn't be too long
+    project.full_clean(exclude=['description', 'preview_url'])
+    Project._meta.get_field('description').run_validators(
+        project.description)
+    project.save()
+    return project
+
+
+class ArchiveImporter(object):
+    """
+    Turns archive records back into rows, a batch at a time, giving every
+    object a new id and rewriting references to match.
+    """
+
+    def __init__(self, project, fields):
+        self.project = project
+        self.objects = {}  # type -> (model, [fields, in archive order])
+        for model, _ in OBJECTS:
+            name = record_type(model)
+            try:
+                self.objects[name] = (model, [
+                    model._meta.get_field(field_name)
+                    for field_name in fields.get(name, [])
+                ])
+            except FieldDoesNotExist as e:
+                raise ValidationError('Unknown field: %(error)s',
+                                      code='invalid', params={'error': e})
+        # type -> (through model, from attname, to attname, from type, to type)
+        self.links = {}
+        for model, field_name in LINKS:
+            field = model._meta.get_field(field_name)
+            through = field.rel.through
+            get_through_field = through._meta.get_field
+            self.links[link_type(model, field_name)] = (
+                through,
+                get_through_field(field.m2m_field_name()).attname,
+                get_through_field(field.m2m_reverse_field_name()).attname,
+                record_type(model),
+                record_type(field.related_model),
+            )
+        self.ids = {name: {} for name in self.objects}  # type -> old -> new
+        self.pending_type = None
+        self.pending = []
+
+    def add(self, record):
+        if not isinstance(record, list) or len(record) < 2:
+            raise ValidationError('Malformed record: %(record)s',
+                                  code='invalid', params={'record': record})
+        name = record[0]
+        if name != self.pending_type or len(self.pending) >= BATCH_SIZE:
+            self.flush()
+            self.pending_type = name
+        if name in self.objects:
+            self.check_length(record, len(self.objects[name][1]) + 2)
+            self.pending.append((record[1], self.make_object(name, record)))
+        elif name in self.links:
+            self.check_length(record, 3)
+            self.pending.append(self.make_link(name, record))
+        else:
+            raise ValidationError('Unknown record type: %(type)s',
+                                  code='invalid', params={'type': name})
+
+    def check_length(self, record, length):
+        if len(record) != length:
+            raise ValidationError(
+                'Malformed record: %(record)s (expected %(length)s values)',
+                code='invalid',
+                params={'record': record, 'length': length},
+            )
+
+    def make_object(self, name, record):
+        model, fields = self.objects[name]
+        obj = model(project=self.project)
+        for field, value in zip(fields, record[2:]):
+            if field.is_relation:
+                target = record_type(field.related_model)
+                setattr(obj, field.attname,
+                        None if value is None else self.new_id(target, value))
+            else:
+                setattr(obj, field.attname,
+                        self.clean_value(name, field, value))
+        return obj
+
+    def clean_value(self, name, field, value):
+        """
+        field.clean(), except that blank values are let through, as for the
+        project's description: an archive holds whatever the project held.
+        """
+        try:
+            value = field.to_python(value)
+            if value is None and not field.null:
+                raise ValidationError(field.error_messages['null'],
+                                      code='null')
+            field.run_validators(value)
+        except ValidationError as e:
+            raise ValidationError(
+                'Invalid %(type)s %(field)s: %(error)s',
+                code='invalid',
+                params={'type': name, 'field': field.name,
+                        'error': ' '.join(e.messages)},
+            )
+        return value
+
+    def make_link(self, name, record):
+        through, from_attname, to_attname, from_type, to_type = (
+            self.links[name])
+        return through(**{
+            from_attname: self.new_id(from_type, record[1]),
+            to_attname: self.new_id(to_type, record[2]),
+        })
+
+    def new_id(self, name, old_id):
+        try:
+            return self.ids[name][old_id]
+        except KeyError:
+            raise ValidationError(
+                'Reference to missing %(type)s %(id)s',
+                code='invalid',
+                params={'type': name, 'id': old_id},
+            )
+
+    def flush(self):
+        if not self.pending:
+            return
+        name = self.pending_type
+        if name in self.objects:
+            model = self.objects[name][0]
+            old_ids = [old_id for old_id, _ in self.pending]
+            objs = bulk_create_with_ids(
+                model, [obj for _, obj in self.pending])
+            self.ids[name].update(
+                (old_id, obj.pk) for old_id, obj in zip(old_ids, objs))
+        else:
+            through = self.links[name][0]
+            through.objects.bulk_create(self.pending)
+        self.pending = []
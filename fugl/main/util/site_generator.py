@@ -1,25 +1,50 @@
+import cProfile
+import filecmp
+import json
 import os
+import pstats
+import shutil
+import sys
 import tempfile
-import shlex
 import zipfile
 from collections import Counter
 from datetime import datetime
 from subprocess import Popen
 
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
 from django.utils.text import slugify
 
+from main.models import Build
+from main.models import Project
+
+from .build_profile import BuildProfile
+from .theme_registry import THEME_STATIC_DIR
+from .theme_registry import static_archive
+from .theme_registry import static_manifest
+from .themes import bytecode_cache_dir
+from .themes import file_digest
+from .themes import theme_path
+from .themes import walk_files
+
 
 class GeneratedSite(object):
 
-    def __init__(self, title, timestamp, archive):
+    def __init__(self, title, timestamp, archive, build=None, since=None):
         self.title = title
         self.timestamp = timestamp
         self.archive = archive
+        self.build = build
+        self.since = since
 
     def filename(self):
         strtime = self.timestamp.strftime('%Y-%m-%d_%H%M')
         filename = '{title}_output_{timestamp}.zip'.format(title=self.title,
                                                            timestamp=strtime)
+        if self.since is not None:
+            filename = filename.replace(
+                '_output_', '_changes_since_{0}_'.format(self.since.id),
+            )
         return filename
 
     def content_disposition_str(self):
@@ -32,61 +57,233 @@ class GeneratedSite(object):
 
 class SiteGenerator(object):
 
-    def __init__(self, project):
+    def __init__(self, project, profile=False, timeout=10):
+        """
+        If `profile` is set, generate() also runs the whole build under
+        cProfile and saves the stats alongside the Build.
+        """
         self.project = project
-
-    def generate(self):
+        self.site_url = ''
+        self.timeout = timeout
+        self.profile = BuildProfile()
+        self.profiler = cProfile.Profile() if profile else None
+
+    def generate(self, since=None):
+        """
+        Build the site and return it zipped up.  Every build records a
+        manifest of its output; if `since` (an earlier Build of this project)
+        is given, the zip only holds what changed since then, plus a
+        DELTA_FILENAME listing what was deleted.
+        """
         archive = None
         with tempfile.TemporaryDirectory() as site_dir:
-            self.generate_site_dir(site_dir)
+            if self.profiler is not None:
+                self.profiler.enable()
+            try:
+                self.build(site_dir)
+                manifest = self.output_manifest(site_dir)
+                build = self.record_build(manifest)
+                if since is None:
+                    archive = self.zip_output(site_dir)
+                else:
+                    archive = self.zip_delta(site_dir, since, build,
+                                             manifest)
+            finally:
+                if self.profiler is not None:
+                    self.profiler.disable()
+
+            build.timings = json.dumps(self.profile.as_list())
+            update_fields = ['timings']
+            if self.profiler is not None:
+                build.profile = self.save_profile(site_dir, build)
+                update_fields.append('profile')
+            build.save(update_fields=update_fields)
+
+        return GeneratedSite(self.project.title, datetime.now(), archive,
+                             build=build, since=since)
+
+    def publish(self):
+        """
+        Build the site and publish it under PUBLISH_ROOT, where nginx serves
+        it from, and point the project's preview_url at it.
+
+        The site is built next to the published copy and then swapped in
+        with a single rename, so readers never see a half-written site.
+        """
+        target = publish_dir(self.project)
+        parent = os.path.dirname(target)
+        mkdirs(parent)
+
+        url = publish_url(self.project)
+        self.site_url = url.rstrip('/')
+        # clear this before reading any content, so that anything edited
+        # during the build marks the project dirty again
+        Project.objects.filter(pk=self.project.pk).update(dirty=False)
+        self.project.dirty = False
+        try:
+            # build on the same filesystem, so moving files into place is
+            # cheap
+            with tempfile.TemporaryDirectory(prefix='.build-',
+                                             dir=parent) as site_dir:
+                self.build(site_dir)
+                publish_output(os.path.join(site_dir, 'output'), target)
+        except Exception:
+            # still out of date
+            Project.objects.filter(pk=self.project.pk).update(dirty=True)
+            self.project.dirty = True
+            raise
+
+        self.project.preview_url = url
+        self.project.save(update_fields=['preview_url'])
+        return url
+
+    def build(self, site_dir):
+        self.generate_site_dir(site_dir)
+        with self.profile.span('pelican_generate') as span:
             returncode = pelican_generate(
                 site_dir,
                 'content',
                 'pelicanconf.py',
+                timeout=self.timeout,
+                profile_file=(os.path.join(site_dir, PELICAN_PROFILE)
+                              if self.profiler is not None else None),
             )
             if returncode != 0:
                 raise RuntimeError(
                     'Pelican returned status: {0}'.format(returncode),
                 )
-
-            archive = self.zip_output(site_dir)
-
-        return GeneratedSite(self.project.title, datetime.now(), archive)
+            for _, path in walk_files(os.path.join(site_dir, 'output')):
+                span.count(files=1, bytes=os.path.getsize(path))
+
+    def save_profile(self, site_dir, build):
+        """
+        Merge the in-process profile with the Pelican subprocess's one and
+        save it as this build's profile artifact.  Returns its path.
+        """
+        stats = pstats.Stats(self.profiler)
+        pelican_profile = os.path.join(site_dir, PELICAN_PROFILE)
+        if os.path.isfile(pelican_profile):
+            stats.add(pelican_profile)
+
+        profile_dir = os.path.join(settings.BUILD_CACHE_ROOT, 'profiles')
+        mkdirs(profile_dir)
+        path = os.path.join(profile_dir, '{0}.prof'.format(build.id))
+        stats.dump_stats(path)
+        return path
 
     def zip_output(self, site_dir):
+        with self.profile.span('zip_output') as span:
+            content, files = self._zip_output(site_dir)
+            span.count(files=files, bytes=len(content))
+        return content
+
+    def _zip_output(self, site_dir):
         # now zip the output (in RAM)...
         tempzipfile = tempfile.NamedTemporaryFile(delete=True)
         output_dir = os.path.join(site_dir, 'output')
 
-        with zipfile.ZipFile(tempzipfile, 'w', zipfile.ZIP_DEFLATED) as arc:
-            for dirpath, _, filenames in os.walk(output_dir):
+        # If the theme's static files have been prepackaged (see
+        # theme_registry), start from that zip and skip them below.
+        mode = 'w'
+        skip_dir = None
+        static = static_archive(self.project.theme)
+        if static is not None:
+            with open(static, 'rb') as f:
+                shutil.copyfileobj(f, tempzipfile)
+            tempzipfile.flush()
+            mode = 'a'
+            skip_dir = os.path.join(output_dir, THEME_STATIC_DIR)
+
+        with zipfile.ZipFile(tempzipfile, mode, zipfile.ZIP_DEFLATED) as arc:
+            for dirpath, dirnames, filenames in os.walk(output_dir):
+                if dirpath == skip_dir:
+                    dirnames[:] = []
+                    continue
                 for filename in filenames:
                     path = os.path.join(dirpath, filename)
                     arc_path = os.path.relpath(path, output_dir)
                     arc.write(path, arc_path)
+            files = len(arc.infolist())
 
         # load the zipfile's content into memory...
+        with open(tempzipfile.name, 'rb') as f:
+            content = f.read()
+        tempzipfile.close()
+        return content, files
+
+    def output_manifest(self, site_dir):
+        """Map each output file's path to the SHA-1 of its content."""
+        output_dir = os.path.join(site_dir, 'output')
+        manifest = {}
+        skip_dir = None
+        static = static_manifest(self.project.theme)
+        if static is not None:
+            # already hashed when the theme was registered
+            manifest.update(static)
+            skip_dir = os.path.join(output_dir, THEME_STATIC_DIR)
+
+        for dirpath, dirnames, filenames in os.walk(output_dir):
+            if dirpath == skip_dir:
+                dirnames[:] = []
+                continue
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                manifest[os.path.relpath(path, output_dir)] = file_digest(path)
+        return manifest
+
+    def record_build(self, manifest):
+        build = Build(project=self.project)
+        build.set_manifest(manifest)
+        build.save()
+
+        # only the last few builds are useful as a base for a delta
+        stale = (Build.objects.filter(project=self.project)
+                 .order_by('-created', '-id')
+                 .values_list('id', flat=True)[settings.BUILD_HISTORY:])
+        Build.objects.filter(id__in=list(stale)).delete()
+        return build
+
+    def zip_delta(self, site_dir, since, build, manifest):
+        with self.profile.span('zip_output') as span:
+            changed, deleted = since.diff(manifest)
+            content = self._zip_delta(site_dir, since, build, changed,
+                                      deleted)
+            span.count(files=len(changed), bytes=len(content))
+        return content
+
+    def _zip_delta(self, site_dir, since, build, changed, deleted):
+        output_dir = os.path.join(site_dir, 'output')
+        delta = {'since': since.id, 'build': build.id, 'deleted': deleted}
+
+        tempzipfile = tempfile.NamedTemporaryFile(delete=True)
+        with zipfile.ZipFile(tempzipfile, 'w', zipfile.ZIP_DEFLATED) as arc:
+            for arc_path in changed:
+                arc.write(os.path.join(output_dir, arc_path), arc_path)
+            arc.writestr(DELTA_FILENAME, json.dumps(delta, indent=2))
+
         with open(tempzipfile.name, 'rb') as f:
             content = f.read()
         tempzipfile.close()
         return content
 
     def generate_site_dir(self, site_dir):
-        self.write_pelican_conf(site_dir)
+        with self.profile.span('generate_site_dir'):
+            self.write_pelican_conf(site_dir)
 
-        content_counter = Counter()
-        written_pages = self.write_pages(
-            self.project.page_set.all(),
-            content_counter,
-            site_dir,
-        )
-        written_posts = self.write_posts(
-            self.project.post_set.all(),
-            content_counter,
-            site_dir,
-        )
-        slug_dict = {'pages': written_pages, 'posts': written_posts}
-        self.write_page_plugins(self.get_plugin_dict(slug_dict), site_dir)
+            content_counter = Counter()
+            written_pages = self.write_pages(
+                self.project.page_set.all(),
+                content_counter,
+                site_dir,
+            )
+            written_posts = self.write_posts(
+                self.project.post_set.all(),
+                content_counter,
+                site_dir,
+            )
+            slug_dict = {'pages': written_pages, 'posts': written_posts}
+            self.write_page_plugins(self.get_plugin_dict(slug_dict),
+                                    site_dir)
 
     def get_plugin_dict(self, slug_dict):
         plugin_dict = {'pages': {}, 'posts': {}}
@@ -104,39 +301,49 @@ class SiteGenerator(object):
 
     def write_pages(self, pages, content_counter, site_dir):
         written_pages = []
-        # Write each Page into `content/pages/`
-        for page in pages:
-            page_dir = os.path.join(site_dir, 'content', 'pages')
-            mkdirs(page_dir)
-
-            filename = get_filename(page, content_counter)
-            written_pages.append((page, filename))
-            page_file = os.path.join(page_dir, filename) + '.md'
-            with open(page_file, 'w') as f:
-                f.write(page.get_markdown(slug=filename))
+        with self.profile.span('write_pages') as span:
+            # Write each Page into `content/pages/`
+            for page in pages:
+                page_dir = os.path.join(site_dir, 'content', 'pages')
+                mkdirs(page_dir)
+
+                filename = get_filename(page, content_counter)
+                written_pages.append((page, filename))
+                page_file = os.path.join(page_dir, filename) + '.md'
+                markdown = page.get_markdown(slug=filename).encode('utf-8')
+                with open(page_file, 'wb') as f:
+                    f.write(markdown)
+                span.count(files=1, bytes=len(markdown))
         return written_pages
 
     def write_posts(self, posts, content_counter, site_dir):
         written_posts = []
-        # Write each Post into `content/<category>`
-        for post in posts:
-            post_dir = os.path.join(
-                site_dir,
-                'content',
-                slugify(post.category.title),
-            )
-            mkdirs(post_dir)
-
-            filename = get_filename(post, content_counter)
-            written_posts.append((post, filename))
-            post_file = os.path.join(post_dir, filename) + '.md'
-            with open(post_file, 'w') as f:
-                f.write(post.get_markdown(slug=filename))
+        with self.profile.span('write_posts') as span:
+            # Write each Post into `content/<category>`
+            for post in posts:
+                post_dir = os.path.join(
+                    site_dir,
+                    'content',
+                    slugify(post.category.title),
+                )
+                mkdirs(post_dir)
+
+                filename = get_filename(post, content_counter)
+                written_posts.append((post, filename))
+                post_file = os.path.join(post_dir, filename) + '.md'
+                markdown = post.get_markdown(slug=filename).encode('utf-8')
+                with open(post_file, 'wb') as f:
+                    f.write(markdown)
+                span.count(files=1, bytes=len(markdown))
         return written_posts
 
     def write_pelican_conf(self, site_dir):
         with open(os.path.join(site_dir, 'pelicanconf.py'), 'w') as f:
-            f.write(self.project.get_pelican_conf())
+            f.write(self.project.get_pelican_conf(
+                site_url=self.site_url,
+                bytecode_cache_dir=bytecode_cache_dir(self.project.theme),
+                theme=theme_path(self.project.theme.filepath),
+            ))
 
     def write_page_plugins(self, plugin_dict, site_dir):
         context = {'plugin_dict': plugin_dict}
@@ -159,18 +366,111 @@ def get_filename(pagelike, pagelike_counter):
     return pagelike_filename
 
 
-def pelican_generate(site_dir, content_dir, settings_file, timeout=10):
+def pelican_generate(site_dir, content_dir, settings_file, timeout=10,
+                     profile_file=None):
+    """
+    Run Pelican over a site directory, writing the site to its `output/`.
+    If `profile_file` is given, Pelican runs under cProfile and its stats
+    are written there.
+    """
     path_to_content = os.path.join(site_dir, content_dir)
     path_to_settings = os.path.join(site_dir, settings_file)
-    cmd = ('pelican %(path_to_content)s -s %(path_to_settings)s' % {
-        'path_to_content': path_to_content,
-        'path_to_settings': path_to_settings,
-    })
-    p = Popen(shlex.split(cmd))
+    path_to_output = os.path.join(site_dir, 'output')
+    # without -o, Pelican writes to output/ in *our* working directory
+    args = ['pelican', path_to_content, '-s', path_to_settings,
+            '-o', path_to_output]
+    if profile_file is not None:
+        args = [sys.executable, '-m', 'cProfile', '-o', profile_file,
+                shutil.which('pelican')] + args[1:]
+    p = Popen(args)
     p.wait(timeout=timeout)  # we don't have all day
     return p.returncode
 
 
+def publish_dir(project):
+    """
+    Where a project's site is published: PUBLISH_ROOT/<owner id>/<id>.
+
+    Keyed on ids rather than names: usernames may be `.` or `..`, and
+    renaming a project shouldn't move its site.
+    """
+    root = os.path.realpath(settings.PUBLISH_ROOT)
+    owner_dir = os.path.realpath(os.path.join(root, str(project.owner_id)))
+    if os.path.dirname(owner_dir) != root:
+        raise SuspiciousFileOperation(
+            'Publish directory {0} is outside PUBLISH_ROOT'.format(owner_dir),
+        )
+    return os.path.join(owner_dir, str(project.pk))
+
+
+def publish_url(project):
+    return '{root}{owner}/{project}/'.format(
+        root=settings.PUBLISH_URL,
+        owner=project.owner_id,
+        project=project.pk,
+    )
+
+
+def publish_output(output_dir, target):
+    """
+    Atomically replace the site published at `target` with `output_dir`.
+
+    `target` is a symlink to a versioned directory beside it.  The new
+    version is assembled in a fresh directory, hard-linking every file that
+    is unchanged since the previous version instead of writing it again, and
+    then the symlink is swapped over with os.replace().
+    """
+    parent = os.path.dirname(target)
+    name = os.path.basename(target)
+    if os.path.islink(target):
+        previous = os.path.realpath(target)
+    elif os.path.isdir(target):
+        # published some other way (by hand, or before versioning); a
+        # directory can't be replaced by a symlink, so move it aside and
+        # treat it as the previous version
+        previous = tempfile.mkdtemp(prefix='.{0}.'.format(name), dir=parent)
+        os.rmdir(previous)
+        os.rename(target, previous)
+    else:
+        previous = None
+
+    version = tempfile.mkdtemp(prefix='.{0}.'.format(name), dir=parent)
+    os.chmod(version, 0o755)  # mkdtemp is owner-only; nginx has to read it
+    for dirpath, _, filenames in os.walk(output_dir):
+        reldir = os.path.relpath(dirpath, output_dir)
+        mkdirs(os.path.join(version, reldir))
+        for filename in filenames:
+            relpath = os.path.normpath(os.path.join(reldir, filename))
+            src = os.path.join(output_dir, relpath)
+            dest = os.path.join(version, relpath)
+            old = (os.path.join(previous, relpath)
+                   if previous is not None else None)
+            if (old is not None and os.path.isfile(old) and
+                    filecmp.cmp(src, old, shallow=False)):
+                os.link(old, dest)
+            else:
+                shutil.move(src, dest)
+
+    link = os.path.join(parent, '.{0}.link'.format(os.path.basename(version)))
+    os.symlink(os.path.basename(version), link)
+    os.replace(link, target)
+
+    if previous is not None:
+        # the files we linked keep their data; the rest goes away
+        shutil.rmtree(previous, ignore_errors=True)
+
+
+def unpublish(project):
+    """Remove the site published for `project`, if there is one."""
+    target = publish_dir(project)
+    if os.path.islink(target):
+        version = os.path.realpath(target)
+        os.unlink(target)
+        shutil.rmtree(version, ignore_errors=True)
+    elif os.path.isdir(target):
+        shutil.rmtree(target, ignore_errors=True)
+
+
 def mkdirs(dir):
     try:
         os.makedirs(dir)
@@ -179,6 +479,13 @@ def mkdirs(dir):
         pass
 
 
+# Where the Pelican subprocess writes its cProfile stats, in the site dir.
+PELICAN_PROFILE = 'pelican.prof'
+
+# Written into delta archives: which build they apply to and what to delete.
+DELTA_FILENAME = '.fugl-delta.json'
+
+
 PLUGIN_BODY = '''
 from pelican import signals
 
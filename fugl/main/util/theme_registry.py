@@ -0,0 +1,182 @@
+"""
+Theme registration: everything we can do for a theme once, instead of on
+every build.
+
+Registering a theme checks that its templates parse and that everything they
+extend/include/import can be found, records a content hash (used in cache
+keys), warms the on-disk bytecode cache, and zips up the static assets the
+way Pelican lays them out in `output/theme/` so site archives can start from
+that zip rather than recompressing the same files every time.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+from jinja2 import TemplateNotFound
+from jinja2 import TemplateSyntaxError
+from jinja2 import meta
+from pelican.settings import DEFAULT_CONFIG
+
+from .themes import file_digest
+from .themes import get_environment
+from .themes import make_environment
+from .themes import template_fingerprint
+from .themes import theme_cache_dir
+from .themes import theme_path
+from .themes import walk_files
+
+
+THEME_STATIC_DIR = DEFAULT_CONFIG.get('THEME_STATIC_DIR', 'theme')
+THEME_STATIC_PATHS = DEFAULT_CONFIG.get('THEME_STATIC_PATHS', ['static'])
+
+
+def register_theme(theme):
+    """
+    Validate, hash, precompile and package a theme, then save it.
+
+    Raises ValidationError (without saving anything) if the theme is
+    incomplete or its templates don't parse.
+    """
+    path = theme_path(theme.filepath)
+    validate_theme(path)
+
+    theme.content_hash = content_hash(path)
+    theme.save()  # we need a pk before we can cache anything
+
+    precompile_templates(theme)
+    package_static(theme)
+
+    theme.registered_at = timezone.now()
+    theme.save()
+    return theme
+
+
+def validate_theme(path):
+    templates_dir = os.path.join(path, 'templates')
+    if not os.path.isdir(templates_dir):
+        raise ValidationError(
+            'Theme has no templates directory: %(path)s',
+            code='invalid',
+            params={'path': templates_dir},
+        )
+
+    env = make_environment(path)
+    errors = []
+    for name, full in walk_files(templates_dir):
+        with open(full, encoding='utf-8') as f:
+            source = f.read()
+        try:
+            ast = env.parse(source, name, full)
+        except TemplateSyntaxError as e:
+            errors.append(ValidationError(
+                '%(name)s line %(line)s: %(message)s',
+                code='invalid',
+                params={'name': name, 'line': e.lineno, 'message': e.message},
+            ))
+            continue
+
+        for ref in meta.find_referenced_templates(ast):
+            if ref is None:
+                continue  # dynamic reference, can't check statically
+            try:
+                env.loader.get_source(env, ref)
+            except TemplateNotFound:
+                errors.append(ValidationError(
+                    '%(name)s references missing template %(ref)s',
+                    code='invalid',
+                    params={'name': name, 'ref': ref},
+                ))
+    if errors:
+        raise ValidationError(errors)
+
+
+def content_hash(path):
+    """SHA-1 over the names and contents of every file in the theme."""
+    digest = hashlib.sha1()
+    for relpath, full in walk_files(path):
+        digest.update(relpath.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(file_digest(full).encode('ascii'))
+    return digest.hexdigest()
+
+
+def precompile_templates(theme):
+    """Compile every template once so its bytecode lands in the cache."""
+    env = get_environment(theme)
+    for name in env.list_templates():
+        if name.startswith('!simple/'):
+            continue
+        env.get_template(name)
+
+
+def package_static(theme):
+    """
+    Zip the theme's static files under the paths Pelican copies them to,
+    alongside a manifest of their hashes, and return the archive's path.
+    """
+    path = theme_path(theme.filepath)
+    archive = static_archive_name(theme)
+    cache_dir = os.path.dirname(archive)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    # write somewhere else first so a concurrent build never sees half a zip
+    manifest = {}
+    fd, tmp = tempfile.mkstemp(dir=cache_dir)
+    with os.fdopen(fd, 'wb') as f:
+        with zipfile.ZipFile(f, 'w', zipfile.ZIP_DEFLATED) as arc:
+            for static_path in THEME_STATIC_PATHS:
+                root = os.path.join(path, static_path)
+                for relpath, full in walk_files(root):
+                    arc_path = os.path.join(THEME_STATIC_DIR, relpath)
+                    arc.write(full, arc_path)
+                    manifest[arc_path] = file_digest(full)
+
+    fd, tmp_manifest = tempfile.mkstemp(dir=cache_dir)
+    with os.fdopen(fd, 'w') as f:
+        json.dump(manifest, f)
+    # the manifest goes in first: static_archive() keys off the zip
+    shutil.move(tmp_manifest, manifest_name(archive))
+    shutil.move(tmp, archive)
+    return archive
+
+
+def static_archive_name(theme):
+    path = theme_path(theme.filepath)
+    fingerprint = hashlib.sha1()
+    for static_path in THEME_STATIC_PATHS:
+        fingerprint.update(template_fingerprint(path, static_path)
+                           .encode('ascii'))
+    return os.path.join(theme_cache_dir(theme),
+                        'static-%s.zip' % fingerprint.hexdigest())
+
+
+def static_archive(theme):
+    """
+    Return the prepackaged static archive for the theme's current static
+    files, or None if there isn't one (theme not registered, or edited since).
+    """
+    archive = static_archive_name(theme)
+    if os.path.isfile(archive):
+        return archive
+    return None
+
+
+def static_manifest(theme):
+    """
+    Return {output path: sha1} for the prepackaged static files, or None if
+    there is no current static archive.
+    """
+    archive = static_archive(theme)
+    if archive is None:
+        return None
+    with open(manifest_name(archive)) as f:
+        return json.load(f)
+
+
+def manifest_name(archive):
+    return os.path.splitext(archive)[0] + '.json'
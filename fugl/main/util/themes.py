@@ -0,0 +1,150 @@
+"""
+Helpers for locating themes and caching their compiled templates.
+
+Compiled template bytecode lives on disk under
+`BUILD_CACHE_ROOT/themes/<theme id>/<fingerprint>/`, where the fingerprint is
+derived from the template files' mtimes and sizes.  Editing a template
+changes the fingerprint, so a stale cache is simply never looked at again.
+Both the in-process preview renderer and the Pelican subprocess (through
+`JINJA_ENVIRONMENT` in the generated pelicanconf) share the same directory.
+"""
+import hashlib
+import os
+import threading
+
+import pelican
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from jinja2 import ChoiceLoader
+from jinja2 import Environment
+from jinja2 import FileSystemBytecodeCache
+from jinja2 import FileSystemLoader
+from jinja2 import PrefixLoader
+from pelican.settings import DEFAULT_CONFIG
+
+try:
+    from pelican.utils import DateFormatter
+except ImportError:  # not every Pelican release exports it
+    DateFormatter = None
+
+
+PELICAN_THEMES_DIR = os.path.join(os.path.dirname(pelican.__file__), 'themes')
+
+
+def theme_path(filepath):
+    """
+    Resolve a Theme.filepath much as Pelican resolves THEME: either a
+    directory under THEMES_ROOT or the name of one of Pelican's builtin
+    themes.  Users choose filepaths, so anything else raises
+    SuspiciousFileOperation rather than being read.
+    """
+    root = os.path.realpath(settings.THEMES_ROOT)
+    path = os.path.realpath(os.path.join(root, filepath))
+    if path.startswith(root + os.sep) and os.path.isdir(path):
+        return path
+    if (os.path.basename(filepath) == filepath and
+            filepath not in (os.curdir, os.pardir)):
+        return os.path.join(PELICAN_THEMES_DIR, filepath)
+    raise SuspiciousFileOperation(
+        'Theme {0} is not under THEMES_ROOT'.format(filepath),
+    )
+
+
+def template_fingerprint(path, subdir='templates'):
+    """
+    Digest of the (name, mtime, size) of every file in one directory of a
+    theme.  Cheap enough to compute on every build.
+    """
+    root = os.path.join(path, subdir)
+    digest = hashlib.sha1()
+    for relpath, full in walk_files(root):
+        stat = os.stat(full)
+        digest.update(relpath.encode('utf-8'))
+        digest.update(('%d:%d' % (stat.st_mtime_ns, stat.st_size))
+                      .encode('ascii'))
+    return digest.hexdigest()
+
+
+def file_digest(path):
+    """Hex SHA-1 of a file's contents."""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def walk_files(root):
+    """Yield (relative path, full path) for every file under root, sorted."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            full = os.path.join(dirpath, filename)
+            yield os.path.relpath(full, root), full
+
+
+def theme_cache_dir(theme):
+    """Directory holding everything cached for one theme."""
+    return os.path.join(settings.BUILD_CACHE_ROOT, 'themes', str(theme.pk))
+
+
+def bytecode_cache_dir(theme):
+    """
+    Return (and create) the bytecode cache directory for a theme's current
+    templates.
+    """
+    path = os.path.join(
+        theme_cache_dir(theme),
+        template_fingerprint(theme_path(theme.filepath)),
+    )
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+_environments = {}
+_environments_lock = threading.Lock()
+
+
+def get_environment(theme):
+    """
+    Return the Jinja environment for a theme, creating it on first use.
+
+    Environments hold on to their compiled templates, so keeping one per
+    theme means each template is only compiled once per process; the on-disk
+    bytecode cache means it is only compiled once per theme revision.
+    """
+    cache_dir = bytecode_cache_dir(theme)
+    with _environments_lock:
+        cached = _environments.get(theme.pk)
+        if cached is not None and cached[0] == cache_dir:
+            return cached[1]
+
+        env = make_environment(theme_path(theme.filepath), cache_dir)
+        _environments[theme.pk] = (cache_dir, env)
+        return env
+
+
+def make_environment(path, cache_dir=None):
+    """
+    Build a Jinja environment that loads templates the way Pelican does:
+    from the theme first, falling back to Pelican's `simple` theme.
+    """
+    simple_loader = FileSystemLoader(
+        os.path.join(PELICAN_THEMES_DIR, 'simple', 'templates'),
+    )
+    env = Environment(
+        loader=ChoiceLoader([
+            FileSystemLoader(os.path.join(path, 'templates')),
+            simple_loader,  # implicit inheritance
+            PrefixLoader({'!simple': simple_loader}),  # explicit one
+        ]),
+        bytecode_cache=(FileSystemBytecodeCache(cache_dir)
+                        if cache_dir is not None else None),
+        trim_blocks=True,
+        lstrip_blocks=True,
+        extensions=DEFAULT_CONFIG.get('JINJA_EXTENSIONS', []),
+    )
+    if DateFormatter is not None:
+        env.filters['strftime'] = DateFormatter()
+    return env
+